@@ -5,7 +5,9 @@ Core - Módulos principales de la Drum Machine
 from .audio_engine import AudioEngine
 from .audio_processor import AudioProcessor
 from .sequencer import Sequencer
+from .pattern import Pattern
+from .offline_renderer import OfflineRenderer
 from .config import *
 
-__all__ = ['AudioEngine', 'AudioProcessor', 'Sequencer']
+__all__ = ['AudioEngine', 'AudioProcessor', 'Sequencer', 'Pattern', 'OfflineRenderer']
 
@@ -3,22 +3,465 @@ Motor de audio para la Drum Machine usando pygame
 Maneja la carga y reproducción de samples de batería
 """
 
-import pygame
 import os
+import heapq
+import math
+import time
+import threading
+from collections import deque
 import numpy as np
+try:
+    import pygame
+    PYGAME_AVAILABLE = True
+except ImportError:
+    pygame = None
+    PYGAME_AVAILABLE = False
+    print("⚠️ pygame no disponible: solo render offline (MixBus sin salida de audio)")
 from .config import (
     INSTRUMENTS, SAMPLES_DIR, SAMPLE_RATE, AUDIO_BUFFER_SIZE, 
     AUDIO_CHANNELS, MASTER_VOLUME_DEFAULT, INSTRUMENT_VOLUME_DEFAULT,
-    AUDIO_GAIN_BOOST
+    AUDIO_GAIN_BOOST, MIX_BUS_ENABLED, MAX_VOICES, INSTRUMENT_POLYPHONY,
+    CHOKE_GROUPS, VOICE_STEAL_POLICY, VOICE_FADE_FRAMES, VOICE_SILENCE_DB,
+    SAMPLE_CACHE_ENABLED, LOOKAHEAD_BLOCKS
 )
 from .audio_processor import AudioProcessor
+from .sample_cache import SampleCache
+
+
+class Voice:
+    """Voz activa del bus de mezcla"""
+    
+    __slots__ = ('instrument_id', 'data', 'tail_envelope', 'position',
+                 'gain', 'serial', 'fade_remaining', 'offset')
+    
+    def __init__(self, instrument_id, data, tail_envelope, gain, serial, offset=0):
+        self.instrument_id = instrument_id
+        self.data = data
+        self.tail_envelope = tail_envelope
+        self.position = 0
+        self.gain = gain
+        self.serial = serial
+        self.fade_remaining = -1  # -1 = sin fade-out en curso
+        self.offset = offset  # Frames de silencio antes de arrancar dentro del próximo bloque
+    
+    def is_fading(self):
+        """Verificar si la voz está en fade-out (cortada o robada)"""
+        return self.fade_remaining >= 0
+    
+    def level(self, block_size):
+        """
+        Estimar el nivel pico que le queda a la voz
+        
+        Args:
+            block_size: Tamaño de bloque usado para la envolvente
+            
+        Returns:
+            Nivel lineal (0.0-1.0+) del resto del sample con la ganancia de la voz
+        """
+        chunk = min(self.position // block_size, len(self.tail_envelope) - 1)
+        return self.gain * self.tail_envelope[chunk]
+
+
+class VoiceManager:
+    """
+    Asignador de voces con polifonía por instrumento, choke groups y robo de voces
+    Las voces cortadas o robadas hacen un fade-out corto en lugar de un corte seco
+    """
+    
+    def __init__(self, max_voices=MAX_VOICES, polyphony=INSTRUMENT_POLYPHONY,
+                 choke_groups=CHOKE_GROUPS, steal_policy=VOICE_STEAL_POLICY,
+                 block_size=AUDIO_BUFFER_SIZE):
+        """
+        Inicializar asignador de voces
+        
+        Args:
+            max_voices: Polifonía total
+            polyphony: Lista con voces máximas por instrumento
+            choke_groups: Dict instrumento -> instrumentos que corta al sonar
+            steal_policy: 'oldest' (más antigua) o 'quietest' (más silenciosa)
+            block_size: Resolución en frames de la envolvente de nivel
+        """
+        if steal_policy not in ('oldest', 'quietest'):
+            raise ValueError(f"Política de robo inválida: {steal_policy}")
+        
+        self.max_voices = max_voices
+        self.polyphony = list(polyphony)
+        self.choke_groups = dict(choke_groups)
+        self.steal_policy = steal_policy
+        self.block_size = block_size
+        self.silence_level = 10.0 ** (VOICE_SILENCE_DB / 20.0)
+        
+        self.voices = []
+        self._tail_envelopes = {}
+        self._serial = 0
+        
+        # Estadísticas
+        self.voices_started = 0
+        self.voices_stolen = 0
+        self.voices_choked = 0
+        self.voices_culled = 0
+    
+    def set_sample(self, instrument_id, data):
+        """
+        Precalcular la envolvente de cola de un sample (pico restante por bloque)
+        
+        Args:
+            instrument_id: ID del instrumento
+            data: Array int16 (frames, 2)
+        """
+        peaks = np.abs(data.astype(np.int32)).max(axis=1)
+        chunk_peaks = np.maximum.reduceat(peaks, np.arange(0, len(peaks), self.block_size))
+        # Máximo de lo que queda desde cada bloque hasta el final
+        tail = np.maximum.accumulate(chunk_peaks[::-1])[::-1]
+        self._tail_envelopes[instrument_id] = tail.astype(np.float32) / 32768.0
+    
+    def _release(self, voice):
+        """Iniciar el fade-out de una voz"""
+        if not voice.is_fading():
+            voice.fade_remaining = VOICE_FADE_FRAMES
+    
+    def _pick_victim(self, candidates):
+        """Elegir la voz a robar según la política"""
+        if self.steal_policy == 'quietest':
+            return min(candidates, key=lambda v: v.level(self.block_size))
+        return min(candidates, key=lambda v: v.serial)
+    
+    def start(self, instrument_id, data, gain, offset=0):
+        """
+        Asignar una voz nueva, aplicando choke, polifonía y robo
+        
+        Args:
+            instrument_id: ID del instrumento
+            data: Array int16 (frames, 2) del sample
+            gain: Ganancia lineal
+            offset: Frame dentro del próximo bloque en el que arranca la voz
+            
+        Returns:
+            Voice creada
+        """
+        # Choke groups: cortar los instrumentos asociados
+        choked = self.choke_groups.get(instrument_id, ())
+        if choked:
+            for voice in self.voices:
+                if voice.instrument_id in choked and not voice.is_fading():
+                    self._release(voice)
+                    self.voices_choked += 1
+        
+        # Polifonía por instrumento
+        limit = self.polyphony[instrument_id] if instrument_id < len(self.polyphony) else 1
+        same = [v for v in self.voices if v.instrument_id == instrument_id and not v.is_fading()]
+        if len(same) >= limit:
+            self._release(self._pick_victim(same))
+            self.voices_stolen += 1
+        
+        # Polifonía total (las voces en fade-out ya no cuentan)
+        sounding = [v for v in self.voices if not v.is_fading()]
+        if len(sounding) >= self.max_voices:
+            self._release(self._pick_victim(sounding))
+            self.voices_stolen += 1
+        
+        self._serial += 1
+        tail = self._tail_envelopes.get(instrument_id)
+        if tail is None:
+            self.set_sample(instrument_id, data)
+            tail = self._tail_envelopes[instrument_id]
+        voice = Voice(instrument_id, data, tail, gain, self._serial, offset)
+        self.voices.append(voice)
+        self.voices_started += 1
+        return voice
+    
+    def reap(self):
+        """Quitar voces terminadas, con fade-out completo o con cola inaudible"""
+        alive = []
+        for voice in self.voices:
+            if voice.position >= len(voice.data) or voice.fade_remaining == 0:
+                continue
+            if not voice.is_fading() and voice.level(self.block_size) < self.silence_level:
+                self.voices_culled += 1
+                continue
+            alive.append(voice)
+        self.voices = alive
+    
+    def clear(self):
+        """Quitar todas las voces"""
+        self.voices = []
+    
+    def get_stats(self):
+        """
+        Obtener estadísticas de asignación
+        
+        Returns:
+            Dict con voces activas, iniciadas, robadas, cortadas y descartadas
+        """
+        return {
+            'active': len(self.voices),
+            'started': self.voices_started,
+            'stolen': self.voices_stolen,
+            'choked': self.voices_choked,
+            'culled': self.voices_culled
+        }
+
+
+class MixBus:
+    """
+    Bus de mezcla por bloques
+    Suma las voces activas en un buffer float32 preasignado y aplica
+    el procesamiento master una vez por bloque sobre la mezcla completa
+    """
+    
+    def __init__(self, processor=None, block_size=AUDIO_BUFFER_SIZE, voice_manager=None):
+        """
+        Inicializar bus de mezcla
+        
+        Args:
+            processor: AudioProcessor para ganancia master, efectos y limitador (None = solo clip)
+            block_size: Tamaño de bloque en frames
+            voice_manager: VoiceManager a usar (None = uno con la configuración por defecto)
+        """
+        self.processor = processor
+        self.block_size = block_size
+        
+        # Samples en formato nativo: int16 (frames, 2)
+        self.samples = {}
+        
+        # Asignación de voces
+        self.voice_manager = voice_manager or VoiceManager(block_size=block_size)
+        
+        # Disparos pendientes (deque: append/popleft son thread-safe)
+        self._pending = deque()
+        self._clear_requested = False
+        
+        # Disparos agendados a un frame futuro (heap por frame, solo thread de audio)
+        self._scheduled = []
+        self._schedule_serial = 0
+        self.frame_position = 0  # Primer frame del próximo bloque
+        
+        # Buffers preasignados
+        self._mix = np.zeros((block_size, 2), dtype=np.float32)
+        self._scratch = np.zeros((block_size, 2), dtype=np.float32)
+        self._out = np.zeros((block_size, 2), dtype=np.int16)
+        
+        # Rampa de fade-out para voces cortadas/robadas
+        self._fade_ramp = np.linspace(1.0, 0.0, VOICE_FADE_FRAMES + 1, dtype=np.float32)[1:, None]
+        
+        # Estadísticas
+        self.blocks_rendered = 0
+        self.triggers_late = 0
+    
+    def set_sample(self, instrument_id, data):
+        """
+        Registrar el sample de un instrumento
+        
+        Args:
+            instrument_id: ID del instrumento (0-7)
+            data: Array int16 (frames, 2) o (frames,) mono, None para quitarlo
+        """
+        if data is None:
+            self.samples.pop(instrument_id, None)
+            return
+        
+        if data.ndim == 1:
+            data = np.column_stack((data, data))
+        self.samples[instrument_id] = data
+        self.voice_manager.set_sample(instrument_id, data)
+    
+    def trigger(self, instrument_id, gain, frame=None):
+        """
+        Disparar una voz (seguro desde cualquier thread)
+        
+        Args:
+            instrument_id: ID del instrumento (0-7)
+            gain: Ganancia lineal de la voz
+            frame: Frame absoluto del bus en el que debe arrancar (None = próximo bloque)
+        """
+        if instrument_id in self.samples:
+            self._pending.append((instrument_id, gain, frame))
+    
+    def clear(self):
+        """Silenciar todas las voces en el próximo bloque"""
+        self._clear_requested = True
+    
+    def _start_pending_voices(self, frames):
+        """
+        Pasar a voces activas los disparos que caen dentro del próximo bloque
+        
+        Args:
+            frames: Largo del bloque a renderizar
+        """
+        if self._clear_requested:
+            self._clear_requested = False
+            self._pending.clear()
+            self._scheduled = []
+            self.voice_manager.clear()
+        
+        block_start = self.frame_position
+        block_end = block_start + frames
+        
+        while self._pending:
+            instrument_id, gain, frame = self._pending.popleft()
+            if frame is None:
+                frame = block_start
+            elif frame < block_start:
+                # Llegó tarde: arranca al principio del bloque
+                self.triggers_late += 1
+                frame = block_start
+            self._schedule_serial += 1
+            heapq.heappush(self._scheduled, (frame, self._schedule_serial, instrument_id, gain))
+        
+        # Arrancar en orden de frame los que caen en este bloque
+        while self._scheduled and self._scheduled[0][0] < block_end:
+            frame, _, instrument_id, gain = heapq.heappop(self._scheduled)
+            self.voice_manager.start(
+                instrument_id, self.samples[instrument_id], gain, max(0, frame - block_start)
+            )
+    
+    def render_block(self, frames=None):
+        """
+        Renderizar un bloque de la mezcla
+        
+        Args:
+            frames: Frames a renderizar (<= block_size), None = bloque completo
+        
+        Returns:
+            Vista int16 (frames, 2) del buffer de salida (se reutiliza en la próxima llamada)
+        """
+        if frames is None:
+            frames = self.block_size
+        
+        self._start_pending_voices(frames)
+        
+        mix = self._mix[:frames]
+        scratch = self._scratch
+        mix.fill(0.0)
+        
+        # Sumar voces activas
+        for voice in self.voice_manager.voices:
+            # Voces agendadas: arrancan en su frame exacto dentro del bloque
+            offset = voice.offset
+            voice.offset = 0
+            position = voice.position
+            n = min(frames - offset, len(voice.data) - position)
+            if voice.is_fading():
+                n = min(n, voice.fade_remaining)
+            if n <= 0:
+                continue
+            
+            # int16 -> float normalizado incluido en la ganancia de la voz
+            np.multiply(voice.data[position:position + n], voice.gain * (1.0 / 32768.0), out=scratch[:n])
+            if voice.is_fading():
+                fade_position = VOICE_FADE_FRAMES - voice.fade_remaining
+                np.multiply(scratch[:n], self._fade_ramp[fade_position:fade_position + n], out=scratch[:n])
+                voice.fade_remaining -= n
+            np.add(mix[offset:offset + n], scratch[:n], out=mix[offset:offset + n])
+            voice.position = position + n
+        
+        self.voice_manager.reap()
+        
+        # Procesamiento master sobre la suma
+        if self.processor is not None:
+            self.processor.process_block(mix)
+        else:
+            np.clip(mix, -1.0, 1.0, out=mix)
+        
+        # Conversión de salida a int16
+        out = self._out[:frames]
+        np.multiply(mix, 32767.0, out=scratch[:frames])
+        np.copyto(out, scratch[:frames], casting='unsafe')
+        
+        self.frame_position += frames
+        self.blocks_rendered += 1
+        return out
+    
+    def active_voice_count(self):
+        """Obtener número de voces sonando"""
+        return len(self.voice_manager.voices)
+
+
+class AudioClock:
+    """
+    Relación entre time.monotonic_ns() y los frames del bus de mezcla
+    
+    El thread de salida informa en cada bloque qué frame empieza a renderizar
+    y cuándo. Un DLL de segundo orden (ancho de banda `bandwidth_hz`) filtra
+    el jitter del polling y sigue la frecuencia real de la placa de sonido.
+    Si el error supera `resync_frames` (underrun, pausa) se re-ancla.
+    El estado se publica como una sola tupla (t_ns, frame, ns_por_frame).
+    """
+    
+    def __init__(self, sample_rate=SAMPLE_RATE, block_size=AUDIO_BUFFER_SIZE, bandwidth_hz=0.5):
+        """
+        Inicializar reloj de audio
+        
+        Args:
+            sample_rate: Frecuencia de muestreo nominal
+            block_size: Tamaño de bloque (período del DLL y umbral de re-anclaje)
+            bandwidth_hz: Ancho de banda del DLL
+        """
+        self.nominal_ns_per_frame = 1e9 / sample_rate
+        self.resync_frames = 2 * block_size
+        omega = 2.0 * math.pi * bandwidth_hz * block_size / sample_rate
+        self.gain_phase = math.sqrt(2.0) * omega
+        self.gain_rate = omega * omega
+        self.state = None  # (t_ns, frame, ns_por_frame), None = sin datos
+        self.resyncs = 0
+    
+    def update(self, frame, now_ns):
+        """
+        Registrar que el bloque que empieza en `frame` se renderiza en `now_ns`
+        
+        Args:
+            frame: Primer frame del bloque
+            now_ns: Instante del render
+        """
+        state = self.state
+        if state is not None and frame > state[1]:
+            t_ns, anchor_frame, ns_per_frame = state
+            predicted = t_ns + (frame - anchor_frame) * ns_per_frame
+            error = now_ns - predicted
+            if abs(error) <= self.resync_frames * ns_per_frame:
+                ns_per_frame += self.gain_rate * error / (frame - anchor_frame)
+                self.state = (predicted + self.gain_phase * error, frame, ns_per_frame)
+                return
+            self.resyncs += 1
+        # Primer bloque o salto: re-anclar con la frecuencia nominal
+        ns_per_frame = state[2] if state is not None else self.nominal_ns_per_frame
+        self.state = (now_ns, frame, ns_per_frame)
+    
+    @property
+    def locked(self):
+        """True cuando hay suficiente información para agendar"""
+        return self.state is not None
+    
+    def frame_at(self, t_ns):
+        """
+        Frame del bus que corresponde a un instante
+        
+        Args:
+            t_ns: Instante en time.monotonic_ns()
+        
+        Returns:
+            Frame absoluto (int) o None si el reloj todavía no tiene datos
+        """
+        state = self.state
+        if state is None:
+            return None
+        t_anchor, frame, ns_per_frame = state
+        return frame + int(round((t_ns - t_anchor) / ns_per_frame))
 
 
 class AudioEngine:
     """Motor de audio para reproducir samples de batería"""
     
-    def __init__(self):
-        """Inicializar pygame mixer y cargar samples"""
+    def __init__(self, use_mix_bus=MIX_BUS_ENABLED):
+        """
+        Inicializar pygame mixer y cargar samples
+        
+        Args:
+            use_mix_bus: Mezclar por bloques en un bus float32 (False = un Sound por golpe)
+        """
+        if not PYGAME_AVAILABLE:
+            raise RuntimeError("AudioEngine necesita pygame (usar OfflineRenderer para render sin audio)")
+        
         # Inicializar pygame mixer con configuración de baja latencia
         pygame.mixer.pre_init(
             frequency=SAMPLE_RATE,
@@ -37,39 +480,158 @@ class AudioEngine:
         self.processor = AudioProcessor()
         self.processor.set_master_gain(AUDIO_GAIN_BOOST)
         
-        # Cargar samples
+        # Cargar samples: arrays int16 (frames, 2) preparados y Sounds bajo demanda
+        self.sample_cache = SampleCache()
+        self.sample_data = {}
         self.samples = {}
         self._load_samples()
         
+        # Bus de mezcla por bloques
+        self.mix_bus = None
+        self.audio_clock = AudioClock(SAMPLE_RATE, AUDIO_BUFFER_SIZE)
+        self.output_channel = None
+        self.output_thread = None
+        self.output_running = False
+        self.output_errors = 0
+        if use_mix_bus:
+            self._start_mix_bus()
+        
         print(f"Audio Engine inicializado: {SAMPLE_RATE}Hz, buffer {AUDIO_BUFFER_SIZE}")
         print(f"AudioProcessor: Ganancia master {AUDIO_GAIN_BOOST}x, Limitador activo")
     
     def _load_samples(self):
-        """Cargar todos los samples de audio desde el directorio"""
+        """Cargar todos los samples de audio desde el directorio (vía cache preparado)"""
+        start = time.perf_counter()
+        paths = {}
         for i, instrument in enumerate(INSTRUMENTS):
             sample_path = os.path.join(SAMPLES_DIR, f"{instrument}.wav")
-            
+            self.sample_data[i] = None
             if os.path.exists(sample_path):
-                try:
-                    self.samples[i] = pygame.mixer.Sound(sample_path)
-                    print(f"Sample cargado: {instrument} ({sample_path})")
-                except Exception as e:
-                    print(f"Error cargando {sample_path}: {e}")
-                    # Crear sonido silencioso como fallback
-                    self.samples[i] = None
+                paths[i] = sample_path
             else:
                 print(f"Advertencia: Sample no encontrado: {sample_path}")
-                self.samples[i] = None
+            
+        if SAMPLE_CACHE_ENABLED:
+            loaded = self.sample_cache.load_all(list(paths.values()))
+        else:
+            loaded = [self._decode_with_pygame(path) for path in paths.values()]
+        
+        for (i, sample_path), data in zip(paths.items(), loaded):
+            self.sample_data[i] = data
+            if data is not None:
+                print(f"Sample cargado: {INSTRUMENTS[i]} ({sample_path})")
+        
+        stats = self.sample_cache.get_stats()
+        print(f"Samples listos en {(time.perf_counter() - start) * 1000:.1f} ms "
+              f"(cache: {stats['hits']} hits, {stats['misses']} preparados)")
     
-    def play_sample(self, instrument_id, volume=None):
+    def _decode_with_pygame(self, sample_path):
+        """Decodificar un WAV con pygame (sin cache) al formato nativo int16 (frames, 2)"""
+        try:
+            data = pygame.sndarray.array(pygame.mixer.Sound(sample_path))
+            return data if data.ndim == 2 else np.column_stack((data, data))
+        except Exception as e:
+            print(f"Error cargando {sample_path}: {e}")
+            return None
+    
+    def _get_sound(self, instrument_id):
+        """Sound de pygame para el modo un Sound por golpe (se crea al primer uso)"""
+        sound = self.samples.get(instrument_id)
+        if sound is None:
+            sound = pygame.sndarray.make_sound(np.ascontiguousarray(self.sample_data[instrument_id]))
+            self.samples[instrument_id] = sound
+        return sound
+    
+    def _start_mix_bus(self):
+        """Crear el bus de mezcla y el thread que alimenta al mixer de pygame"""
+        try:
+            mix_bus = MixBus(self.processor)
+            for instrument_id, data in self.sample_data.items():
+                if data is not None:
+                    mix_bus.set_sample(instrument_id, data)
+            
+            # Sounds de salida preasignados: ronda de 3 (uno sonando, uno en
+            # cola y uno libre para escribir el próximo bloque) y uno en silencio
+            silence = np.zeros((AUDIO_BUFFER_SIZE, 2), dtype=np.int16)
+            self._output_sounds = [pygame.sndarray.make_sound(silence) for _ in range(3)]
+            self._output_buffers = [pygame.sndarray.samples(sound) for sound in self._output_sounds]
+            self._silence = pygame.sndarray.make_sound(silence)
+            self._output_index = 0
+            
+            # Reservar un canal exclusivo para la salida del bus
+            pygame.mixer.set_reserved(1)
+            self.output_channel = pygame.mixer.Channel(0)
+        except Exception as e:
+            print(f"⚠️ Bus de mezcla no disponible ({e}), usando un Sound por golpe")
+            return
+        
+        self.mix_bus = mix_bus
+        self.output_running = True
+        self.output_thread = threading.Thread(target=self._output_loop, daemon=True)
+        self.output_thread.start()
+        print(f"✅ Bus de mezcla activo: bloques de {AUDIO_BUFFER_SIZE} frames")
+    
+    def _output_loop(self):
+        """
+        Loop de salida: mantiene el canal reservado con un bloque sonando
+        y otro en cola (la cola de pygame encadena los bloques sin huecos)
+        """
+        poll_interval = AUDIO_BUFFER_SIZE / SAMPLE_RATE / 4
+        error_reported = False
+        
+        while self.output_running:
+            channel = self.output_channel
+            try:
+                if not channel.get_busy():
+                    channel.play(self._next_output_block())
+                elif channel.get_queue() is None:
+                    channel.queue(self._next_output_block())
+                else:
+                    time.sleep(poll_interval)
+            except Exception as e:
+                # Un error en el render no debe callar el audio: reportar una
+                # vez y seguir con el próximo bloque
+                self.output_errors += 1
+                if not error_reported:
+                    print(f"⚠️ Error en el bus de mezcla ({e}), bloque en silencio")
+                    error_reported = True
+                try:
+                    if channel.get_queue() is None:
+                        channel.queue(self._silence)
+                except Exception:
+                    pass
+                time.sleep(poll_interval)
+    
+    def _next_output_block(self):
+        """Renderizar el próximo bloque en el Sound libre de la ronda (sin crear Sounds)"""
+        self.audio_clock.update(self.mix_bus.frame_position, time.monotonic_ns())
+        index = self._output_index
+        np.copyto(self._output_buffers[index], self.mix_bus.render_block())
+        self._output_index = (index + 1) % len(self._output_sounds)
+        return self._output_sounds[index]
+    
+    def get_lookahead_ns(self):
+        """
+        Anticipación con la que el secuenciador puede agendar disparos
+        
+        Returns:
+            Nanosegundos (0 = sin agenda: disparar en el momento)
+        """
+        if self.mix_bus is None or not self.audio_clock.locked:
+            return 0
+        return int(LOOKAHEAD_BLOCKS * AUDIO_BUFFER_SIZE * 1e9 / SAMPLE_RATE)
+    
+    def play_sample(self, instrument_id, volume=None, at_ns=None):
         """
         Reproducir un instrumento con procesamiento de audio
         
         Args:
             instrument_id: ID del instrumento (0-7)
             volume: Volumen específico (0.0-1.0), None usa el volumen del instrumento
+            at_ns: Instante (monotonic_ns) en el que debe sonar, None = ya
+                   (solo con bus de mezcla; ver get_lookahead_ns)
         """
-        if instrument_id not in self.samples or self.samples[instrument_id] is None:
+        if self.sample_data.get(instrument_id) is None:
             return
         
         # Calcular volumen final
@@ -78,15 +640,22 @@ class AudioEngine:
         
         final_volume = volume * self.master_volume
         
+        # Bus de mezcla: el procesamiento se hace por bloque sobre la suma
+        if self.mix_bus is not None:
+            frame = None if at_ns is None else self.audio_clock.frame_at(at_ns)
+            self.mix_bus.trigger(instrument_id, final_volume, frame)
+            return
+        
         # Obtener sample original
-        original_sound = self.samples[instrument_id]
+        original_sound = self._get_sound(instrument_id)
         
         # Procesar con AudioProcessor (aplica ganancia y limitador)
         try:
             processed_sound = self.processor.process_sample(
                 original_sound,
                 final_volume,
-                gain=1.0
+                gain=1.0,
+                cache_key=instrument_id
             )
             processed_sound.play()
         except Exception as e:
@@ -124,11 +693,23 @@ class AudioEngine:
         return 0.0
     
     def stop_all(self):
-        """Detener todos los sonidos"""
-        pygame.mixer.stop()
+        """
+        Detener todos los sonidos
+        
+        Con bus de mezcla solo se silencian las voces: el canal de salida
+        sigue encadenando bloques (y el AudioClock no pierde el enganche).
+        """
+        if self.mix_bus is not None:
+            self.mix_bus.clear()
+        else:
+            pygame.mixer.stop()
     
     def cleanup(self):
         """Limpiar recursos de audio"""
-        self.stop_all()
+        self.output_running = False
+        if self.output_thread:
+            self.output_thread.join(timeout=1.0)
+        if self.mix_bus is not None:
+            self.mix_bus.clear()
+        pygame.mixer.stop()
         pygame.mixer.quit()
-
@@ -3,8 +3,18 @@ Sistema de procesamiento de audio para la Drum Machine
 Permite control fino de volumen, ganancia, limitador y futuros efectos
 """
 
+import math
+from collections import OrderedDict
+
 import numpy as np
-import pygame
+try:
+    import pygame
+except ImportError:
+    pygame = None  # Solo process_block disponible (render offline)
+
+from .config import (
+    PROCESSED_CACHE_MAX_BYTES, PROCESSED_CACHE_GAIN_STEP_DB, BPM_DEFAULT, BPM_MIN, AUDIO_BUFFER_SIZE
+)
 
 try:
     from features.effects_manager import EffectsManager
@@ -17,23 +27,36 @@ except ImportError:
 class AudioProcessor:
     """Procesador de audio optimizado con ganancia, limitador y efectos"""
     
-    def __init__(self):
-        """Inicializar procesador de audio optimizado"""
+    def __init__(self, cache_max_bytes=PROCESSED_CACHE_MAX_BYTES):
+        """
+        Inicializar procesador de audio optimizado
+        
+        Args:
+            cache_max_bytes: Presupuesto de memoria del cache de samples procesados
+        """
         self.master_gain = 2.0
         self.limiter_threshold = 0.95
         self.limiter_enabled = True
         
         # Effects manager optimizado
         if EFFECTS_AVAILABLE:
-            self.effects = EffectsManager(sample_rate=44100)
+            self.effects = EffectsManager(sample_rate=44100, bpm=BPM_DEFAULT, min_bpm=BPM_MIN,
+                                          block_size=AUDIO_BUFFER_SIZE)
             print("✅ AudioProcessor + EffectsManager (Compresor + Reverb) inicializados")
         else:
             self.effects = None
             print("⚠️ AudioProcessor sin efectos")
         
-        # Cache para optimización
-        self._last_processed_shape = None
-        self._processing_cache = {}
+        # Cache LRU de Sounds procesados: (instrumento, ganancia cuantizada, snapshot efectos) -> Sound
+        self.cache_max_bytes = cache_max_bytes
+        self._processed_cache = OrderedDict()
+        self._processed_cache_bytes = 0
+        self._cache_params_version = None
+        # Samples demasiado largos para procesar por golpe: cache_key -> Sound
+        # (no dependen de los efectos, así que sobreviven a clear_cache)
+        self._long_samples = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
     
     def apply_gain(self, audio_data, gain):
         """
@@ -77,15 +100,73 @@ class AudioProcessor:
         """
         return np.clip(audio_data, -threshold, threshold)
     
-    def process_sample(self, sound, volume, gain=1.0):
+    def _quantize_gain(self, total_gain):
+        """
+        Cuantizar ganancia en pasos de PROCESSED_CACHE_GAIN_STEP_DB
+        
+        Args:
+            total_gain: Ganancia lineal (> 0)
+            
+        Returns:
+            Tupla (índice de paso, ganancia lineal cuantizada)
+        """
+        step = int(round(20.0 * math.log10(total_gain) / PROCESSED_CACHE_GAIN_STEP_DB))
+        return step, 10.0 ** (step * PROCESSED_CACHE_GAIN_STEP_DB / 20.0)
+    
+    def _check_cache_version(self):
+        """Vaciar el cache si cambiaron los parámetros del EffectsManager"""
+        version = self.effects.params_version
+        if version != self._cache_params_version:
+            self.clear_cache()
+            self._cache_params_version = version
+    
+    def _cache_store(self, key, processed_sound, nbytes):
+        """Guardar un Sound procesado respetando el presupuesto de memoria (LRU)"""
+        if nbytes > self.cache_max_bytes:
+            return
+        
+        self._processed_cache[key] = (processed_sound, nbytes)
+        self._processed_cache_bytes += nbytes
+        
+        # Desalojar los menos usados recientemente
+        while self._processed_cache_bytes > self.cache_max_bytes:
+            _, (_, evicted_bytes) = self._processed_cache.popitem(last=False)
+            self._processed_cache_bytes -= evicted_bytes
+    
+    def clear_cache(self):
+        """Vaciar el cache de samples procesados"""
+        self._processed_cache.clear()
+        self._processed_cache_bytes = 0
+    
+    def get_cache_stats(self):
+        """
+        Obtener estadísticas del cache de samples procesados
+        
+        Returns:
+            Dict con entradas, bytes usados, presupuesto, hits y misses
+        """
+        return {
+            'entries': len(self._processed_cache),
+            'bytes': self._processed_cache_bytes,
+            'max_bytes': self.cache_max_bytes,
+            'hits': self.cache_hits,
+            'misses': self.cache_misses
+        }
+    
+    def process_sample(self, sound, volume, gain=1.0, cache_key=None):
         """
         Procesar un sample antes de reproducirlo (ultra optimizado)
         Aplica volumen, ganancia, limitador y efectos
         
+        Con cache_key, el resultado se guarda en un cache LRU indexado por
+        (cache_key, ganancia cuantizada, snapshot de efectos), así que los
+        golpes repetidos no vuelven a procesar el audio.
+        
         Args:
             sound: pygame.mixer.Sound object
             volume: Volumen (0.0-1.0)
             gain: Ganancia adicional (default 1.0)
+            cache_key: Identificador del sample (ej. ID de instrumento), None = sin cache
             
         Returns:
             Sound procesado listo para reproducir
@@ -98,17 +179,36 @@ class AudioProcessor:
             sound.set_volume(min(1.0, total_gain))
             return sound
         
-        # Si no hay efectos activos, usar procesamiento simple
-        if not self.effects or not self.effects.has_active_effects():
+        # Si no hay efectos por golpe activos, usar procesamiento simple
+        if not self.effects or not self.effects.has_hit_effects():
             sound.set_volume(min(1.0, total_gain))
             return sound
         
+        # Buscar en cache (la ganancia cuantizada es la que se renderiza)
+        key = None
+        if cache_key is not None:
+            self._check_cache_version()
+            gain_step, total_gain = self._quantize_gain(total_gain)
+            if self._long_samples.get(cache_key) is sound:
+                sound.set_volume(min(1.0, total_gain))
+                return sound
+            key = (cache_key, gain_step, self.effects.get_parameter_snapshot())
+            cached = self._processed_cache.get(key)
+            if cached is not None:
+                self._processed_cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached[0]
+            self.cache_misses += 1
+        
         # Obtener datos del sample como array numpy
         try:
             sound_array = pygame.sndarray.array(sound)
             
             # Verificar tamaño del sample para evitar procesar samples muy largos
             if len(sound_array) > 44100:  # Más de 1 segundo
+                if cache_key is not None:
+                    # Recordar la decisión: el próximo golpe no vuelve a copiar el sample
+                    self._long_samples[cache_key] = sound
                 sound.set_volume(min(1.0, total_gain))
                 return sound
             
@@ -132,7 +232,7 @@ class AudioProcessor:
                 processed = np.clip(processed, -1.0, 1.0)
             
             # Aplicar efectos master si están disponibles y activos
-            if self.effects and self.effects.has_active_effects():
+            if self.effects and self.effects.has_hit_effects():
                 processed = self.effects.process(processed)
             
             # Convertir de vuelta a formato original - ultra optimizado
@@ -144,6 +244,9 @@ class AudioProcessor:
             # Crear nuevo Sound con audio procesado
             processed_sound = pygame.sndarray.make_sound(processed_int)
             
+            if key is not None:
+                self._cache_store(key, processed_sound, processed_int.nbytes)
+            
             return processed_sound
             
         except Exception as e:
@@ -152,6 +255,29 @@ class AudioProcessor:
             sound.set_volume(min(1.0, total_gain))
             return sound
     
+    def process_block(self, block):
+        """
+        Procesar un bloque de la mezcla master in-place
+        Aplica ganancia master, efectos y limitador una sola vez sobre la suma
+        
+        Args:
+            block: Array float32 (frames, 2) normalizado (-1.0 a 1.0)
+            
+        Returns:
+            El mismo bloque, procesado
+        """
+        np.multiply(block, self.master_gain, out=block)
+        
+        # Efectos master sobre la mezcla completa
+        if self.effects and self.effects.has_active_effects():
+            self.effects.process_block(block)
+        
+        # Limitador final
+        threshold = self.limiter_threshold if self.limiter_enabled else 1.0
+        np.clip(block, -threshold, threshold, out=block)
+        
+        return block
+    
     def set_master_gain(self, gain):
         """
         Establecer ganancia master
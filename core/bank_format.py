@@ -0,0 +1,324 @@
+"""
+Formato binario del banco de patrones (.dpb)
+Un solo archivo con cabecera, índice y un registro por patrón: cualquier
+patrón se lee con un seek (o una vista de memmap) sin parsear los demás
+
+Estructura (little endian):
+    Cabecera  '<4sHHHBBII': magic 'DMPB', versión, slots, pasos, bytes por
+              máscara, instrumentos, offset del índice, offset de los datos
+    Índice    slots x '<II': offset y largo del registro (largo 0 = vacío)
+    Registro  '<HBBH': BPM, swing, flags, pasos; luego una máscara por paso
+              y bloques opcionales '<BH' (tipo, largo) + datos para datos
+              por paso futuros (velocity, probabilidad...). Un lector ignora
+              los tipos que no conoce y los conserva al re-escribir.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+from .config import NUM_STEPS, NUM_INSTRUMENTS, BPM_DEFAULT
+from .pattern import Pattern
+
+BANK_MAGIC = b'DMPB'
+BANK_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHHBBII')
+_INDEX_ENTRY = struct.Struct('<II')
+_RECORD = struct.Struct('<HBBH')
+_CHUNK = struct.Struct('<BH')
+
+
+def _mask_bytes(num_instruments):
+    """Bytes por máscara de paso"""
+    return (num_instruments + 7) // 8
+
+
+def encode_record(entry, num_instruments=NUM_INSTRUMENTS):
+    """
+    Codificar una entrada del banco
+    
+    Args:
+        entry: dict {'pattern', 'bpm', 'swing', opcional 'extra': {tipo: bytes}}
+    
+    Returns:
+        bytes del registro
+    """
+    pattern = entry['pattern']
+    width = _mask_bytes(num_instruments)
+    if width == 1:
+        masks = bytes(pattern.masks)
+    else:
+        masks = b''.join(mask.to_bytes(width, 'little') for mask in pattern.masks)
+    parts = [_RECORD.pack(int(entry['bpm']), int(entry['swing']), 0, len(pattern.masks)), masks]
+    for chunk_type, data in sorted(entry.get('extra', {}).items()):
+        parts.append(_CHUNK.pack(chunk_type, len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def decode_record(data, num_steps=NUM_STEPS, num_instruments=NUM_INSTRUMENTS):
+    """
+    Decodificar un registro (bytes, memoryview o slice de mmap)
+    
+    Returns:
+        dict {'pattern', 'bpm', 'swing'} (+ 'extra' si trae bloques desconocidos)
+    """
+    bpm, swing, _, steps = _RECORD.unpack_from(data, 0)
+    width = _mask_bytes(num_instruments)
+    start = _RECORD.size
+    end = start + steps * width
+    if width == 1:
+        masks = data[start:end]
+    else:
+        masks = [int.from_bytes(data[i:i + width], 'little') for i in range(start, end, width)]
+    entry = {
+        'pattern': Pattern(num_steps, num_instruments, masks),
+        'bpm': bpm,
+        'swing': swing,
+    }
+    
+    # Bloques opcionales (datos por paso de versiones futuras)
+    extra = {}
+    position = end
+    while position + _CHUNK.size <= len(data):
+        chunk_type, length = _CHUNK.unpack_from(data, position)
+        position += _CHUNK.size
+        extra[chunk_type] = bytes(data[position:position + length])
+        position += length
+    if extra:
+        entry['extra'] = extra
+    return entry
+
+
+def encode_bank(entries, slot_count, num_steps=NUM_STEPS, num_instruments=NUM_INSTRUMENTS):
+    """
+    Codificar un banco completo
+    
+    Args:
+        entries: Iterable de (ID 1..slot_count, entrada o None)
+        slot_count: Cantidad de slots del índice
+    
+    Returns:
+        bytes del archivo
+    """
+    records = [b''] * slot_count
+    for pattern_id, entry in entries:
+        if entry is not None and 1 <= pattern_id <= slot_count:
+            records[pattern_id - 1] = encode_record(entry, num_instruments)
+    
+    index_offset = _HEADER.size
+    data_offset = index_offset + slot_count * _INDEX_ENTRY.size
+    header = _HEADER.pack(BANK_MAGIC, BANK_VERSION, slot_count, num_steps,
+                          _mask_bytes(num_instruments), num_instruments, index_offset, data_offset)
+    
+    index = []
+    offset = data_offset
+    for record in records:
+        index.append(_INDEX_ENTRY.pack(offset if record else 0, len(record)))
+        offset += len(record)
+    return b''.join([header] + index + records)
+
+
+class BankFile:
+    """
+    Lector de un banco .dpb con memmap
+    
+    Abrir solo lee cabecera e índice; cada patrón se decodifica al pedirlo
+    desde la vista del memmap (sin copiar el archivo a memoria).
+    """
+    
+    def __init__(self, path):
+        """
+        Abrir banco
+        
+        Args:
+            path: Ruta del .dpb
+        
+        Raises:
+            ValueError: Archivo que no es un banco o de una versión más nueva
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Archivo vacío: mmap no puede mapear 0 bytes
+            self._file.close()
+            raise ValueError(f"Banco vacío: {path}")
+        
+        try:
+            if len(self._map) < _HEADER.size:
+                raise ValueError(f"Banco truncado: {path}")
+            (magic, version, self.slot_count, self.num_steps, _, self.num_instruments,
+             index_offset, _) = _HEADER.unpack_from(self._map, 0)
+            if magic != BANK_MAGIC:
+                raise ValueError(f"No es un banco de patrones: {path}")
+            if version > BANK_VERSION:
+                raise ValueError(f"Versión de banco no soportada ({version}): {path}")
+            self.version = version
+            self.index = list(_INDEX_ENTRY.iter_unpack(
+                self._map[index_offset:index_offset + self.slot_count * _INDEX_ENTRY.size]))
+        except (ValueError, struct.error):
+            self.close()
+            raise
+    
+    def ids(self):
+        """IDs con patrón guardado"""
+        return [i + 1 for i, (_, length) in enumerate(self.index) if length]
+    
+    def read(self, pattern_id):
+        """
+        Leer un patrón (un acceso al memmap)
+        
+        Returns:
+            Entrada del banco o None si el slot está vacío
+        """
+        if not 1 <= pattern_id <= self.slot_count:
+            return None
+        offset, length = self.index[pattern_id - 1]
+        if not length:
+            return None
+        return decode_record(self._map[offset:offset + length], self.num_steps, self.num_instruments)
+    
+    def read_all(self):
+        """Leer todos los patrones: dict ID -> entrada"""
+        return {pattern_id: self.read(pattern_id) for pattern_id in self.ids()}
+    
+    def close(self):
+        """Cerrar memmap y archivo"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_json_pattern(path):
+    """
+    Leer un pattern_N.json (masks o el formato viejo de listas de bools)
+    
+    Returns:
+        Entrada del banco
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if 'masks' in data:
+        pattern = Pattern(NUM_STEPS, NUM_INSTRUMENTS, data['masks'])
+    else:
+        pattern = Pattern.from_rows(data.get('pattern', []), NUM_STEPS, NUM_INSTRUMENTS)
+    return {
+        'pattern': pattern,
+        'bpm': data.get('bpm', BPM_DEFAULT),
+        'swing': data.get('swing', 0),
+    }
+
+
+def import_json_dir(patterns_dir, slot_count):
+    """
+    Importar los pattern_N.json de un directorio
+    
+    Args:
+        patterns_dir: Directorio con los JSON
+        slot_count: Slots del banco (IDs fuera de rango se ignoran)
+    
+    Returns:
+        dict ID -> entrada
+    """
+    entries = {}
+    if not os.path.isdir(patterns_dir):
+        return entries
+    for filename in sorted(os.listdir(patterns_dir)):
+        name, ext = os.path.splitext(filename)
+        if ext != '.json' or not name.startswith('pattern_'):
+            continue
+        try:
+            pattern_id = int(name[len('pattern_'):])
+        except ValueError:
+            continue
+        if not 1 <= pattern_id <= slot_count:
+            continue
+        try:
+            entries[pattern_id] = read_json_pattern(os.path.join(patterns_dir, filename))
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error importando {filename}: {e}")
+    return entries
+
+
+def benchmark_load(count=256, directory=None):
+    """
+    Tiempo de carga de un banco de `count` patrones: JSON por archivo vs .dpb
+    
+    Args:
+        count: Cantidad de patrones
+        directory: Directorio de trabajo (None = temporal)
+    """
+    import random
+    import tempfile
+    import time
+    from .pattern_writer import write_atomic
+    
+    directory = directory or tempfile.mkdtemp(prefix='pattern_bank_')
+    rng = random.Random(1)
+    entries = {}
+    for pattern_id in range(1, count + 1):
+        masks = [rng.getrandbits(NUM_INSTRUMENTS) & rng.getrandbits(NUM_INSTRUMENTS) for _ in range(NUM_STEPS)]
+        entries[pattern_id] = {'pattern': Pattern(masks=masks), 'bpm': rng.randint(60, 200),
+                               'swing': rng.randint(0, 75)}
+    
+    # Formato anterior: un JSON con indent=2 por patrón
+    json_bytes = 0
+    for pattern_id, entry in entries.items():
+        data = {'pattern': entry['pattern'].to_rows(), 'bpm': entry['bpm'], 'swing': entry['swing']}
+        path = os.path.join(directory, f'pattern_{pattern_id}.json')
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+        json_bytes += os.path.getsize(path)
+    
+    bank_path = os.path.join(directory, 'bank.dpb')
+    start = time.perf_counter()
+    write_atomic(bank_path, encode_bank(entries.items(), count))
+    write_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    imported = import_json_dir(directory, count)
+    json_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    with BankFile(bank_path) as bank:
+        loaded = bank.read_all()
+    bank_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    with BankFile(bank_path) as bank:
+        single = bank.read(count // 2)
+    single_ms = (time.perf_counter() - start) * 1000
+    
+    assert imported[1]['pattern'] == loaded[1]['pattern'] == entries[1]['pattern']
+    assert single['pattern'] == entries[count // 2]['pattern']
+    print(f"Banco de {count} patrones:")
+    print(f"  JSON (un archivo por patrón): {json_ms:8.2f} ms, {json_bytes / 1024:8.1f} KB")
+    print(f"  .dpb read_all:                {bank_ms:8.2f} ms, {os.path.getsize(bank_path) / 1024:8.1f} KB"
+          f" (escritura atómica {write_ms:.2f} ms)")
+    print(f"  .dpb abrir + 1 patrón:        {single_ms:8.3f} ms")
+
+
+# Test del módulo
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) == 4 and sys.argv[1] == 'import':
+        # python -m core.bank_format import data/patterns data/patterns/bank.dpb
+        from .config import MAX_PATTERNS
+        from .pattern_writer import write_atomic
+        imported = import_json_dir(sys.argv[2], MAX_PATTERNS)
+        write_atomic(sys.argv[3], encode_bank(imported.items(), MAX_PATTERNS))
+        print(f"{len(imported)} patrones importados a {sys.argv[3]}")
+    else:
+        benchmark_load()
@@ -40,15 +40,35 @@ NUM_INSTRUMENTS = len(INSTRUMENTS)
 # Configuración de audio
 SAMPLE_RATE = 44100
 AUDIO_BUFFER_SIZE = 512  # Buffer bajo para latencia mínima
-AUDIO_CHANNELS = 8       # Permitir 8 sonidos simultáneos
+AUDIO_CHANNELS = 8       # Canales de pygame (modo un Sound por golpe)
+MIX_BUS_ENABLED = True   # Mezclar por bloques en float32 (False = un Sound por golpe)
+LOOKAHEAD_BLOCKS = 3     # Bloques de anticipación del secuenciador (disparos con offset exacto de frame)
+MIDI_CLOCK_OFFSET_MS = 0.0  # Corrimiento de los ticks y notas MIDI respecto de la grilla (compensar latencia)
+MIDI_NOTE_GATE_MS = 50.0    # Duración de las notas MIDI del secuenciador (note-off agendado)
+MIDI_CLOCK_SLAVE = False    # Seguir el MIDI clock/Start/Stop de un DAW (modo esclavo)
+MIDI_IN_PORT = None         # Puerto de entrada del clock externo (None = primero disponible)
+
+# Asignación de voces del bus de mezcla
+MAX_VOICES = 16                                  # Polifonía total del bus
+INSTRUMENT_POLYPHONY = [2, 2, 2, 2, 2, 2, 3, 3]  # Voces por instrumento (kick ... ride)
+CHOKE_GROUPS = {2: (3,)}                         # Instrumento: instrumentos que corta (CHH corta OHH)
+VOICE_STEAL_POLICY = 'oldest'                    # 'oldest' o 'quietest'
+VOICE_FADE_FRAMES = 64                           # Fade-out al cortar/robar una voz (evita clicks)
+VOICE_SILENCE_DB = -72.0                         # Colas por debajo de este nivel se descartan
+
+# Cache de samples procesados (AudioProcessor)
+PROCESSED_CACHE_MAX_BYTES = 16 * 1024 * 1024  # Presupuesto de memoria LRU (16 MB)
+PROCESSED_CACHE_GAIN_STEP_DB = 0.5            # Cuantización de ganancia para la clave del cache
 
 # ===== CONSTANTES DEL SECUENCIADOR =====
 
 NUM_STEPS = 32           # 32 pasos en el secuenciador (expandido)
+STEPS_PER_BAR = 16       # Pasos por compás (4/4 en semicorcheas): los cambios de patrón en play esperan al compás
 BPM_MIN = 60
 BPM_MAX = 200
 BPM_DEFAULT = 120
 SWING_MAX = 75           # Swing máximo en porcentaje
+STEP_LATE_SKIP = 0.5     # Pasos que llegan más tarde que esta fracción de paso se saltean (y se cuentan)
 
 # ===== CONSTANTES DE POTENCIÓMETROS =====
 
@@ -98,11 +118,19 @@ BTN_MUTE = 15           # Simple: Mute paso | Doble: Solo | Hold+1-8: Mute globa
 
 SAMPLES_DIR = 'data/samples'
 PATTERNS_DIR = 'data/patterns'
-MAX_PATTERNS = 8
+PATTERN_BANK_FILE = 'bank.dpb'  # Banco binario dentro de PATTERNS_DIR (ver core/bank_format.py)
+MAX_PATTERNS = 256  # Slots del banco
+
+# ===== CACHE DE SAMPLES PREPARADOS =====
+
+SAMPLE_CACHE_DIR = 'data/cache/samples'  # .npy int16 estéreo 44.1 kHz (clave: hash del WAV)
+SAMPLE_CACHE_ENABLED = True
+SAMPLE_SILENCE_THRESHOLD = 8             # Amplitud int16 bajo la cual se recorta silencio (~-72 dBFS)
 
 # ===== TIMING =====
 
 MAIN_LOOP_FPS = 60       # FPS del loop principal
+DISPLAY_FPS = 60         # Refresco de la matriz LED (thread de DisplayService)
 DEBOUNCE_TIME = 0.02     # 20ms debounce para botones
 
 # ===== SISTEMA DE VISTAS =====
@@ -110,6 +138,7 @@ DEBOUNCE_TIME = 0.02     # 20ms debounce para botones
 VIEW_TIMEOUT = 1.0       # Segundos antes de volver a vista SEQUENCER
 VIEW_INACTIVITY_TIMEOUT = 3.0  # Segundos de inactividad para forzar SEQUENCER
 ANIMATION_FPS = 10       # FPS para animaciones de vistas
+VIEW_FRAME_CACHE_SIZE = 64  # Frames memorizados de vistas de valor (BPM, VOL, ...)
 
 # ===== DETECCIÓN DE EVENTOS DE BOTONES =====
 
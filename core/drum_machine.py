@@ -14,14 +14,16 @@ from .config import (
     POT_VOL_DRUMS, POT_VOL_HATS, POT_VOL_TOMS, POT_VOL_CYMS,
     MAIN_LOOP_FPS, BPM_MIN, BPM_MAX, NUM_INSTRUMENTS, INSTRUMENTS,
     MAX_PATTERNS, DOUBLE_CLICK_TIME, HOLD_TIME, LONG_HOLD_TIME,
-    VIEW_TIMEOUT, VIEW_INACTIVITY_TIMEOUT, NUM_STEPS
+    VIEW_TIMEOUT, VIEW_INACTIVITY_TIMEOUT, NUM_STEPS, MIDI_CLOCK_SLAVE, MIDI_IN_PORT
 )
 
 from .audio_engine import AudioEngine
 from .sequencer import Sequencer
-from hardware import ButtonMatrix, LEDMatrix, ADCReader, LEDController
+from hardware import ButtonMatrix, LEDMatrix, DisplayService, ADCReader, LEDController
 from ui import ViewManager, ViewType, ButtonHandler
 from features import TapTempo, MIDIHandler, BluetoothAudio
+from features.effects_manager import REVERB_PRESETS, DELAY_DIVISIONS
+from features.midi_clock import MIDIClockFollower
 
 
 class DrumMachine:
@@ -93,11 +95,22 @@ class DrumMachine:
                 hold_time=HOLD_TIME
             )
             
-            # MIDI Handler (opcional)
+            # Clock MIDI externo (opcional, modo esclavo)
+            self.midi_clock_in = None
+            if MIDI_CLOCK_SLAVE:
+                follower = MIDIClockFollower(self.sequencer, port_name=MIDI_IN_PORT)
+                if follower.enabled:
+                    self.midi_clock_in = follower
+                    self.sequencer.set_external_clock(follower)
+                    print("✓ Modo esclavo: siguiendo MIDI clock externo")
+            
+            # MIDI Handler (opcional; en modo esclavo sin clock de salida)
             try:
-                self.midi = MIDIHandler(enable_clock=True, enable_notes=True)
+                send_clock = self.midi_clock_in is None
+                self.midi = MIDIHandler(enable_clock=send_clock, enable_notes=True)
                 if self.midi.enabled:
-                    print("✓ MIDI Output habilitado")
+                    self.sequencer.attach_midi(self.midi)
+                    print("✓ MIDI Output habilitado" + (" (clock 24 PPQN)" if send_clock else " (sin clock)"))
                 else:
                     self.midi = None
             except Exception as e:
@@ -138,10 +151,14 @@ class DrumMachine:
             time.sleep(0.5)
             self.view_manager.show_view(ViewType.SEQUENCER)
             
+            # Desde acá el SPI de la matriz lo escribe el thread del display
+            self.display = DisplayService(self.led_matrix)
+            self.display.start()
+            
             # Test de LEDs
             print("\nProbando LEDs indicadores...")
             self.led_controller.test_sequence()
-            
+        
         except Exception as e:
             print(f"\n✗ Error inicializando componentes: {e}")
             raise
@@ -202,7 +219,7 @@ class DrumMachine:
         
         # BTN 8: PLAY/STOP → Doble click: Reset a paso 0
         if button_id == BTN_PLAY_STOP:
-            self.sequencer.current_step = 0
+            self.sequencer.reset_position()
             print("Secuenciador reseteado a paso 0")
         
         # BTN 11: PATTERN_NEXT → Doble click: Activar Tap Tempo
@@ -326,9 +343,9 @@ class DrumMachine:
             if instrument_id not in self.muted_instruments:
                 self.audio_engine.play_sample(instrument_id)
                 
-                # MIDI note out
-                if self.midi and self.midi.enabled:
-                    self.midi.send_note_on(INSTRUMENTS[instrument_id], velocity=127)
+                # MIDI note out (note-off agendado por el emisor de notas)
+                if self.sequencer.midi_notes:
+                    self.sequencer.midi_notes.note_on(instrument_id)
             
             # LED azul parpadea
             self.led_controller.pulse_led('blue', 0.1)
@@ -385,15 +402,9 @@ class DrumMachine:
     
     def _handle_play_stop(self):
         """Play/Stop secuenciador"""
+        # MIDI Start/Stop y clock los emite el secuenciador (attach_midi)
         self.sequencer.toggle_play()
         
-        # MIDI start/stop
-        if self.midi and self.midi.enabled:
-            if self.sequencer.is_playing:
-                self.midi.send_start()
-            else:
-                self.midi.send_stop()
-        
         self._update_playing_led()
         print(f"Secuenciador: {'PLAY' if self.sequencer.is_playing else 'STOP'}")
     
@@ -410,30 +421,26 @@ class DrumMachine:
     
     def _handle_pattern_change(self, direction):
         """Cambiar patrón (direction: -1 o +1)"""
-        if direction < 0:
-            # Patrón anterior
-            new_pattern = ((self.sequencer.current_pattern_id - 2) % MAX_PATTERNS) + 1
-        else:
-            # Patrón siguiente
-            new_pattern = (self.sequencer.current_pattern_id % MAX_PATTERNS) + 1
+        # Desde el que está en cola (scroll rápido), solo por patrones guardados + uno vacío
+        new_pattern = self.sequencer.bank.neighbor(self.sequencer.target_pattern_id, direction)
         
-        # Intentar cargar, si no existe, crear nuevo
-        if not self.sequencer.load_pattern(new_pattern):
-            self.sequencer.current_pattern_id = new_pattern
-            self.sequencer.clear_pattern()
+        # Banco en memoria: inmediato si está parado, en el próximo compás si suena
+        # (un patrón vacío arranca uno nuevo)
+        queued = self.sequencer.select_pattern(new_pattern)
+        entry = self.sequencer.bank.get(new_pattern)
         
         # Mostrar vista PATTERN detallada
         self.view_manager.show_view(
             ViewType.PATTERN,
             {
                 'pattern_num': new_pattern,
-                'bpm': self.sequencer.bpm,
+                'bpm': entry['bpm'] if entry else self.sequencer.bpm,
                 'steps': NUM_STEPS
             },
             duration=2.0
         )
         
-        print(f"Patrón: {new_pattern}")
+        print(f"Patrón: {new_pattern}" + (" (en el próximo compás)" if queued else ""))
     
     def _handle_clear_step(self):
         """Limpiar paso actual"""
@@ -444,14 +451,12 @@ class DrumMachine:
     def _handle_save(self):
         """Guardar patrón actual"""
         if self.sequencer.save_pattern():
-            print(f"✓ Patrón {self.sequencer.current_pattern_id} guardado")
-            # Mostrar vista de guardado
+            # Mostrar vista de guardado (la confirmación de disco llega en _poll_saves)
             self.view_manager.show_view(
                 ViewType.SAVE,
                 {'pattern_num': self.sequencer.current_pattern_id},
                 duration=1.5
             )
-            self.led_controller.pulse_led('white', 0.5)
         else:
             print("✗ Error guardando patrón")
     
@@ -472,6 +477,18 @@ class DrumMachine:
             print(f"Paso pegado en {self.selected_step}")
             self.led_controller.pulse_led('green', 0.2)
     
+    def _poll_saves(self):
+        """Confirmar los guardados que terminó el worker de persistencia"""
+        for result in self.sequencer.poll_saves():
+            # Una escritura del banco puede cubrir varios guardados seguidos
+            patterns = ", ".join(str(tag) for tag in result['tags'])
+            if result['ok']:
+                print(f"✓ Patrón {patterns} guardado ({result['write_ms']:.1f} ms)")
+                self.led_controller.pulse_led('white', 0.5)
+            else:
+                print(f"✗ Error guardando patrón {patterns}: {result['error']}")
+                self.led_controller.pulse_led('red', 0.5)
+    
     # ===== CONTROL DE LEDS =====
     
     def _update_mode_leds(self):
@@ -556,6 +573,50 @@ class DrumMachine:
                             ViewType.EFFECT_INTENSITY,
                             {'intensity': intensity}
                         )
+                    elif max_change_idx == 3:  # Pot 3: Reverb (envío)
+                        reverb_mix = values[3] * 100
+                        effects.set_reverb_mix(reverb_mix)
+                        print(f"🎛️ Reverb: {reverb_mix:.1f}%")
+                        self.view_manager.show_view(
+                            ViewType.EFFECT_REVERB,
+                            {'reverb_mix': reverb_mix}
+                        )
+                    elif max_change_idx == 4:  # Pot 4: Preset de reverb
+                        presets = list(REVERB_PRESETS)
+                        preset = presets[min(int(values[4] * len(presets)), len(presets) - 1)]
+                        if preset != effects.reverb_preset:
+                            effects.set_reverb_preset(preset)
+                            print(f"🎛️ Reverb preset: {preset}")
+                        self.view_manager.show_view(
+                            ViewType.EFFECT_REVERB_PRESET,
+                            {'label': REVERB_PRESETS[preset]['label']}
+                        )
+                    elif max_change_idx == 5:  # Pot 5: Feedback del delay
+                        feedback = values[5] * 100
+                        effects.set_delay_feedback(feedback)
+                        print(f"🎛️ Delay feedback: {feedback:.1f}%")
+                        self.view_manager.show_view(
+                            ViewType.EFFECT_DELAY_FEEDBACK,
+                            {'feedback': feedback}
+                        )
+                    elif max_change_idx == 6:  # Pot 6: Delay (envío)
+                        delay_mix = values[6] * 100
+                        effects.set_delay_mix(delay_mix)
+                        print(f"🎛️ Delay: {delay_mix:.1f}%")
+                        self.view_manager.show_view(
+                            ViewType.EFFECT_DELAY,
+                            {'delay_mix': delay_mix}
+                        )
+                    elif max_change_idx == 7:  # Pot 7: División del delay
+                        divisions = list(DELAY_DIVISIONS)
+                        division = divisions[min(int(values[7] * len(divisions)), len(divisions) - 1)]
+                        if division != effects.delay_division:
+                            effects.set_delay_division(division)
+                            print(f"🎛️ Delay división: {division}")
+                        self.view_manager.show_view(
+                            ViewType.EFFECT_DELAY_DIVISION,
+                            {'label': DELAY_DIVISIONS[division][1]}
+                        )
                 
                 # Actualizar valores de referencia
                 self._last_effects_values = values_array.copy()
@@ -570,10 +631,10 @@ class DrumMachine:
             self.selected_step = new_selected_step
             self.view_manager.register_interaction()
         
-        # POT_TEMPO (1): BPM
+        # POT_TEMPO (1): BPM (ignorado mientras manda un clock MIDI externo)
         tempo_value = values[POT_TEMPO]
         new_bpm = int(BPM_MIN + tempo_value * (BPM_MAX - BPM_MIN))
-        if abs(new_bpm - self.sequencer.bpm) > 2:
+        if abs(new_bpm - self.sequencer.bpm) > 2 and not self.sequencer.external_tempo:
             self.sequencer.set_bpm(new_bpm)
             # Trigger vista BPM
             self.view_manager.show_view(
@@ -696,11 +757,22 @@ class DrumMachine:
                     self._read_potentiometers()
                     pot_update_counter = 0
                 
+                # Guardados terminados en segundo plano
+                self._poll_saves()
+                
+                # Clock externo: Start/Stop/Continue del DAW y BPM estimado al
+                # enganchar/perder enganche
+                if self.midi_clock_in:
+                    self.midi_clock_in.poll_transport()
+                if self.midi_clock_in and self.midi_clock_in.poll_lock_change():
+                    self.view_manager.show_view(ViewType.BPM, {'bpm': self.sequencer.bpm})
+                
                 # Actualizar vista manager (timeouts)
                 self.view_manager.update()
                 
-                # Renderizar vista actual
-                self.view_manager.render(
+                # Renderizar vista actual (solo dibuja y publica; el SPI va en otro thread)
+                self.display.render(
+                    self.view_manager.render,
                     self.led_matrix,
                     self.sequencer,
                     self.selected_step
@@ -734,6 +806,9 @@ class DrumMachine:
         if hasattr(self, 'midi') and self.midi:
             self.midi.cleanup()
         
+        if getattr(self, 'midi_clock_in', None):
+            self.midi_clock_in.close()
+        
         if hasattr(self, 'bluetooth') and self.bluetooth:
             if self.bluetooth.is_connected():
                 print("Desconectando Bluetooth...")
@@ -742,6 +817,13 @@ class DrumMachine:
         if hasattr(self, 'led_controller'):
             self.led_controller.cleanup()
         
+        if hasattr(self, 'display'):
+            self.display.stop()
+            stats = self.display.get_stats()
+            print(f"Display: render medio {stats['render_mean_ms']:.3f} ms (máx {stats['render_max_ms']:.3f}), "
+                  f"flush medio {stats['flush_mean_ms']:.3f} ms (máx {stats['flush_max_ms']:.3f}), "
+                  f"{stats['frames_flushed']} frames escritos")
+        
         if hasattr(self, 'led_matrix'):
             self.led_matrix.cleanup()
         
@@ -0,0 +1,187 @@
+"""
+Render offline de patrones a WAV
+Reproduce patrones del secuenciador sobre el bus de mezcla sin pygame,
+GPIO ni placa de sonido, tan rápido como permita la CPU
+"""
+
+import os
+import time
+import wave
+
+import numpy as np
+
+from .config import (
+    INSTRUMENTS, SAMPLES_DIR, SAMPLE_RATE, AUDIO_BUFFER_SIZE, NUM_STEPS,
+    NUM_INSTRUMENTS, MASTER_VOLUME_DEFAULT, INSTRUMENT_VOLUME_DEFAULT, AUDIO_GAIN_BOOST,
+    SAMPLE_CACHE_DIR
+)
+from .audio_engine import MixBus
+from .audio_processor import AudioProcessor
+from .sample_cache import SampleCache
+from .sequencer import Sequencer
+
+
+def write_wav(path, audio, sample_rate=SAMPLE_RATE):
+    """
+    Guardar audio int16 estéreo como WAV de 16 bits
+    
+    Args:
+        path: Ruta de salida
+        audio: Array int16 (frames, 2)
+        sample_rate: Frecuencia de muestreo
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.ascontiguousarray(audio, dtype='<i2').tobytes())
+
+
+class OfflineRenderer:
+    """Renderizador offline: secuenciador + bus de mezcla + efectos sin tiempo real"""
+    
+    def __init__(self, samples_dir=SAMPLES_DIR, sample_rate=SAMPLE_RATE,
+                 block_size=AUDIO_BUFFER_SIZE, master_volume=MASTER_VOLUME_DEFAULT,
+                 instrument_volumes=None, cache_dir=SAMPLE_CACHE_DIR):
+        """
+        Inicializar renderizador
+        
+        Args:
+            samples_dir: Directorio con los samples (kick.wav, snare.wav, ...)
+            sample_rate: Frecuencia de muestreo
+            block_size: Tamaño de bloque del bus (el mismo que en vivo por defecto)
+            master_volume: Volumen master (0.0-1.0)
+            instrument_volumes: Lista de volúmenes por instrumento (None = por defecto)
+            cache_dir: Directorio del cache de samples preparados (compartido con el motor)
+        """
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.master_volume = master_volume
+        self.instrument_volumes = list(instrument_volumes or [INSTRUMENT_VOLUME_DEFAULT] * NUM_INSTRUMENTS)
+        
+        # Misma cadena que AudioEngine: ganancia master, efectos y limitador por bloque
+        self.processor = AudioProcessor()
+        self.processor.set_master_gain(AUDIO_GAIN_BOOST)
+        self.effects = self.processor.effects
+        
+        # Mismos samples preparados que el motor en vivo (cache compartido)
+        self.mix_bus = MixBus(self.processor, block_size)
+        paths = {}
+        for i, instrument in enumerate(INSTRUMENTS):
+            sample_path = os.path.join(samples_dir, f"{instrument}.wav")
+            if os.path.exists(sample_path):
+                paths[i] = sample_path
+            else:
+                print(f"Advertencia: Sample no encontrado: {sample_path}")
+        
+        cache = SampleCache(cache_dir, sample_rate)
+        for i, data in zip(paths, cache.load_all(list(paths.values()))):
+            if data is not None:
+                self.mix_bus.set_sample(i, data)
+        
+        # Secuenciador sin motor de audio: solo datos de patrón y timing
+        self.sequencer = Sequencer(None)
+        
+        # Estadísticas del último render
+        self.last_stats = {}
+    
+    def _load(self, item):
+        """Cargar un patrón (ID guardado o dict con pattern/bpm/swing) en el secuenciador"""
+        if isinstance(item, dict):
+            self.sequencer.pattern = item['pattern']
+            self.sequencer.set_bpm(item.get('bpm', self.sequencer.bpm))
+            self.sequencer.set_swing(item.get('swing', 0))
+        elif not self.sequencer.load_pattern(item):
+            raise ValueError(f"No se pudo cargar el patrón {item}")
+    
+    def _schedule(self, patterns, loops):
+        """
+        Calcular el frame exacto de cada paso
+        
+        Returns:
+            Lista de (frame, bpm, instrumentos activos) y frame final del último paso
+        """
+        events = []
+        elapsed = 0.0
+        for item in patterns:
+            self._load(item)
+            pattern = self.sequencer.pattern
+            for _ in range(loops):
+                for step in range(NUM_STEPS):
+                    frame = int(round(elapsed * self.sample_rate))
+                    events.append((frame, self.sequencer.bpm, pattern.triggers[step]))
+                    elapsed += self.sequencer._calculate_step_delay(step)
+        return events, int(round(elapsed * self.sample_rate))
+    
+    def render(self, patterns, loops=1, tail_seconds=2.0):
+        """
+        Renderizar una cadena de patrones
+        
+        Args:
+            patterns: Lista de IDs de patrón guardados o dicts {'pattern', 'bpm', 'swing'}
+            loops: Repeticiones de cada patrón
+            tail_seconds: Segundos extra al final para las colas (reverb, delay)
+        
+        Returns:
+            Array int16 (frames, 2)
+        """
+        events, end_frame = self._schedule(patterns, loops)
+        total = end_frame + int(tail_seconds * self.sample_rate)
+        output = np.zeros((total, 2), dtype=np.int16)
+        
+        self.mix_bus.clear()
+        start_time = time.perf_counter()
+        
+        position = 0
+        next_event = 0
+        bpm = None
+        while position < total:
+            # Disparar los pasos que caen en la posición actual
+            while next_event < len(events) and events[next_event][0] <= position:
+                _, step_bpm, active = events[next_event]
+                if step_bpm != bpm and self.effects:
+                    bpm = step_bpm
+                    self.effects.set_tempo(bpm)
+                for instrument in active:
+                    volume = self.instrument_volumes[instrument] * self.master_volume
+                    self.mix_bus.trigger(instrument, volume)
+                next_event += 1
+            
+            # Bloque completo o bloque parcial hasta el próximo paso (precisión de muestra)
+            frames = min(self.block_size, total - position)
+            if next_event < len(events):
+                frames = min(frames, events[next_event][0] - position)
+            output[position:position + frames] = self.mix_bus.render_block(frames)
+            position += frames
+        
+        elapsed = time.perf_counter() - start_time
+        duration = total / self.sample_rate
+        self.last_stats = {
+            'frames': total,
+            'duration': duration,
+            'render_time': elapsed,
+            'realtime_factor': duration / elapsed if elapsed > 0 else float('inf'),
+            'steps': len(events),
+        }
+        return output
+    
+    def render_to_wav(self, path, patterns, loops=1, tail_seconds=2.0):
+        """
+        Renderizar una cadena de patrones y guardarla como WAV
+        
+        Args:
+            path: Ruta del WAV de salida
+            patterns: Lista de IDs de patrón o dicts (ver render)
+            loops: Repeticiones de cada patrón
+            tail_seconds: Segundos extra para las colas
+        
+        Returns:
+            Diccionario de estadísticas del render
+        """
+        audio = self.render(patterns, loops, tail_seconds)
+        write_wav(path, audio, self.sample_rate)
+        return self.last_stats
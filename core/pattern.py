@@ -0,0 +1,254 @@
+"""
+Patrón compacto de la Drum Machine
+Un entero por paso (bit i = instrumento i) y un entero por instrumento
+(bit n = paso n), con la tupla de instrumentos activos de cada paso
+precalculada para el loop de reproducción
+"""
+
+from .config import NUM_STEPS, NUM_INSTRUMENTS
+
+
+def _trigger_table(num_instruments):
+    """Tupla de instrumentos activos para cada máscara posible"""
+    return [tuple(i for i in range(num_instruments) if mask >> i & 1)
+            for mask in range(1 << num_instruments)]
+
+
+def _row_table(num_instruments):
+    """Fila de bools (vista compatible) para cada máscara posible"""
+    return [tuple(bool(mask >> i & 1) for i in range(num_instruments))
+            for mask in range(1 << num_instruments)]
+
+
+# Tablas compartidas por todos los patrones de 8 instrumentos (256 entradas)
+_TABLES = {NUM_INSTRUMENTS: (_trigger_table(NUM_INSTRUMENTS), _row_table(NUM_INSTRUMENTS))}
+
+
+class Pattern:
+    """
+    Patrón de pasos x instrumentos en bits
+    
+    - masks[paso]: instrumentos activos del paso (almacenamiento)
+    - lanes[instrumento]: pasos activos del instrumento (render LED por filas)
+    - triggers[paso]: tupla de IDs activos (loop de reproducción)
+    
+    toggle/set actualizan las tres vistas de forma incremental: el loop solo
+    recorre los golpes reales. triggers es una tupla inmutable que cada
+    edición reemplaza entera (copy-on-write): el thread de reproducción toma
+    la referencia una vez por paso y nunca ve un patrón a medio editar, sin
+    locks (mismo criterio que la línea de tiempo de StepClock).
+    pattern[paso][instrumento] sigue funcionando (devuelve una tupla de bools
+    de solo lectura) para el código existente.
+    """
+    
+    def __init__(self, num_steps=NUM_STEPS, num_instruments=NUM_INSTRUMENTS, masks=None):
+        """
+        Inicializar patrón
+        
+        Args:
+            num_steps: Cantidad de pasos
+            num_instruments: Cantidad de instrumentos (hasta 8: una máscara de 8 bits por paso)
+            masks: Máscaras por paso (None = patrón vacío)
+        """
+        if num_instruments not in _TABLES:
+            _TABLES[num_instruments] = (_trigger_table(num_instruments), _row_table(num_instruments))
+        self._trigger_table, self._row_table = _TABLES[num_instruments]
+        self.num_steps = num_steps
+        self.num_instruments = num_instruments
+        self._full = (1 << num_instruments) - 1
+        
+        self.masks = [0] * num_steps
+        if masks is not None:
+            for step, mask in enumerate(list(masks)[:num_steps]):
+                self.masks[step] = int(mask) & self._full
+        self._rebuild()
+    
+    @classmethod
+    def from_rows(cls, rows, num_steps=NUM_STEPS, num_instruments=NUM_INSTRUMENTS):
+        """
+        Crear desde el formato viejo (lista de pasos con listas de bools)
+        
+        Args:
+            rows: Lista [paso][instrumento] de bools (o un Pattern)
+        """
+        if isinstance(rows, Pattern):
+            return rows.copy()
+        masks = []
+        for row in rows:
+            mask = 0
+            for instrument, state in enumerate(row[:num_instruments]):
+                if state:
+                    mask |= 1 << instrument
+            masks.append(mask)
+        return cls(num_steps, num_instruments, masks)
+    
+    def _rebuild(self):
+        """Recalcular triggers y lanes desde las máscaras"""
+        lanes = [0] * self.num_instruments
+        for step, mask in enumerate(self.masks):
+            for instrument in self._trigger_table[mask]:
+                lanes[instrument] |= 1 << step
+        self.lanes = lanes
+        self._steps = [self._trigger_table[mask] for mask in self.masks]
+        # Publicación: una sola asignación de una tupla nueva
+        self.triggers = tuple(self._steps)
+    
+    def _valid(self, step, instrument):
+        """Verificar rango de paso e instrumento"""
+        return 0 <= step < self.num_steps and 0 <= instrument < self.num_instruments
+    
+    def get(self, step, instrument):
+        """Obtener estado de una nota"""
+        if not self._valid(step, instrument):
+            return False
+        return bool(self.masks[step] >> instrument & 1)
+    
+    def set(self, step, instrument, state):
+        """
+        Establecer estado de una nota (actualización incremental)
+        
+        Args:
+            step: Paso
+            instrument: ID del instrumento
+            state: True (activado) o False (desactivado)
+        """
+        state = bool(state)
+        if self._valid(step, instrument) and self.get(step, instrument) != state:
+            self._store(step, instrument, state)
+    
+    def _store(self, step, instrument, state):
+        """Escribir una nota en las tres vistas y publicar los triggers nuevos"""
+        bit = 1 << instrument
+        mask = self.masks[step] | bit if state else self.masks[step] & ~bit
+        self.masks[step] = mask
+        if state:
+            self.lanes[instrument] |= 1 << step
+        else:
+            self.lanes[instrument] &= ~(1 << step)
+        # Copy-on-write: el loop de reproducción ve la tupla vieja o la nueva, nunca una mezcla
+        self._steps[step] = self._trigger_table[mask]
+        self.triggers = tuple(self._steps)
+    
+    def toggle(self, step, instrument):
+        """
+        Invertir una nota
+        
+        Returns:
+            Nuevo estado (False si está fuera de rango)
+        """
+        if not self._valid(step, instrument):
+            return False
+        state = not self.get(step, instrument)
+        self._store(step, instrument, state)
+        return state
+    
+    def clear(self):
+        """Vaciar el patrón"""
+        self.masks = [0] * self.num_steps
+        self._rebuild()
+    
+    def copy(self):
+        """Copia independiente"""
+        return Pattern(self.num_steps, self.num_instruments, self.masks)
+    
+    def to_rows(self):
+        """Formato viejo: lista [paso][instrumento] de bools (mutable, independiente)"""
+        return [list(self._row_table[mask]) for mask in self.masks]
+    
+    def count(self):
+        """Cantidad total de golpes"""
+        return sum(len(hits) for hits in self.triggers)
+    
+    # Vista compatible con list[list[bool]] (solo lectura)
+    
+    def __getitem__(self, step):
+        return self._row_table[self.masks[step]]
+    
+    def __len__(self):
+        return self.num_steps
+    
+    def __iter__(self):
+        return (self._row_table[mask] for mask in self.masks)
+    
+    def __eq__(self, other):
+        if isinstance(other, Pattern):
+            return self.masks == other.masks and self.num_instruments == other.num_instruments
+        return NotImplemented
+    
+    def __repr__(self):
+        return f"Pattern({self.num_steps}x{self.num_instruments}, {self.count()} golpes)"
+
+
+def benchmark_hot_loop(density=0.25, iterations=20000):
+    """
+    Costo por paso del loop de reproducción, del render LED y de una edición:
+    list[list[bool]] vs Pattern
+    
+    Args:
+        density: Fracción de notas activas
+        iterations: Pasos a recorrer
+    """
+    import random
+    import timeit
+    
+    rng = random.Random(1)
+    rows = [[rng.random() < density for _ in range(NUM_INSTRUMENTS)] for _ in range(NUM_STEPS)]
+    pattern = Pattern.from_rows(rows)
+    hits = []
+    
+    def old_loop():
+        for n in range(iterations):
+            pattern_step = rows[n % NUM_STEPS]
+            for instrument in range(NUM_INSTRUMENTS):
+                if pattern_step[instrument]:
+                    hits.append(instrument)
+    
+    def new_loop():
+        for n in range(iterations):
+            for instrument in pattern.triggers[n % NUM_STEPS]:
+                hits.append(instrument)
+    
+    print(f"Benchmark de patrón ({pattern.count()} golpes en {NUM_STEPS} pasos):")
+    old = min(timeit.repeat(old_loop, number=1, repeat=5)) / iterations
+    new = min(timeit.repeat(new_loop, number=1, repeat=5)) / iterations
+    print(f"  Loop por paso: list[list[bool]] {old * 1e9:6.0f} ns, triggers {new * 1e9:6.0f} ns "
+          f"({old / new:.1f}x)")
+    
+    # Render del grid (solo el buffer, sin SPI)
+    reversed_byte = [int(f'{value:08b}'[::-1], 2) for value in range(256)]
+    
+    def old_render():
+        buffer = [[0] * 8 for _ in range(4)]
+        for step in range(NUM_STEPS):
+            for instrument in range(NUM_INSTRUMENTS):
+                if rows[step][instrument]:
+                    x = 31 - step
+                    buffer[x // 8][instrument] |= 1 << (x % 8)
+        return buffer
+    
+    def new_render():
+        buffer = [[0] * 8 for _ in range(4)]
+        for device_id in range(4):
+            shift = 8 * (3 - device_id)
+            for instrument in range(NUM_INSTRUMENTS):
+                buffer[device_id][instrument] = reversed_byte[(pattern.lanes[instrument] >> shift) & 0xFF]
+        return buffer
+    
+    assert old_render() == new_render()
+    old = min(timeit.repeat(old_render, number=1000, repeat=5)) / 1000
+    new = min(timeit.repeat(new_render, number=1000, repeat=5)) / 1000
+    print(f"  Render grid:   list[list[bool]] {old * 1e6:6.1f} us, lanes    {new * 1e6:6.1f} us "
+          f"({old / new:.1f}x)")
+
+    # Edición desde la UI (incluye publicar la tupla de triggers nueva)
+    def old_toggle():
+        rows[5][3] = not rows[5][3]
+    
+    old = min(timeit.repeat(old_toggle, number=100000, repeat=5)) / 100000
+    new = min(timeit.repeat(lambda: pattern.toggle(5, 3), number=100000, repeat=5)) / 100000
+    print(f"  Toggle:        list[list[bool]] {old * 1e9:6.0f} ns, Pattern  {new * 1e9:6.0f} ns")
+
+
+# Test del módulo
+if __name__ == "__main__":
+    benchmark_hot_loop()
@@ -0,0 +1,158 @@
+"""
+Banco de patrones en memoria
+Todos los patrones se leen una sola vez al arrancar desde el banco binario
+(bank.dpb); cambiar de patrón es un acceso a un dict y el disco solo se toca
+al guardar (en segundo plano si hay un PatternWriter)
+"""
+
+import os
+
+from .config import PATTERNS_DIR, PATTERN_BANK_FILE, MAX_PATTERNS, NUM_STEPS, NUM_INSTRUMENTS
+from .bank_format import BankFile, encode_bank, import_json_dir
+from .pattern_writer import write_atomic
+
+
+class PatternBank:
+    """Banco de patrones 1..max_patterns con su BPM y swing"""
+    
+    def __init__(self, patterns_dir=PATTERNS_DIR, max_patterns=MAX_PATTERNS, writer=None,
+                 bank_file=PATTERN_BANK_FILE):
+        """
+        Inicializar banco (vacío hasta load_all)
+        
+        Args:
+            patterns_dir: Directorio del banco (y de los pattern_N.json viejos)
+            max_patterns: Cantidad de patrones del banco
+            writer: PatternWriter para guardar en segundo plano (None = guardar en el acto)
+            bank_file: Nombre del archivo binario dentro de patterns_dir
+        """
+        self.patterns_dir = patterns_dir
+        self.max_patterns = max_patterns
+        self.writer = writer
+        self.path = os.path.join(patterns_dir, bank_file)
+        
+        # ID -> {'pattern': Pattern, 'bpm': int, 'swing': int} (None = vacío)
+        self.entries = {pattern_id: None for pattern_id in range(1, max_patterns + 1)}
+        
+        # Estadísticas
+        self.disk_reads = 0
+        self.disk_writes = 0
+    
+    def is_valid(self, pattern_id):
+        """Verificar que el ID esté en el banco"""
+        return pattern_id in self.entries
+    
+    def load_all(self):
+        """
+        Leer todos los patrones guardados (una vez, al arrancar)
+        
+        Sin bank.dpb se importan los pattern_N.json del directorio y se
+        escribe el banco (los JSON quedan como respaldo).
+        
+        Returns:
+            Cantidad de patrones cargados
+        """
+        loaded = 0
+        if os.path.exists(self.path):
+            try:
+                with BankFile(self.path) as bank:
+                    for pattern_id in bank.ids():
+                        if self.is_valid(pattern_id):
+                            self.entries[pattern_id] = bank.read(pattern_id)
+                            loaded += 1
+                self.disk_reads += 1
+            except (OSError, ValueError) as e:
+                print(f"Error cargando banco {self.path}: {e}")
+        else:
+            imported = import_json_dir(self.patterns_dir, self.max_patterns)
+            self.disk_reads += len(imported)
+            for pattern_id, entry in imported.items():
+                self.entries[pattern_id] = entry
+            loaded = len(imported)
+            if imported:
+                print(f"Importando {loaded} patrones JSON a {self.path}")
+                self._write()
+        print(f"Banco de patrones: {loaded}/{self.max_patterns} cargados de {self.path}")
+        return loaded
+    
+    def encode(self, snapshot):
+        """Instantánea del banco a bytes .dpb (corre en el worker)"""
+        return encode_bank(snapshot, self.max_patterns, NUM_STEPS, NUM_INSTRUMENTS)
+        
+    def _write(self, tag=None):
+        """Escribir el banco completo (en segundo plano si hay writer)"""
+        # Las entradas no se mutan (store reemplaza la entrada): la tupla es inmutable
+        snapshot = tuple(self.entries.items())
+        if self.writer:
+            self.writer.submit(self.path, snapshot, tag=tag, encode=self.encode)
+        else:
+            write_atomic(self.path, self.encode(snapshot))
+        self.disk_writes += 1
+    
+    def get(self, pattern_id):
+        """
+        Obtener una entrada (O(1), sin disco)
+        
+        Returns:
+            dict {'pattern', 'bpm', 'swing'} o None si el patrón está vacío
+        """
+        return self.entries.get(pattern_id)
+    
+    def neighbor(self, pattern_id, direction):
+        """
+        Patrón vecino para navegar con anterior/siguiente
+        
+        Solo se recorren los patrones guardados, el actual y un slot vacío
+        después del último guardado (para empezar uno nuevo), con vuelta
+        circular: con un banco de max_patterns slots casi vacío no hace falta
+        pasar por cientos de patrones vacíos.
+        
+        Args:
+            pattern_id: ID de partida
+            direction: -1 (anterior) o +1 (siguiente)
+        
+        Returns:
+            ID del patrón vecino
+        """
+        ids = {pid for pid, entry in self.entries.items() if entry is not None}
+        ids.add(max(ids, default=0) % self.max_patterns + 1)
+        # El actual puede ser un slot vacío fuera de la lista: solo sirve de punto de partida
+        ids.add(pattern_id)
+        ids = sorted(ids)
+        return ids[(ids.index(pattern_id) + direction) % len(ids)]
+    
+    def store(self, pattern_id, pattern, bpm, swing):
+        """
+        Guardar un patrón en el banco y en disco
+        
+        Args:
+            pattern_id: ID del patrón
+            pattern: Pattern (se guarda una copia)
+            bpm: Tempo del patrón
+            swing: Swing del patrón
+        
+        Returns:
+            Ruta del banco (con writer, la escritura termina después: ver poll_saves)
+        """
+        entry = {'pattern': pattern.copy(), 'bpm': bpm, 'swing': swing}
+        previous = self.entries.get(pattern_id)
+        if previous and 'extra' in previous:
+            # Conservar datos por paso que esta versión no edita
+            entry['extra'] = previous['extra']
+        self.entries[pattern_id] = entry
+        self._write(tag=pattern_id)
+        return self.path
+    
+    def poll_saves(self):
+        """
+        Guardados terminados desde la última consulta (no bloquea)
+        
+        Returns:
+            Lista de resultados del PatternWriter (vacía sin writer)
+        """
+        return self.writer.poll_completed() if self.writer else []
+    
+    def flush(self, timeout=2.0):
+        """Esperar a que terminen los guardados pendientes y detener el worker (al apagar)"""
+        if self.writer:
+            self.writer.close(timeout)
@@ -0,0 +1,226 @@
+"""
+Persistencia de patrones en segundo plano
+Las escrituras salen del thread de UI: un worker serializa las instantáneas,
+las escribe de forma atómica (temporal + fsync + rename) y avisa al terminar
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+
+
+def write_atomic(path, payload):
+    """
+    Escribir un archivo de forma atómica
+    
+    Se escribe un temporal en el mismo directorio, se hace fsync y se
+    renombra encima del original: ante un corte de luz queda la versión
+    vieja completa o la nueva completa, nunca un archivo a medias.
+    
+    Args:
+        path: Ruta destino
+        payload: Bytes a escribir
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    
+    # fsync del directorio para que el rename también sea durable
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class PatternWriter:
+    """
+    Worker de escritura de patrones
+    
+    submit() solo guarda la instantánea y despierta al worker (no bloquea).
+    Si llegan varios guardados del mismo archivo antes de que se escriba,
+    solo se escribe el último, y su resultado trae los tags de todos (ej:
+    patrones 3 y 5 guardados en el mismo banco). Los resultados se leen con
+    poll_completed() desde el loop principal.
+    """
+    
+    def __init__(self):
+        """Inicializar worker (el thread arranca con el primer guardado)"""
+        self._pending = {}  # ruta -> (datos, tags, codificador, instante del primer pedido)
+        self._condition = threading.Condition()
+        self._completed = collections.deque()
+        self._busy = False
+        self._closed = False
+        self.thread = None
+        
+        # Estadísticas
+        self.writes = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.max_write_ms = 0.0
+    
+    def submit(self, path, data, tag=None, encode=None):
+        """
+        Encolar una instantánea para escribir
+        
+        Args:
+            path: Ruta destino
+            data: Datos inmutables (tuplas, números, strings)
+            tag: Identificador que vuelve en el resultado (ej: ID de patrón)
+            encode: Función datos -> bytes, corre en el worker (None = JSON)
+        """
+        with self._condition:
+            tags = (tag,) if tag is not None else ()
+            requested = time.monotonic()
+            previous = self._pending.get(path)
+            if previous is not None:
+                # Se escribe solo la última instantánea, pero se confirman todos los pedidos
+                self.coalesced += 1
+                _, previous_tags, _, requested = previous
+                tags = previous_tags + tuple(t for t in tags if t not in previous_tags)
+            self._pending[path] = (data, tags, encode, requested)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            self._condition.notify()
+    
+    def _run(self):
+        """Loop del worker"""
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                path = next(iter(self._pending))
+                data, tags, encode, requested = self._pending.pop(path)
+                self._busy = True
+            
+            start = time.monotonic()
+            error = 'worker interrumpido'
+            try:
+                if encode is None:
+                    payload = json.dumps(data, indent=2).encode('utf-8')
+                else:
+                    payload = encode(data)
+                write_atomic(path, payload)
+                error = None
+            except Exception as e:
+                # Cualquier error del codificador o del disco se reporta como
+                # guardado fallido: el worker sigue atendiendo los próximos
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                elapsed_ms = (time.monotonic() - start) * 1000
+                self._finish(tags, path, error, elapsed_ms, requested)
+    
+    def _finish(self, tags, path, error, elapsed_ms, requested):
+        """Registrar el resultado de una escritura y liberar el worker"""
+        with self._condition:
+            self._busy = False
+            if error is None:
+                self.writes += 1
+                self.max_write_ms = max(self.max_write_ms, elapsed_ms)
+            else:
+                self.failures += 1
+            self._completed.append({
+                'tag': tags[-1] if tags else None,
+                'tags': tags,
+                'path': path,
+                'ok': error is None,
+                'error': error,
+                'write_ms': elapsed_ms,
+                'latency_ms': (time.monotonic() - requested) * 1000,
+            })
+            self._condition.notify_all()
+    
+    def poll_completed(self):
+        """
+        Resultados terminados desde la última consulta (no bloquea)
+        
+        Returns:
+            Lista de dicts con tag (el último), tags (todos los pedidos que
+            cubrió la escritura), path, ok, error, write_ms y latency_ms
+        """
+        results = []
+        while self._completed:
+            results.append(self._completed.popleft())
+        return results
+    
+    def pending_count(self):
+        """Escrituras en cola o en curso"""
+        with self._condition:
+            return len(self._pending) + (1 if self._busy else 0)
+    
+    def flush(self, timeout=2.0):
+        """
+        Esperar a que se escriba todo lo pendiente (ej: al apagar)
+        
+        Returns:
+            True si no quedó nada pendiente
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+    
+    def close(self, timeout=2.0):
+        """Escribir lo pendiente y detener el worker"""
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+    
+    def get_stats(self):
+        """Estadísticas del worker"""
+        return {
+            'writes': self.writes,
+            'coalesced': self.coalesced,
+            'failures': self.failures,
+            'pending': self.pending_count(),
+            'max_write_ms': self.max_write_ms,
+        }
+
+
+# Test del módulo
+if __name__ == "__main__":
+    import tempfile
+    
+    directory = tempfile.mkdtemp(prefix='pattern_writer_')
+    data = {'masks': tuple(range(32)), 'bpm': 120, 'swing': 0}
+    
+    # Escritura sincrónica (lo que bloqueaba el loop de UI)
+    start = time.perf_counter()
+    for i in range(20):
+        write_atomic(os.path.join(directory, 'sync.json'), json.dumps(data, indent=2).encode('utf-8'))
+    sync_ms = (time.perf_counter() - start) * 1000 / 20
+    
+    # Worker: 100 guardados seguidos de 8 patrones
+    writer = PatternWriter()
+    start = time.perf_counter()
+    for i in range(100):
+        writer.submit(os.path.join(directory, f'pattern_{i % 8 + 1}.json'), data, tag=i % 8 + 1)
+    submit_us = (time.perf_counter() - start) * 1e6 / 100
+    writer.close()
+    
+    print(f"Escritura atómica sincrónica: {sync_ms:.2f} ms por guardado")
+    print(f"submit() en el thread de UI:  {submit_us:.1f} us por guardado")
+    print(f"Worker: {writer.get_stats()}, resultados: {len(writer.poll_completed())}")
@@ -0,0 +1,324 @@
+"""
+Cache de samples preparados para un arranque rápido
+Guarda cada sample ya convertido al formato nativo del motor (44.1 kHz,
+int16 estéreo, sin silencios) como .npy y lo abre con memmap.
+Un índice (tamaño, mtime) -> hash evita re-hashear WAVs que no cambiaron.
+"""
+
+import hashlib
+import json
+import os
+import resource
+import time
+import wave
+
+import numpy as np
+
+from .config import (
+    INSTRUMENTS, SAMPLES_DIR, SAMPLE_RATE, SAMPLE_CACHE_DIR, SAMPLE_SILENCE_THRESHOLD
+)
+
+# Versión del formato preparado: cambiarla invalida todos los .npy
+CACHE_FORMAT_VERSION = 1
+
+
+def load_wav(path, sample_rate=SAMPLE_RATE):
+    """
+    Cargar un WAV PCM como int16 estéreo (igual que lo ve el mixer de 16 bits)
+    
+    Args:
+        path: Ruta al archivo .wav (8, 16, 24 o 32 bits, mono o estéreo)
+        sample_rate: Frecuencia destino (se remuestrea linealmente si difiere)
+    
+    Returns:
+        Array int16 (frames, 2)
+    """
+    with wave.open(path, 'rb') as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+    
+    # Quedarse con los 16 bits más significativos de cada muestra
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8
+    elif width == 2:
+        data = np.frombuffer(raw, dtype='<i2')
+    elif width == 3:
+        data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)[:, 1:].copy().view('<i2').ravel()
+    elif width == 4:
+        data = (np.frombuffer(raw, dtype='<i4') >> 16).astype(np.int16)
+    else:
+        raise ValueError(f"Ancho de muestra no soportado ({width} bytes): {path}")
+    
+    data = data.reshape(-1, channels)
+    if channels == 1:
+        data = np.column_stack((data[:, 0], data[:, 0]))
+    else:
+        data = np.ascontiguousarray(data[:, :2])
+    
+    if rate != sample_rate:
+        frames = int(round(len(data) * sample_rate / rate))
+        src = np.arange(len(data)) * (sample_rate / rate)
+        dst = np.arange(frames)
+        data = np.column_stack([
+            np.round(np.interp(dst, src, data[:, ch])).astype(np.int16) for ch in range(2)
+        ])
+    
+    return data
+
+
+def trim_silence(data, threshold=SAMPLE_SILENCE_THRESHOLD):
+    """
+    Recortar silencio al principio y al final de un sample
+    
+    Args:
+        data: Array int16 (frames, 2)
+        threshold: Amplitud mínima considerada sonido
+    
+    Returns:
+        Vista recortada (al menos 1 frame)
+    """
+    loud = np.flatnonzero(np.abs(data).max(axis=1) > threshold)
+    if len(loud) == 0:
+        return data[:1]
+    return data[loud[0]:loud[-1] + 1]
+
+
+class SampleCache:
+    """Cache en disco de samples preparados, indexado por hash del WAV"""
+    
+    def __init__(self, cache_dir=SAMPLE_CACHE_DIR, sample_rate=SAMPLE_RATE,
+                 silence_threshold=SAMPLE_SILENCE_THRESHOLD):
+        """
+        Inicializar cache
+        
+        Args:
+            cache_dir: Directorio de los .npy preparados
+            sample_rate: Frecuencia del motor
+            silence_threshold: Umbral de recorte de silencio (int16)
+        """
+        self.cache_dir = cache_dir
+        self.sample_rate = sample_rate
+        self.silence_threshold = silence_threshold
+        
+        # Índice ruta -> [tamaño, mtime_ns, hash] (solo para no re-hashear)
+        self._index_path = os.path.join(cache_dir, 'index.json')
+        self._index = self._load_index()
+        self._index_dirty = False
+        
+        # Estadísticas
+        self.hits = 0
+        self.misses = 0
+    
+    def _cache_path(self, name, digest):
+        """Ruta del .npy para un sample y hash"""
+        return os.path.join(self.cache_dir, f"{name}-{digest[:16]}.npy")
+    
+    def _load_index(self):
+        """Leer el índice de hashes (vacío si no existe o está corrupto)"""
+        try:
+            with open(self._index_path, 'r') as f:
+                index = json.load(f)
+            if index.get('version') == CACHE_FORMAT_VERSION:
+                return index.get('files', {})
+        except (OSError, ValueError):
+            pass
+        return {}
+    
+    def _save_index(self):
+        """Escribir el índice de hashes de forma atómica"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': CACHE_FORMAT_VERSION, 'files': self._index}, f)
+        os.replace(tmp_path, self._index_path)
+    
+    def _digest(self, wav_path):
+        """Hash del WAV, reutilizando el del índice si tamaño y mtime no cambiaron"""
+        stat = os.stat(wav_path)
+        key = os.path.abspath(wav_path)
+        entry = self._index.get(key)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        
+        digest = self._hash_file(wav_path)
+        self._index[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        self._index_dirty = True
+        return digest
+    
+    def _hash_file(self, wav_path):
+        """Hash del contenido del WAV + parámetros de preparación"""
+        sha1 = hashlib.sha1()
+        sha1.update(f"v{CACHE_FORMAT_VERSION}:{self.sample_rate}:{self.silence_threshold}:".encode())
+        with open(wav_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                sha1.update(chunk)
+        return sha1.hexdigest()
+    
+    def prepare(self, wav_path):
+        """
+        Decodificar y preparar un WAV (sin cache)
+        
+        Returns:
+            Array int16 (frames, 2) contiguo
+        """
+        data = load_wav(wav_path, self.sample_rate)
+        return np.ascontiguousarray(trim_silence(data, self.silence_threshold))
+    
+    def load_all(self, wav_paths):
+        """
+        Cargar varios samples y persistir el índice una sola vez
+        
+        Args:
+            wav_paths: Lista de rutas a WAV
+        
+        Returns:
+            Lista de arrays (None para los que fallaron)
+        """
+        loaded = []
+        for wav_path in wav_paths:
+            try:
+                loaded.append(self.load(wav_path))
+            except (OSError, ValueError, EOFError, wave.Error) as e:
+                print(f"Error cargando {wav_path}: {e}")
+                loaded.append(None)
+        self.flush()
+        return loaded
+    
+    def flush(self):
+        """Guardar el índice si hubo hashes nuevos"""
+        if self._index_dirty:
+            try:
+                self._save_index()
+                self._index_dirty = False
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar el índice del cache: {e}")
+    
+    def load(self, wav_path):
+        """
+        Obtener un sample preparado, creando el .npy si hace falta
+        
+        Args:
+            wav_path: Ruta al WAV original
+        
+        Returns:
+            Array int16 (frames, 2) respaldado por memmap (solo lectura)
+        """
+        name = os.path.splitext(os.path.basename(wav_path))[0]
+        digest = self._digest(wav_path)
+        path = self._cache_path(name, digest)
+        
+        if os.path.exists(path):
+            try:
+                data = np.load(path, mmap_mode='r')
+                if data.dtype == np.int16 and data.ndim == 2 and data.shape[1] == 2:
+                    self.hits += 1
+                    return data
+            except (ValueError, OSError) as e:
+                print(f"⚠️ Cache de sample corrupto ({path}): {e}")
+        
+        self.misses += 1
+        data = self.prepare(wav_path)
+        try:
+            self._store(name, path, data)
+        except OSError as e:
+            # Sin permisos de escritura: usar el sample preparado en memoria
+            print(f"⚠️ No se pudo guardar el cache de {name}: {e}")
+            return data
+        return np.load(path, mmap_mode='r')
+    
+    def _store(self, name, path, data):
+        """Escribir el .npy de forma atómica y borrar versiones viejas del mismo sample"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, data)
+        os.replace(tmp_path, path)
+        
+        for filename in os.listdir(self.cache_dir):
+            stale = os.path.join(self.cache_dir, filename)
+            if filename.startswith(f"{name}-") and filename.endswith('.npy') and stale != path:
+                os.remove(stale)
+    
+    def clear(self):
+        """Borrar todos los samples preparados"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.npy') or filename == 'index.json':
+                os.remove(os.path.join(self.cache_dir, filename))
+        self._index = {}
+        self._index_dirty = False
+    
+    def get_stats(self):
+        """Obtener estadísticas del cache"""
+        return {'hits': self.hits, 'misses': self.misses, 'cache_dir': self.cache_dir}
+
+
+def _rss_kb():
+    """Memoria residente actual del proceso en KB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def benchmark_startup(samples_dir=SAMPLES_DIR, cache_dir='/tmp/drum_sample_cache_bench'):
+    """
+    Comparar la carga de samples al arranque: pygame.mixer.Sound vs cache memmap
+    
+    Args:
+        samples_dir: Directorio de los WAV
+        cache_dir: Directorio temporal para el cache del benchmark
+    """
+    paths = [os.path.join(samples_dir, f"{name}.wav") for name in INSTRUMENTS]
+    paths = [p for p in paths if os.path.exists(p)]
+    print(f"Benchmark de arranque: {len(paths)} samples")
+    
+    try:
+        import pygame
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.mixer.init(frequency=SAMPLE_RATE, size=-16, channels=2)
+        rss = _rss_kb()
+        start = time.perf_counter()
+        sounds = [pygame.mixer.Sound(p) for p in paths]
+        arrays = [pygame.sndarray.array(s) for s in sounds]
+        elapsed = time.perf_counter() - start
+        print(f"  pygame.mixer.Sound + sndarray: {elapsed * 1000:7.2f} ms, "
+              f"RSS +{_rss_kb() - rss} KB")
+        del sounds, arrays
+        pygame.mixer.quit()
+    except Exception as e:
+        print(f"  pygame no disponible para comparar ({e})")
+    
+    cache = SampleCache(cache_dir)
+    cache.clear()
+    
+    start = time.perf_counter()
+    cache.load_all(paths)
+    print(f"  Cache frío (decodificar + escribir .npy): {(time.perf_counter() - start) * 1000:7.2f} ms")
+    
+    # Arranque nuevo: índice leído de disco, hash de contenido forzado
+    cache = SampleCache(cache_dir)
+    cache._index = {}
+    start = time.perf_counter()
+    cache.load_all(paths)
+    print(f"  Cache caliente (hash sha1 + memmap):      {(time.perf_counter() - start) * 1000:7.2f} ms")
+    
+    cache = SampleCache(cache_dir)
+    rss = _rss_kb()
+    start = time.perf_counter()
+    loaded = cache.load_all(paths)
+    elapsed = time.perf_counter() - start
+    frames = sum(len(d) for d in loaded)
+    print(f"  Cache caliente (índice + memmap):         {elapsed * 1000:7.2f} ms, "
+          f"RSS +{_rss_kb() - rss} KB ({frames * 4 // 1024} KB mapeados)")
+    
+    cache.clear()
+
+
+# Test del módulo
+if __name__ == "__main__":
+    benchmark_startup()
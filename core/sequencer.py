@@ -3,14 +3,20 @@ Secuenciador de 32 pasos para la Drum Machine
 Maneja patrones, reproducción y guardado/carga de patrones
 """
 
+import math
 import threading
 import time
-import json
-import os
 from .config import (
-    NUM_STEPS, NUM_INSTRUMENTS, BPM_DEFAULT, BPM_MIN, BPM_MAX,
-    SWING_MAX, PATTERNS_DIR, MAX_PATTERNS
+    INSTRUMENTS, NUM_STEPS, NUM_INSTRUMENTS, BPM_DEFAULT, BPM_MIN, BPM_MAX,
+    SWING_MAX, PATTERNS_DIR, MAX_PATTERNS, STEP_LATE_SKIP, MIDI_CLOCK_OFFSET_MS,
+    MIDI_NOTE_GATE_MS, STEPS_PER_BAR
 )
+from .pattern import Pattern
+from .pattern_bank import PatternBank
+from .pattern_writer import PatternWriter
+from .step_clock import StepClock
+from features.midi_clock import MIDIClockSender
+from features.midi_notes import MIDINoteSender
 
 
 class Sequencer:
@@ -25,8 +31,10 @@ class Sequencer:
         """
         self.audio_engine = audio_engine
         
-        # Patrón actual: 32 pasos x 8 instrumentos
-        self.pattern = [[False] * NUM_INSTRUMENTS for _ in range(NUM_STEPS)]
+        # Patrón actual: 32 pasos x 8 instrumentos (bits + triggers por paso).
+        # El thread de reproducción solo lee la referencia y su tupla inmutable
+        # de triggers; cambiar de patrón es reasignar la referencia (sin locks)
+        self._pattern = Pattern(NUM_STEPS, NUM_INSTRUMENTS)
         
         # Estado de reproducción
         self.is_playing = False
@@ -34,15 +42,53 @@ class Sequencer:
         self.bpm = BPM_DEFAULT
         self.swing = 0  # Porcentaje de swing (0-75)
         
+        # Reloj de deadlines absolutos (monotonic_ns)
+        self.clock = StepClock(self.bpm, self.swing)
+        self._reset_requested = False
+        
+        # MIDI clock y notas de salida (opcional, ver attach_midi)
+        self.midi_clock = None
+        self.midi_notes = None
+        
+        # Clock MIDI externo (modo esclavo, ver set_external_clock)
+        self.external_clock = None
+        self._timeline_anchored = False
+        
+        # Estadísticas de timing
+        self.steps_played = 0
+        self.steps_late = 0
+        self.steps_missed = 0
+        self.max_late_ms = 0.0
+        self.max_wakeup_ms = 0.0
+        
         # Threading
         self.play_thread = None
         self.stop_event = threading.Event()
         
-        # Patrones guardados
+        # Patrones guardados: todos en memoria desde el arranque
         self.current_pattern_id = 1
+        self.bank = PatternBank(PATTERNS_DIR, MAX_PATTERNS, writer=PatternWriter())
+        self.bank.load_all()
+        
+        # Cambio de patrón en cola (se aplica en el próximo compás): la UI
+        # publica la tupla (número de pedido, ID, Pattern, entrada, en compás)
+        # y el thread de reproducción marca el último número aplicado; cada
+        # variable tiene un solo escritor, así que ninguno de los dos toma un lock
+        self._pending = None
+        self._applied_request = 0
         
         print("Secuenciador inicializado")
     
+    @property
+    def pattern(self):
+        """Patrón actual (Pattern; pattern[paso][instrumento] sigue funcionando)"""
+        return self._pattern
+    
+    @pattern.setter
+    def pattern(self, pattern):
+        """Reemplazar el patrón (acepta Pattern o el formato viejo list[list[bool]])"""
+        self._pattern = Pattern.from_rows(pattern, NUM_STEPS, NUM_INSTRUMENTS)
+    
     def toggle_step(self, step, instrument):
         """
         Activar/desactivar una nota en el patrón
@@ -51,8 +97,7 @@ class Sequencer:
             step: Paso (0-15)
             instrument: ID del instrumento (0-7)
         """
-        if 0 <= step < NUM_STEPS and 0 <= instrument < NUM_INSTRUMENTS:
-            self.pattern[step][instrument] = not self.pattern[step][instrument]
+        self._pattern.toggle(step, instrument)
     
     def set_step(self, step, instrument, state):
         """
@@ -63,28 +108,66 @@ class Sequencer:
             instrument: ID del instrumento (0-7)
             state: True (activado) o False (desactivado)
         """
-        if 0 <= step < NUM_STEPS and 0 <= instrument < NUM_INSTRUMENTS:
-            self.pattern[step][instrument] = state
+        self._pattern.set(step, instrument, bool(state))
     
     def get_step(self, step, instrument):
         """Obtener estado de una nota"""
-        if 0 <= step < NUM_STEPS and 0 <= instrument < NUM_INSTRUMENTS:
-            return self.pattern[step][instrument]
-        return False
+        return self._pattern.get(step, instrument)
     
     def clear_pattern(self):
         """Limpiar todo el patrón"""
-        self.pattern = [[False] * NUM_INSTRUMENTS for _ in range(NUM_STEPS)]
+        self._pattern.clear()
         print("Patrón limpiado")
     
-    def set_bpm(self, bpm):
+    def set_bpm(self, bpm, at_ns=None):
         """
         Establecer tempo
         
         Args:
             bpm: Tempo en BPM (60-200)
+            at_ns: Instante desde el que rige (None = ahora)
         """
+        # En modo esclavo el tempo lo impone el clock externo
+        if self.external_tempo:
+            return
         self.bpm = max(BPM_MIN, min(BPM_MAX, int(bpm)))
+        self.clock.set_bpm(self.bpm, at_ns)
+        self._sync_effects_tempo()
+        
+    def follow_tempo(self, bpm):
+        """
+        Tempo estimado del clock externo (la línea de tiempo la publica el PLL)
+        
+        Args:
+            bpm: Tempo medido (puede estar fuera de 60-200)
+        """
+        self.bpm = int(round(bpm))
+        self._sync_effects_tempo()
+    
+    @property
+    def external_tempo(self):
+        """True si un clock MIDI externo está marcando el tempo"""
+        return self.external_clock is not None and self.external_clock.active
+    
+    def set_external_clock(self, follower):
+        """
+        Seguir un clock MIDI externo (MIDIClockFollower) o volver al interno (None)
+        
+        En modo esclavo no se emite MIDI clock (evita lazos con el DAW): el
+        MIDIClockSender se suelta y attach_midi no lo vuelve a crear hasta
+        set_external_clock(None).
+        """
+        self.external_clock = follower
+        if follower is not None and self.midi_clock:
+            self.midi_clock.stop()
+            self.midi_clock = None
+    
+    def _sync_effects_tempo(self):
+        """Mantener sincronizados los efectos temporales (delay)"""
+        processor = getattr(self.audio_engine, 'processor', None)
+        effects = getattr(processor, 'effects', None)
+        if effects:
+            effects.set_tempo(self.bpm)
     
     def set_swing(self, swing):
         """
@@ -94,58 +177,167 @@ class Sequencer:
             swing: Porcentaje de swing (0-75)
         """
         self.swing = max(0, min(SWING_MAX, int(swing)))
+        self.clock.set_swing(self.swing)
     
     def _calculate_step_delay(self, step):
         """
-        Calcular delay para un paso con swing (optimizado)
+        Calcular la duración de un paso con swing
         
         Args:
             step: Número de paso
-            
+        
         Returns:
-            Delay en segundos
-        """
-        # Tiempo base de un paso (16th note) - cacheado
-        if not hasattr(self, '_base_delay') or self._last_bpm != self.bpm:
-            self._base_delay = 60.0 / self.bpm / 4  # 4 pasos por beat
-            self._last_bpm = self.bpm
-        
-        # Si no hay swing, usar delay base
-        if self.swing == 0:
-            return self._base_delay
-        
-        # Aplicar swing a pasos impares (optimizado)
-        if step % 2 == 1:
-            # El swing retrasa los pasos impares
-            swing_factor = 1.0 + (self.swing / 100.0)
-            return self._base_delay * swing_factor
+            Delay en segundos hasta el paso siguiente
+        """
+        return self.clock.step_duration(step)
+    
+    def attach_midi(self, midi_handler, gate_ms=MIDI_NOTE_GATE_MS):
+        """
+        Emitir MIDI clock (24 PPQN), Start/Stop y notas desde la grilla del secuenciador
+        
+        Args:
+            midi_handler: MIDIHandler habilitado (None = desactivar)
+            gate_ms: Duración de las notas MIDI en ms
+        """
+        if self.midi_clock:
+            self.midi_clock.stop()
+        if self.midi_notes:
+            self.midi_notes.close()
+        self.midi_clock = None
+        self.midi_notes = None
+        if not midi_handler or not midi_handler.enabled:
+            return
+        
+        if midi_handler.enable_clock and self.external_clock is None:
+            self.midi_clock = MIDIClockSender(midi_handler, self.clock, offset_ms=MIDI_CLOCK_OFFSET_MS)
+        if midi_handler.enable_notes:
+            self.midi_notes = MIDINoteSender(midi_handler, INSTRUMENTS, gate_ms=gate_ms,
+                                             offset_ms=MIDI_CLOCK_OFFSET_MS)
+            self.midi_notes.start()
+    
+    def reset_position(self):
+        """Volver al paso 0 del patrón en el próximo deadline (sin cortar el tempo)"""
+        if self.is_playing:
+            self._reset_requested = True
         else:
-            # Compensar los pasos pares para mantener el tempo general
-            swing_factor = 1.0 - (self.swing / 200.0)
-            return self._base_delay * swing_factor
+            self.current_step = 0
     
     def _play_loop(self):
-        """Loop de reproducción del secuenciador"""
+        """
+        Loop de reproducción del secuenciador
+        
+        Cada paso absoluto n tiene su deadline fijo en la línea de tiempo del
+        reloj; el trabajo de disparar samples no corre los pasos siguientes.
+        Si el motor de audio agenda disparos (get_lookahead_ns > 0) el loop
+        despierta esa anticipación antes y entrega el deadline: el golpe cae
+        en el frame exacto y el jitter del thread no se escucha.
+        Un paso que llega tarde se toca igual (recupera en el próximo); si
+        llega más tarde que STEP_LATE_SKIP de paso se saltea y se cuenta.
+        """
         self.current_step = 0
+        anchored, self._timeline_anchored = self._timeline_anchored, False
+        if self.external_clock is not None:
+            if anchored or self.external_tempo:
+                # Esclavo: la línea de tiempo ya la anclaron Start/Continue y el PLL;
+                # un paso recién vencido se toca igual (mismo criterio que STEP_LATE_SKIP)
+                step = max(0, math.ceil(self.clock.position() - STEP_LATE_SKIP))
+            else:
+                # PLAY local con el DAW parado y sin clock: tempo propio, sin emitir clock
+                self.clock.start(time.monotonic_ns() + self._get_lookahead_ns(), step=0)
+                step = 0
+        else:
+            # El primer paso también se agenda: arranca una anticipación después
+            self.clock.start(time.monotonic_ns() + self._get_lookahead_ns(), step=0)
+            step = 0
+            if self.midi_clock:
+                self.midi_clock.start(step=0)
         
         while not self.stop_event.is_set():
-            # Reproducir todas las notas del paso actual
-            for instrument in range(NUM_INSTRUMENTS):
-                if self.pattern[self.current_step][instrument]:
-                    self.audio_engine.play_sample(instrument)
+            # Reset a paso 0: re-anclar la grilla en el próximo paso (sin swing)
+            if self._reset_requested:
+                self._reset_requested = False
+                grid_ns = self.clock.step_time_ns(step) - self.clock.swing_offset_ns(step)
+                self.clock.start(grid_ns, step=0)
+                step = 0
+                if self.midi_clock:
+                    self.midi_clock.rebase()
             
-            # Calcular delay con swing
-            step_delay = self._calculate_step_delay(self.current_step)
+            # Cambio de patrón en cola: justo en el primer paso del compás
+            # (una carga explícita entra en el próximo paso)
+            request = self._pending_request()
+            if request is not None and (step % STEPS_PER_BAR == 0 or not request[4]):
+                self._apply_pending_pattern(request, step)
             
-            # Avanzar al siguiente paso
-            self.current_step = (self.current_step + 1) % NUM_STEPS
+            deadline = self.clock.step_time_ns(step)
+            lookahead_ns = self._get_lookahead_ns()
+            wake_ns = deadline - lookahead_ns
+            wait_ns = wake_ns - time.monotonic_ns()
+            if wait_ns > 0 and self.stop_event.wait(wait_ns / 1e9):
+                break
             
-            # Esperar hasta el próximo paso
-            self.stop_event.wait(step_delay)
+            # Paso demorado: tocarlo tarde o saltearlo si ya pasó demasiado
+            now_ns = time.monotonic_ns()
+            if wait_ns > 0:
+                self.max_wakeup_ms = max(self.max_wakeup_ms, (now_ns - wake_ns) / 1e6)
+            late_ns = now_ns - deadline
+            step_ns = self.clock.timeline[2]
+            if late_ns > STEP_LATE_SKIP * step_ns:
+                skipped = int(late_ns // step_ns) or 1
+                self.steps_missed += skipped
+                step += skipped
+                continue
+            if late_ns > 0:
+                late_ms = late_ns / 1e6
+                if late_ms > 1.0:
+                    self.steps_late += 1
+                self.max_late_ms = max(self.max_late_ms, late_ms)
+            
+            # Reproducir todas las notas del paso actual
+            self.current_step = step % NUM_STEPS
+            at_ns = deadline if lookahead_ns else None
+            # Solo los golpes reales del paso: una lectura de la instantánea publicada
+            triggers = self._pattern.triggers
+            for instrument in triggers[self.current_step]:
+                self.audio_engine.play_sample(instrument, at_ns=at_ns)
+                # Solo encola: el thread de notas envía note-on y note-off
+                if self.midi_notes:
+                    self.midi_notes.note_on(instrument, at_ns=deadline)
+            self.steps_played += 1
+            
+            # Avanzar al siguiente paso
+            step += 1
+            self.current_step = step % NUM_STEPS
+    
+    def _get_lookahead_ns(self):
+        """Anticipación de agenda que ofrece el motor de audio (0 = disparo inmediato)"""
+        get_lookahead = getattr(self.audio_engine, 'get_lookahead_ns', None)
+        return get_lookahead() if get_lookahead else 0
+    
+    def get_timing_stats(self):
+        """
+        Obtener estadísticas de timing del reloj
+        
+        Returns:
+            dict con pasos tocados, tarde (>1 ms), salteados, atraso máximo
+            y demora máxima al despertar del thread
+        """
+        return {
+            'steps_played': self.steps_played,
+            'steps_late': self.steps_late,
+            'steps_missed': self.steps_missed,
+            'max_late_ms': self.max_late_ms,
+            'max_wakeup_ms': self.max_wakeup_ms,
+        }
     
-    def play(self):
-        """Iniciar reproducción del secuenciador"""
+    def play(self, anchored=False):
+        """
+        Iniciar reproducción del secuenciador
+        
+        Args:
+            anchored: El clock externo ya ancló la línea de tiempo (Start/Continue)
+        """
         if not self.is_playing:
+            self._timeline_anchored = anchored
             self.is_playing = True
             self.stop_event.clear()
             self.play_thread = threading.Thread(target=self._play_loop, daemon=True)
@@ -159,6 +351,14 @@ class Sequencer:
             self.stop_event.set()
             if self.play_thread:
                 self.play_thread.join(timeout=1.0)
+            if self.midi_clock:
+                self.midi_clock.stop()
+            if self.midi_notes:
+                self.midi_notes.all_notes_off()
+            # Un cambio de patrón que quedó en cola se aplica al parar
+            request = self._pending_request()
+            if request is not None:
+                self._install_request(request)
             self.current_step = 0
             print("Secuenciador: STOP")
     
@@ -171,37 +371,24 @@ class Sequencer:
     
     def save_pattern(self, pattern_id=None):
         """
-        Guardar patrón actual a archivo JSON
+        Guardar patrón actual en el banco; el disco se escribe en segundo plano
         
         Args:
-            pattern_id: ID del patrón (1-8), None usa el actual
-            
+            pattern_id: ID del patrón (1-MAX_PATTERNS), None usa el actual
+        
         Returns:
-            True si se guardó exitosamente
+            True si se guardó en el banco (el resultado en disco llega por poll_saves)
         """
         if pattern_id is None:
             pattern_id = self.current_pattern_id
         
-        if not 1 <= pattern_id <= MAX_PATTERNS:
+        if not self.bank.is_valid(pattern_id):
             print(f"ID de patrón inválido: {pattern_id}")
             return False
         
-        # Crear directorio si no existe
-        os.makedirs(PATTERNS_DIR, exist_ok=True)
-        
-        # Preparar datos
-        data = {
-            'pattern': self.pattern,
-            'bpm': self.bpm,
-            'swing': self.swing
-        }
-        
-        # Guardar a archivo
-        filename = os.path.join(PATTERNS_DIR, f'pattern_{pattern_id}.json')
         try:
-            with open(filename, 'w') as f:
-                json.dump(data, f, indent=2)
-            print(f"Patrón {pattern_id} guardado en {filename}")
+            filename = self.bank.store(pattern_id, self._pattern, self.bpm, self.swing)
+            print(f"Patrón {pattern_id} guardando en {filename}")
             return True
         except Exception as e:
             print(f"Error guardando patrón: {e}")
@@ -209,44 +396,125 @@ class Sequencer:
     
     def load_pattern(self, pattern_id):
         """
-        Cargar patrón desde archivo JSON
+        Cargar patrón del banco en memoria (sin disco; sonando, entra en el próximo paso)
         
         Args:
-            pattern_id: ID del patrón (1-8)
-            
+            pattern_id: ID del patrón (1-MAX_PATTERNS)
+        
         Returns:
-            True si se cargó exitosamente
+            True si se cargó exitosamente (False si no existe)
         """
-        if not 1 <= pattern_id <= MAX_PATTERNS:
+        if not self.bank.is_valid(pattern_id):
             print(f"ID de patrón inválido: {pattern_id}")
             return False
         
-        filename = os.path.join(PATTERNS_DIR, f'pattern_{pattern_id}.json')
-        
-        if not os.path.exists(filename):
+        if self.bank.get(pattern_id) is None:
             print(f"Patrón {pattern_id} no existe")
             return False
         
-        try:
-            with open(filename, 'r') as f:
-                data = json.load(f)
-            
-            self.pattern = data.get('pattern', self.pattern)
-            self.bpm = data.get('bpm', self.bpm)
-            self.swing = data.get('swing', self.swing)
-            self.current_pattern_id = pattern_id
+        # Sonando, entra en el próximo paso (la copia se arma en este thread)
+        self._request_pattern(pattern_id, on_bar=False)
+        return True
             
-            print(f"Patrón {pattern_id} cargado desde {filename}")
-            return True
-        except Exception as e:
-            print(f"Error cargando patrón: {e}")
+    def select_pattern(self, pattern_id):
+        """
+        Cambiar de patrón: inmediato si está parado, en el próximo compás si suena
+        
+        Un patrón vacío en el banco arranca un patrón nuevo (mismo BPM y swing).
+        Pedidos seguidos antes del compás se pisan: gana el último.
+        
+        Args:
+            pattern_id: ID del patrón (1-MAX_PATTERNS)
+        
+        Returns:
+            True si quedó en cola para el próximo compás
+        """
+        if not self.bank.is_valid(pattern_id):
+            print(f"ID de patrón inválido: {pattern_id}")
             return False
+        
+        return self._request_pattern(pattern_id, on_bar=True)
+    
+    @property
+    def target_pattern_id(self):
+        """Patrón que va a sonar: el de la cola si hay uno, si no el actual"""
+        request = self._pending_request()
+        return request[1] if request is not None else self.current_pattern_id
+    
+    def _pending_request(self):
+        """Pedido de cambio publicado y todavía no aplicado (None si no hay)"""
+        request = self._pending
+        if request is None or request[0] == self._applied_request:
+            return None
+        return request
+    
+    def _request_pattern(self, pattern_id, on_bar):
+        """
+        Armar un cambio de patrón y publicarlo (thread de UI)
+        
+        La copia del banco se arma acá: el thread de reproducción solo cambia
+        la referencia. Parado, el cambio se aplica en el acto.
+        
+        Args:
+            pattern_id: ID del patrón
+            on_bar: True = esperar al próximo compás, False = próximo paso
+        
+        Returns:
+            True si quedó en cola para el thread de reproducción
+        """
+        entry = self.bank.get(pattern_id)
+        if entry is None:
+            pattern = Pattern(NUM_STEPS, NUM_INSTRUMENTS)
+        else:
+            pattern = entry['pattern'].copy()
+        last = self._pending[0] if self._pending else self._applied_request
+        request = (last + 1, pattern_id, pattern, entry, on_bar)
+        if self.is_playing:
+            # Publicación: una sola asignación; pisa un pedido anterior no aplicado
+            self._pending = request
+            return True
+        self._pending = None
+        self._install_request(request)
+        return False
+    
+    def _install_request(self, request, at_ns=None):
+        """
+        Poner como actual un patrón ya armado
+        
+        Args:
+            request: (número de pedido, ID, Pattern, entrada o None, en compás)
+            at_ns: Instante del cambio de tempo (None = ahora; en play, el compás)
+        """
+        number, pattern_id, pattern, entry, _ = request
+        # Publicación: una sola asignación de referencia
+        self._pattern = pattern
+        if entry is not None:
+            self.set_bpm(entry['bpm'], at_ns)
+            self.set_swing(entry['swing'])
+        self.current_pattern_id = pattern_id
+        self._applied_request = number
+            
+    def _apply_pending_pattern(self, request, step):
+        """Aplicar el cambio en cola en el paso `step` (thread de reproducción)"""
+        at_ns = self.clock.step_time_ns(step) - self.clock.swing_offset_ns(step)
+        self._install_request(request, at_ns=at_ns)
     
     def get_pattern(self):
-        """Obtener patrón actual"""
-        return self.pattern
+        """
+        Obtener patrón actual
+        
+        Returns:
+            Pattern (indexable como [paso][instrumento] para el código existente)
+        """
+        return self._pattern
+    
+    def poll_saves(self):
+        """Guardados en disco terminados desde la última consulta (no bloquea)"""
+        return self.bank.poll_saves()
     
     def cleanup(self):
         """Limpiar recursos"""
         self.stop()
+        # No perder el último guardado al apagar
+        self.bank.flush()
 
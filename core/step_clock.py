@@ -0,0 +1,138 @@
+"""
+Reloj de pasos con deadlines absolutos
+Cada paso tiene un instante fijo en time.monotonic_ns() calculado desde un
+origen, así que el tiempo que se tarda en disparar samples no se acumula
+"""
+
+import time
+
+
+class StepClock:
+    """
+    Línea de tiempo del secuenciador
+    
+    La línea de tiempo es la tupla (origin_ns, origin_step, step_ns): el paso
+    absoluto `origin_step` (puede ser fraccionario) ocurre en `origin_ns` y cada
+    paso dura `step_ns`. Se publica como una sola tupla, así que cualquier
+    thread la lee consistente sin locks. Cambiar el BPM re-basa el origen en
+    la posición actual (continuidad de fase); el swing es un corrimiento de
+    los pasos impares sobre la grilla y no mueve la grilla.
+    """
+    
+    def __init__(self, bpm, swing=0, steps_per_beat=4):
+        """
+        Inicializar reloj
+        
+        Args:
+            bpm: Tempo en BPM
+            swing: Swing en porcentaje (0-75)
+            steps_per_beat: Pasos por negra (4 = semicorcheas)
+        """
+        self.steps_per_beat = steps_per_beat
+        self.bpm = bpm
+        self.swing = swing
+        self.timeline = (time.monotonic_ns(), 0.0, self._step_ns(bpm))
+    
+    def _step_ns(self, bpm):
+        """Duración de un paso en nanosegundos"""
+        return 60_000_000_000 / (bpm * self.steps_per_beat)
+    
+    def start(self, now_ns=None, step=0):
+        """
+        Anclar la línea de tiempo: el paso `step` ocurre en `now_ns`
+        
+        Args:
+            now_ns: Instante de inicio (None = ahora)
+            step: Paso absoluto en el origen
+        """
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        self.timeline = (now_ns, float(step), self._step_ns(self.bpm))
+    
+    def position(self, now_ns=None):
+        """
+        Posición en pasos (fraccionaria, sin swing) en un instante
+        
+        Args:
+            now_ns: Instante (None = ahora)
+        """
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        origin_ns, origin_step, step_ns = self.timeline
+        return origin_step + (now_ns - origin_ns) / step_ns
+    
+    def set_bpm(self, bpm, now_ns=None):
+        """
+        Cambiar el tempo sin saltos de fase
+        
+        Args:
+            bpm: Nuevo tempo
+            now_ns: Instante del cambio (None = ahora)
+        """
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        step = self.position(now_ns)
+        self.bpm = bpm
+        self.timeline = (now_ns, step, self._step_ns(bpm))
+    
+    def set_timeline(self, origin_ns, origin_step, step_ns):
+        """
+        Publicar una línea de tiempo externa (ej: clock MIDI esclavo)
+        
+        Args:
+            origin_ns: Instante del paso `origin_step`
+            origin_step: Paso absoluto (fraccionario) en el origen
+            step_ns: Duración de un paso en ns
+        """
+        self.bpm = 60_000_000_000 / (step_ns * self.steps_per_beat)
+        self.timeline = (int(origin_ns), float(origin_step), step_ns)
+    
+    def set_swing(self, swing):
+        """Cambiar el swing (0-75%); solo corre los pasos impares"""
+        self.swing = swing
+    
+    def swing_offset_ns(self, step, step_ns=None):
+        """
+        Retraso del paso por swing
+        
+        Los pasos impares se corren swing/200 de paso: 75% de swing ubica la
+        semicorchea impar al 68.75% del par (un poco más allá del tresillo).
+        """
+        if step % 2 == 0 or self.swing == 0:
+            return 0
+        if step_ns is None:
+            step_ns = self.timeline[2]
+        return int(step_ns * self.swing / 200.0)
+    
+    def grid_time_ns(self, position):
+        """
+        Instante de una posición de la grilla, sin swing (ej: ticks de MIDI clock)
+        
+        Args:
+            position: Posición en pasos absolutos (fraccionaria)
+        """
+        origin_ns, origin_step, step_ns = self.timeline
+        return origin_ns + int(round((position - origin_step) * step_ns))
+    
+    def step_time_ns(self, step):
+        """
+        Deadline absoluto de un paso
+        
+        Args:
+            step: Paso absoluto (contador creciente, no el índice en el patrón)
+        
+        Returns:
+            Instante en ns de time.monotonic_ns()
+        """
+        origin_ns, origin_step, step_ns = self.timeline
+        return origin_ns + int(round((step - origin_step) * step_ns)) + self.swing_offset_ns(step, step_ns)
+    
+    def step_duration(self, step):
+        """
+        Duración en segundos desde el paso `step` hasta el siguiente (con swing)
+        
+        Args:
+            step: Paso absoluto
+        """
+        step_ns = self.timeline[2]
+        return (step_ns + self.swing_offset_ns(step + 1, step_ns) - self.swing_offset_ns(step, step_ns)) / 1e9
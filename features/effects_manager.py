@@ -1,20 +1,954 @@
 """
 Effects Manager - Sistema de efectos ultra optimizado
-Solo Compresor y Reverb con máximo rendimiento
+Compresor, EQ paramétrico, Delay sincronizado y Reverb con máximo rendimiento
 """
 
+import math
+from functools import lru_cache
+
 import numpy as np
 
 
+# Rango logarítmico máximo por tramo en el one-pole vectorizado (e^300 ~ 1e130, seguro en float64;
+# los términos crecen dentro del tramo, así que la suma acumulada no pierde precisión relativa)
+_ONE_POLE_LOG_RANGE = 300.0
+_LEVEL_FLOOR = 1e-9  # -180 dB, evita log(0)
+
+# Bandas del EQ paramétrico: (tipo, frecuencia Hz, Q)
+EQ_BANDS = (
+    ('lowshelf', 80.0, 0.707),
+    ('peaking', 400.0, 1.0),
+    ('peaking', 3000.0, 1.0),
+    ('highshelf', 8000.0, 0.707),
+)
+# Curva "smile" para drums que aplica el pot de EQ: ganancia dB por banda al 100%
+EQ_SMILE_CURVE = (6.0, -4.0, 3.0, 5.0)
+EQ_SUBBLOCK = 64  # Frames por sub-bloque del procesamiento matricial
+
+# Reverb estilo Freeverb (afinaciones en muestras a 44.1 kHz)
+REVERB_COMB_TUNINGS = (1116, 1188, 1277, 1356, 1422, 1491, 1557, 1617)
+REVERB_ALLPASS_TUNINGS = (556, 441, 341, 225)
+REVERB_STEREO_SPREAD = 23
+REVERB_PRESETS = {
+    'room': {'room_size': 0.50, 'damping': 0.50, 'label': 'ROOM'},
+    'plate': {'room_size': 0.70, 'damping': 0.15, 'label': 'PLT'},
+    'hall': {'room_size': 0.88, 'damping': 0.35, 'label': 'HALL'},
+}
+
+# Delay sincronizado: división -> (duración en negras, etiqueta del display)
+DELAY_DIVISIONS = {
+    '1/16': (0.25, '16'),
+    '1/8': (0.5, '8'),
+    '1/8.': (0.75, '8D'),
+    '1/4': (1.0, '4'),
+    '1/4.': (1.5, '4D'),
+    '1/2': (2.0, '2'),
+}
+DELAY_XFADE_FRAMES = 2048  # Crossfade entre taps al cambiar el tempo (~46 ms)
+DELAY_FEEDBACK_MAX = 0.9
+
+
+def time_to_coefficient(time_ms, sample_rate):
+    """
+    Convertir una constante de tiempo a coeficiente de filtro one-pole
+    
+    Args:
+        time_ms: Constante de tiempo en ms (<= 0 = instantáneo)
+        sample_rate: Frecuencia de muestreo
+    
+    Returns:
+        Coeficiente (0.0 = sin memoria, cercano a 1.0 = lento)
+    """
+    if time_ms <= 0:
+        return 0.0
+    return math.exp(-1000.0 / (time_ms * sample_rate))
+
+
+@lru_cache(maxsize=64)
+def _one_pole_powers(coef):
+    """
+    Potencias precalculadas de un one-pole para procesar por tramos
+    
+    Returns:
+        Tupla (largo del tramo, coef^j, (1-coef)*coef^-j)
+    """
+    log_coef = math.log(coef)
+    chunk = max(1, int(_ONE_POLE_LOG_RANGE / -log_coef))
+    j = np.arange(chunk, dtype=np.float64)
+    pos = np.exp(j * log_coef)
+    neg = (1.0 - coef) * np.exp(-j * log_coef)
+    return chunk, pos, neg
+
+
+@lru_cache(maxsize=64)
+def _release_ramp(coef, length):
+    """Rampa k*log(coef) para el detector de picos (largo potencia de 2)"""
+    return np.arange(length, dtype=np.float64) * math.log(coef)
+
+
+def one_pole(x, coef, state, out):
+    """
+    Filtro one-pole y[n] = coef*y[n-1] + (1-coef)*x[n] vectorizado
+    
+    Usa la forma cerrada y[n] = coef^n * (coef*y[-1] + (1-coef) * sum(x[k]*coef^-k))
+    con sumas acumuladas por tramos para que coef^-k no desborde: unas pocas
+    llamadas NumPy por tramo y ningún loop por muestra.
+    
+    Args:
+        x: Array float64 (N,) o (N, canales)
+        coef: Coeficiente del filtro (0.0-1.0)
+        state: Salida anterior y[-1] (escalar o array por canal)
+        out: Array float64 de la misma forma que x (puede ser x)
+    
+    Returns:
+        out
+    """
+    if coef <= 0.0:
+        if out is not x:
+            out[...] = x
+        return out
+    
+    chunk, pos, neg = _one_pole_powers(coef)
+    if x.ndim > 1:
+        pos = pos[:, None]
+        neg = neg[:, None]
+    
+    prev = state
+    for start in range(0, len(x), chunk):
+        m = min(chunk, len(x) - start)
+        seg = out[start:start + m]
+        np.multiply(x[start:start + m], neg[:m], out=seg)
+        np.cumsum(seg, axis=0, out=seg)
+        np.add(seg, coef * prev, out=seg)
+        np.multiply(seg, pos[:m], out=seg)
+        prev = seg[-1]
+    return out
+
+
+def peak_release(x, coef, state, out):
+    """
+    Detector de picos con release exponencial y[n] = max(x[n], coef*y[n-1]) vectorizado
+    
+    En dominio logarítmico la recursión es un máximo acumulado:
+    log y[n] = n*log(coef) + max(cummax(log x[k] - k*log(coef)), log y[-1] + log(coef))
+    
+    Args:
+        x: Array float64 (N,) de niveles no negativos
+        coef: Coeficiente de release (0.0-1.0)
+        state: Salida anterior y[-1]
+        out: Array float64 (N,) (puede ser x)
+    
+    Returns:
+        out
+    """
+    if coef <= 0.0:
+        if out is not x:
+            out[...] = x
+        return out
+    
+    n = len(x)
+    ramp = _release_ramp(coef, 1 << max(0, n - 1).bit_length())[:n]
+    log_coef = math.log(coef)
+    
+    np.maximum(x, _LEVEL_FLOOR, out=out)
+    np.log(out, out=out)
+    np.subtract(out, ramp, out=out)
+    np.maximum.accumulate(out, out=out)
+    np.maximum(out, math.log(max(state, _LEVEL_FLOOR)) + log_coef, out=out)
+    np.add(out, ramp, out=out)
+    np.exp(out, out=out)
+    return out
+
+
+class EnvelopeFollower:
+    """
+    Seguidor de envolvente vectorizado con attack y release reales
+    Detector de picos con release exponencial seguido de un suavizado one-pole de attack
+    """
+    
+    def __init__(self, sample_rate=44100, attack_ms=3.0, release_ms=30.0):
+        """
+        Inicializar seguidor de envolvente
+        
+        Args:
+            sample_rate: Frecuencia de muestreo
+            attack_ms: Tiempo de attack en ms
+            release_ms: Tiempo de release en ms
+        """
+        self.sample_rate = sample_rate
+        self.set_times(attack_ms, release_ms)
+        self.reset()
+    
+    def set_times(self, attack_ms, release_ms):
+        """Establecer tiempos de attack y release (ms)"""
+        self.attack_coef = time_to_coefficient(attack_ms, self.sample_rate)
+        self.release_coef = time_to_coefficient(release_ms, self.sample_rate)
+    
+    def reset(self):
+        """Reiniciar el estado del detector"""
+        self.peak_state = 0.0
+        self.smooth_state = 0.0
+    
+    def process(self, level, out):
+        """
+        Calcular la envolvente de un buffer, continuando el estado anterior
+        
+        Args:
+            level: Array float64 (N,) con el nivel rectificado (|x|)
+            out: Array float64 (N,) para la envolvente (puede ser level)
+        
+        Returns:
+            out
+        """
+        if len(level) == 0:
+            return out
+        
+        peak_release(level, self.release_coef, self.peak_state, out)
+        self.peak_state = float(out[-1])
+        one_pole(out, self.attack_coef, self.smooth_state, out)
+        self.smooth_state = float(out[-1])
+        return out
+
+
+class Compressor:
+    """
+    Compresor streaming por bloques
+    Mantiene el estado del detector entre bloques y procesa in-place sobre
+    buffers preasignados: en régimen estable no reserva memoria
+    """
+    
+    def __init__(self, sample_rate=44100, threshold_db=-12.0, ratio=4.0, knee_db=6.0,
+                 attack_ms=3.0, release_ms=30.0, makeup_db=0.0, max_block=512):
+        """
+        Inicializar compresor
+        
+        Args:
+            sample_rate: Frecuencia de muestreo
+            threshold_db: Umbral en dBFS
+            ratio: Relación de compresión (>= 1.0)
+            knee_db: Ancho de la rodilla suave en dB (0 = rodilla dura)
+            attack_ms: Tiempo de attack en ms
+            release_ms: Tiempo de release en ms
+            makeup_db: Ganancia de compensación en dB
+            max_block: Tamaño de bloque inicial de los buffers de trabajo
+        """
+        self.sample_rate = sample_rate
+        self.detector = EnvelopeFollower(sample_rate, attack_ms, release_ms)
+        self.set_params(threshold_db, ratio, knee_db, attack_ms, release_ms, makeup_db)
+        
+        # Buffers de trabajo (crecen solo si llega un bloque más grande)
+        self._level = np.zeros(max_block, dtype=np.float64)
+        self._work = np.zeros(max_block, dtype=np.float64)
+        
+        # Metering: reducción de ganancia del último bloque (dB, positivo = reducción)
+        self.gain_reduction_db = 0.0
+    
+    def set_params(self, threshold_db=None, ratio=None, knee_db=None,
+                   attack_ms=None, release_ms=None, makeup_db=None):
+        """Actualizar parámetros (None = mantener el valor actual)"""
+        if threshold_db is not None:
+            self.threshold_db = float(threshold_db)
+        if ratio is not None:
+            self.ratio = max(1.0, float(ratio))
+        if knee_db is not None:
+            self.knee_db = max(0.0, float(knee_db))
+        if makeup_db is not None:
+            self.makeup_db = float(makeup_db)
+        if attack_ms is not None:
+            self.attack_ms = attack_ms
+        if release_ms is not None:
+            self.release_ms = release_ms
+        self.detector.set_times(self.attack_ms, self.release_ms)
+    
+    def reset(self):
+        """Reiniciar el estado del detector"""
+        self.detector.reset()
+        self.gain_reduction_db = 0.0
+    
+    def _ensure_capacity(self, frames):
+        """Agrandar los buffers de trabajo si el bloque no entra"""
+        if frames > len(self._level):
+            self._level = np.zeros(frames, dtype=np.float64)
+            self._work = np.zeros(frames, dtype=np.float64)
+    
+    def process(self, block):
+        """
+        Comprimir un bloque in-place
+        
+        Args:
+            block: Array float32 (frames, canales) o (frames,)
+        
+        Returns:
+            El mismo bloque, comprimido
+        """
+        frames = len(block)
+        if frames == 0:
+            return block
+        self._ensure_capacity(frames)
+        level = self._level[:frames]
+        work = self._work[:frames]
+        
+        # Detector: pico de todos los canales (stereo enlazado)
+        if block.ndim > 1:
+            np.abs(block[:, 0], out=level)
+            for channel in range(1, block.shape[1]):
+                np.abs(block[:, channel], out=work)
+                np.maximum(level, work, out=level)
+        else:
+            np.abs(block, out=level)
+        self.detector.process(level, level)
+        
+        # Nivel en dB relativo al umbral
+        np.maximum(level, _LEVEL_FLOOR, out=level)
+        np.log10(level, out=level)
+        np.multiply(level, 20.0, out=level)
+        np.subtract(level, self.threshold_db, out=level)
+        
+        # Curva de ganancia con rodilla suave:
+        # exceso efectivo = (x + k/2)^2 / 2k dentro de la rodilla, x por encima
+        half_knee = self.knee_db / 2.0
+        if self.knee_db > 0.0:
+            np.add(level, half_knee, out=work)
+            np.clip(work, 0.0, self.knee_db, out=work)
+            np.multiply(work, work, out=work)
+            np.multiply(work, 1.0 / (2.0 * self.knee_db), out=work)
+            np.subtract(level, half_knee, out=level)
+            np.maximum(level, 0.0, out=level)
+            np.add(level, work, out=level)
+        else:
+            np.maximum(level, 0.0, out=level)
+        
+        # Reducción en dB (negativa) y metering
+        np.multiply(level, 1.0 / self.ratio - 1.0, out=level)
+        self.gain_reduction_db = -float(level.min())
+        
+        # dB -> ganancia lineal con makeup
+        np.add(level, self.makeup_db, out=level)
+        np.multiply(level, math.log(10.0) / 20.0, out=level)
+        np.exp(level, out=level)
+        
+        if block.ndim > 1:
+            np.multiply(block, level[:, None], out=block, casting='same_kind')
+        else:
+            np.multiply(block, level, out=block, casting='same_kind')
+        return block
+
+
+def biquad_coefficients(band_type, freq, q, gain_db, sample_rate):
+    """
+    Coeficientes de un biquad (fórmulas RBJ Audio EQ Cookbook)
+    
+    Args:
+        band_type: 'lowshelf', 'peaking' o 'highshelf'
+        freq: Frecuencia central/de corte en Hz
+        q: Factor de calidad
+        gain_db: Ganancia en dB
+        sample_rate: Frecuencia de muestreo
+    
+    Returns:
+        Tupla normalizada (b0, b1, b2, a1, a2)
+    """
+    a = 10.0 ** (gain_db / 40.0)
+    w0 = 2.0 * math.pi * freq / sample_rate
+    cos_w0 = math.cos(w0)
+    alpha = math.sin(w0) / (2.0 * q)
+    
+    if band_type == 'peaking':
+        b0, b1, b2 = 1.0 + alpha * a, -2.0 * cos_w0, 1.0 - alpha * a
+        a0, a1, a2 = 1.0 + alpha / a, -2.0 * cos_w0, 1.0 - alpha / a
+    elif band_type in ('lowshelf', 'highshelf'):
+        sqrt_a_alpha = 2.0 * math.sqrt(a) * alpha
+        sign = 1.0 if band_type == 'lowshelf' else -1.0
+        b0 = a * ((a + 1) - sign * (a - 1) * cos_w0 + sqrt_a_alpha)
+        b1 = sign * 2 * a * ((a - 1) - sign * (a + 1) * cos_w0)
+        b2 = a * ((a + 1) - sign * (a - 1) * cos_w0 - sqrt_a_alpha)
+        a0 = (a + 1) + sign * (a - 1) * cos_w0 + sqrt_a_alpha
+        a1 = -sign * 2 * ((a - 1) + sign * (a + 1) * cos_w0)
+        a2 = (a + 1) + sign * (a - 1) * cos_w0 - sqrt_a_alpha
+    else:
+        raise ValueError(f"Tipo de banda desconocido: {band_type}")
+    
+    return (b0 / a0, b1 / a0, b2 / a0, a1 / a0, a2 / a0)
+
+
+class ParametricEQ:
+    """
+    EQ paramétrico de biquads en cascada (low shelf, peaking, high shelf)
+    
+    La cascada se procesa como un único sistema en espacio de estados por
+    sub-bloques de EQ_SUBBLOCK frames: salida = T*x + O*s, estado = F*s + G*x.
+    Las matrices se recalculan solo cuando cambia alguna ganancia (pots), en el
+    thread que la cambia, y se publican con un cambio de referencia: el thread
+    de audio nunca las calcula. El estado de los filtros se conserva entre bloques.
+    """
+    
+    def __init__(self, sample_rate=44100, bands=EQ_BANDS, subblock=EQ_SUBBLOCK, channels=2):
+        """
+        Inicializar EQ
+        
+        Args:
+            sample_rate: Frecuencia de muestreo
+            bands: Tupla de (tipo, frecuencia, Q) por banda
+            subblock: Frames por sub-bloque
+            channels: Canales de audio
+        """
+        self.sample_rate = sample_rate
+        self.bands = tuple(bands)
+        self.gains_db = [0.0] * len(self.bands)
+        self.subblock = subblock
+        self.num_states = 2 * len(self.bands)
+        self._allocate(channels)
+        
+        # (ganancias, T, O, F, G) publicadas juntas: process toma la tupla una vez
+        self.coefficient_updates = 0
+        self._matrices = None
+        self._rebuild()
+    
+    def _allocate(self, channels):
+        """Reservar estado y buffers de trabajo para una cantidad de canales"""
+        self._work = self._make_work(channels)
+        self.state = self._work[0]
+        
+    def _make_work(self, channels):
+        """
+        Estado nulo y buffers de trabajo para una cantidad de canales
+        
+        Returns:
+            (estado por canal de todos los biquads, x, y, y temporal, estado
+            temporal, estado nuevo)
+        """
+        return (
+            np.zeros((self.num_states, channels), dtype=np.float64),
+            np.zeros((self.subblock, channels), dtype=np.float64),
+            np.zeros((self.subblock, channels), dtype=np.float64),
+            np.zeros((self.subblock, channels), dtype=np.float64),
+            np.zeros((self.num_states, channels), dtype=np.float64),
+            np.zeros((self.num_states, channels), dtype=np.float64),
+        )
+    
+    def set_band_gain(self, band, gain_db):
+        """
+        Establecer ganancia de una banda (recalcula coeficientes solo si cambia)
+        
+        Args:
+            band: Índice de banda
+            gain_db: Ganancia en dB
+        """
+        gain_db = float(gain_db)
+        if self.gains_db[band] != gain_db:
+            self.gains_db[band] = gain_db
+            self._rebuild()
+    
+    def set_gains(self, gains_db):
+        """Establecer las ganancias de todas las bandas (dB, un solo recálculo)"""
+        changed = False
+        for band, gain_db in enumerate(gains_db):
+            gain_db = float(gain_db)
+            if self.gains_db[band] != gain_db:
+                self.gains_db[band] = gain_db
+                changed = True
+        if changed:
+            self._rebuild()
+    
+    def is_flat(self):
+        """Verificar si todas las bandas están en 0 dB"""
+        return not any(self.gains_db)
+    
+    def reset(self):
+        """Limpiar el estado de los filtros"""
+        self.state.fill(0.0)
+    
+    def _rebuild(self):
+        """
+        Recalcular y publicar las matrices (thread de control)
+        
+        Se calcula sobre una copia de las ganancias; si otra llamada las
+        cambió mientras tanto, se vuelve a calcular con las nuevas.
+        """
+        gains = tuple(self.gains_db)
+        while True:
+            self._matrices = (gains,) + self._build_matrices(gains)
+            self.coefficient_updates += 1
+            current = tuple(self.gains_db)
+            if current == gains:
+                return
+            gains = current
+    
+    def _build_matrices(self, gains_db):
+        """
+        Matrices de bloque de la cascada para unas ganancias
+        
+        La cascada se arma como un solo sistema s' = A*s + B*u, y = C*s + D*u
+        (estado: z1, z2 de cada biquad) y las matrices de sub-bloque salen de
+        las potencias de A, sin simular muestra por muestra.
+        
+        Returns:
+            (T, O, F, G): Toeplitz de la respuesta al impulso, salida por estado
+            inicial, A^(n+1) y A^n*B para n = 0..subblock-1
+        """
+        num_states = self.num_states
+        length = self.subblock
+        
+        # Filas de A/B (estado siguiente) y de C/D (salida) en función de (s, u)
+        A = np.zeros((num_states, num_states))
+        B = np.zeros(num_states)
+        c = np.zeros(num_states)
+        d = 1.0
+        for band, ((band_type, freq, q), gain_db) in enumerate(zip(self.bands, gains_db)):
+            b0, b1, b2, a1, a2 = biquad_coefficients(band_type, freq, q, gain_db, self.sample_rate)
+            z1, z2 = 2 * band, 2 * band + 1
+            # Forma directa II transpuesta con la salida de la banda anterior como entrada
+            y_c = b0 * c
+            y_c[z1] += 1.0
+            y_d = b0 * d
+            A[z1] = b1 * c - a1 * y_c
+            A[z1, z2] += 1.0
+            B[z1] = b1 * d - a1 * y_d
+            A[z2] = b2 * c - a2 * y_c
+            B[z2] = b2 * d - a2 * y_d
+            c, d = y_c, y_d
+        
+        # powers[n] = A^n, n = 0..length
+        powers = np.empty((length + 1, num_states, num_states))
+        powers[0] = np.eye(num_states)
+        for n in range(1, length + 1):
+            np.matmul(powers[n - 1], A, out=powers[n])
+        
+        # Trayectorias de estado para F (estado -> estado) y G (entrada -> estado)
+        F_steps = np.ascontiguousarray(powers[1:])
+        G_steps = powers[:length] @ B
+        # O: salida debida al estado inicial
+        O = powers[:length].transpose(0, 2, 1) @ c
+        # T: Toeplitz con la respuesta al impulso (h[0] = D, h[n] = C*A^(n-1)*B)
+        impulse = np.empty(length)
+        impulse[0] = d
+        impulse[1:] = G_steps[:length - 1] @ c
+        index = np.arange(length)
+        lag = index[:, None] - index[None, :]
+        T = np.where(lag >= 0, impulse[np.clip(lag, 0, None)], 0.0)
+        return T, O, F_steps, G_steps
+        
+    def _process_subblock(self, x, y, matrices, work):
+        """Procesar m <= subblock frames de x (float64) hacia y"""
+        m = len(x)
+        state, _, _, tmp_y, tmp_s, new_s = work
+        _, T, O, F_steps, G_steps = matrices
+        
+        # Estado nuevo: F_m * s + G_m * x  (G_m[:, j] = trayectoria del impulso en m-1-j)
+        np.matmul(F_steps[m - 1], state, out=new_s)
+        np.matmul(G_steps[m - 1::-1].T, x, out=tmp_s)
+        
+        # Salida: T * x + O * s
+        np.matmul(T[:m, :m], x, out=y)
+        np.matmul(O[:m], state, out=tmp_y[:m])
+        np.add(y, tmp_y[:m], out=y)
+        
+        np.add(new_s, tmp_s, out=state)
+    
+    def process(self, block):
+        """
+        Ecualizar un bloque in-place
+        
+        Args:
+            block: Array float32 (frames, canales)
+        
+        Returns:
+            El mismo bloque, ecualizado
+        """
+        if block.shape[1] != self.state.shape[1]:
+            self._allocate(block.shape[1])
+        # Una sola lectura: un cambio de ganancias a mitad de bloque rige desde el próximo
+        return self._run(block, self._matrices, self._work)
+        
+    def process_isolated(self, block):
+        """
+        Ecualizar un golpe aislado in-place, desde estado nulo
+        
+        Usa las matrices publicadas con estado y buffers propios de la
+        llamada: se puede llamar desde varios threads a la vez y no toca el
+        estado del bus master.
+        
+        Args:
+            block: Array float32 (frames, canales)
+        
+        Returns:
+            El mismo bloque, ecualizado
+        """
+        return self._run(block, self._matrices, self._make_work(block.shape[1]))
+    
+    def _run(self, block, matrices, work):
+        """Procesar un bloque por sub-bloques con unas matrices y un estado dados"""
+        for start in range(0, len(block), self.subblock):
+            seg = block[start:start + self.subblock]
+            m = len(seg)
+            x = work[1][:m]
+            y = work[2][:m]
+            np.copyto(x, seg)
+            self._process_subblock(x, y, matrices, work)
+            np.copyto(seg, y, casting='same_kind')
+        return block
+
+
+class Reverb:
+    """
+    Reverb algorítmica estilo Freeverb (8 combs + 4 allpass por canal)
+    
+    Los 16 combs (8 por canal) se procesan en paralelo como columnas de una
+    sola matriz y las líneas de retardo son buffers circulares preasignados.
+    Cada sub-bloque es más corto que el retardo más corto, así que toda la
+    realimentación de un sub-bloque sale de muestras ya escritas: el costo
+    por bloque es fijo y no hay loops por muestra.
+    """
+    
+    FIXED_GAIN = 0.015
+    SCALE_ROOM = 0.28
+    OFFSET_ROOM = 0.7
+    SCALE_DAMP = 0.4
+    SCALE_WET = 3.0
+    ALLPASS_FEEDBACK = 0.5
+    
+    def __init__(self, sample_rate=44100, preset='room'):
+        """
+        Inicializar reverb
+        
+        Args:
+            sample_rate: Frecuencia de muestreo
+            preset: Nombre del preset inicial (ver REVERB_PRESETS)
+        """
+        scale = sample_rate / 44100.0
+        combs = [int(t * scale) for t in REVERB_COMB_TUNINGS]
+        allpasses = [int(t * scale) for t in REVERB_ALLPASS_TUNINGS]
+        spread = int(REVERB_STEREO_SPREAD * scale)
+        
+        # Combs: columnas 0-7 canal izquierdo, 8-15 canal derecho
+        self._comb_lengths = np.array(combs + [t + spread for t in combs], dtype=np.int64)
+        self._comb_offsets = np.concatenate(([0], np.cumsum(self._comb_lengths)[:-1]))
+        self._comb_buffer = np.zeros(int(self._comb_lengths.sum()), dtype=np.float64)
+        self._comb_pos = np.zeros(len(self._comb_lengths), dtype=np.int64)
+        self._comb_filter = np.zeros(len(self._comb_lengths), dtype=np.float64)
+        
+        # Allpass: una etapa por afinación, columnas (izquierdo, derecho)
+        self._allpass_lengths = [np.array([t, t + spread], dtype=np.int64) for t in allpasses]
+        self._allpass_offsets = [np.array([0, t], dtype=np.int64) for t in allpasses]
+        self._allpass_buffers = [np.zeros(2 * t + spread, dtype=np.float64) for t in allpasses]
+        self._allpass_pos = [np.zeros(2, dtype=np.int64) for _ in allpasses]
+        
+        # Sub-bloque: nunca más largo que el retardo más corto
+        self.subblock = min(min(allpasses), min(combs))
+        sub = self.subblock
+        num_combs = len(self._comb_lengths)
+        
+        # Buffers de trabajo preasignados
+        self._ramp = np.arange(sub, dtype=np.int64)
+        self._comb_index = np.zeros((sub, num_combs), dtype=np.int64)
+        self._comb_out = np.zeros((sub, num_combs), dtype=np.float64)
+        self._comb_filtered = np.zeros((sub, num_combs), dtype=np.float64)
+        self._allpass_index = np.zeros((sub, 2), dtype=np.int64)
+        self._allpass_out = np.zeros((sub, 2), dtype=np.float64)
+        self._input = np.zeros((sub, 1), dtype=np.float64)
+        self._wet = np.zeros((sub, 2), dtype=np.float64)
+        self._tmp = np.zeros((sub, 2), dtype=np.float64)
+        
+        self.set_preset(preset)
+    
+    def set_preset(self, name):
+        """
+        Seleccionar preset (room, plate, hall)
+        
+        Args:
+            name: Nombre del preset
+        """
+        if name not in REVERB_PRESETS:
+            raise ValueError(f"Preset de reverb desconocido: {name}")
+        preset = REVERB_PRESETS[name]
+        self.preset = name
+        self.set_params(preset['room_size'], preset['damping'])
+    
+    def set_params(self, room_size, damping):
+        """
+        Establecer tamaño de sala y amortiguación
+        
+        Args:
+            room_size: Tamaño de sala (0.0-1.0)
+            damping: Amortiguación de agudos (0.0-1.0)
+        """
+        self.room_size = max(0.0, min(1.0, room_size))
+        self.damping = max(0.0, min(1.0, damping))
+        self.feedback = self.room_size * self.SCALE_ROOM + self.OFFSET_ROOM
+        self.damp = self.damping * self.SCALE_DAMP
+    
+    def reset(self):
+        """Vaciar las líneas de retardo"""
+        self._comb_buffer.fill(0.0)
+        self._comb_filter.fill(0.0)
+        for buffer in self._allpass_buffers:
+            buffer.fill(0.0)
+    
+    def _ring_index(self, index, positions, lengths, offsets, m):
+        """Índices planos de m muestras consecutivas en varios buffers circulares"""
+        index = index[:m]
+        np.add(self._ramp[:m, None], positions, out=index)
+        np.remainder(index, lengths, out=index)
+        np.add(index, offsets, out=index)
+        return index
+    
+    def _process_subblock(self, block, mix):
+        """Procesar m <= subblock frames y sumar la cola al bloque"""
+        m = len(block)
+        
+        # Entrada mono
+        x = self._input[:m]
+        np.add(block[:, 0:1], block[:, 1:2], out=x)
+        np.multiply(x, self.FIXED_GAIN, out=x)
+        
+        # Combs en paralelo: leer salida, filtrar (damping) y realimentar
+        index = self._ring_index(self._comb_index, self._comb_pos, self._comb_lengths,
+                                 self._comb_offsets, m)
+        comb_out = self._comb_out[:m]
+        filtered = self._comb_filtered[:m]
+        np.take(self._comb_buffer, index, out=comb_out)
+        one_pole(comb_out, self.damp, self._comb_filter, filtered)
+        self._comb_filter[:] = filtered[-1]
+        np.multiply(filtered, self.feedback, out=filtered)
+        np.add(filtered, x, out=filtered)
+        np.put(self._comb_buffer, index, filtered)
+        self._comb_pos += m
+        np.remainder(self._comb_pos, self._comb_lengths, out=self._comb_pos)
+        
+        # Sumar combs por canal
+        wet = self._wet[:m]
+        np.sum(comb_out.reshape(m, 2, -1), axis=2, out=wet)
+        
+        # Allpass en serie
+        tmp = self._tmp[:m]
+        out = self._allpass_out[:m]
+        for buffer, positions, lengths, offsets in zip(self._allpass_buffers, self._allpass_pos,
+                                                       self._allpass_lengths, self._allpass_offsets):
+            index = self._ring_index(self._allpass_index, positions, lengths, offsets, m)
+            np.take(buffer, index, out=out)
+            np.multiply(out, self.ALLPASS_FEEDBACK, out=tmp)
+            np.add(tmp, wet, out=tmp)
+            np.put(buffer, index, tmp)
+            np.subtract(out, wet, out=wet)
+            positions += m
+            np.remainder(positions, lengths, out=positions)
+        
+        # Mezclar la cola sobre la señal (envío)
+        np.multiply(wet, mix * self.SCALE_WET, out=wet)
+        np.add(block, wet, out=block, casting='same_kind')
+    
+    def process(self, block, mix):
+        """
+        Agregar reverb a un bloque in-place
+        
+        Args:
+            block: Array float32 (frames, 2)
+            mix: Nivel de la señal reverberada (0.0-1.0)
+        
+        Returns:
+            El mismo bloque con la reverb sumada
+        """
+        for start in range(0, len(block), self.subblock):
+            self._process_subblock(block[start:start + self.subblock], mix)
+        return block
+
+
+class TempoDelay:
+    """
+    Delay estéreo sincronizado al tempo sobre una línea de retardo circular
+    
+    El buffer se reserva una sola vez para la división más larga al BPM
+    mínimo, así que procesar nunca asigna memoria. Al cambiar el tempo o la
+    división se lee del tap viejo y del nuevo a la vez y se hace un
+    crossfade lineal, sin saltos en la salida. Los cambios que llegan durante
+    un crossfade esperan a que termine (solo cuenta el último).
+    
+    El hilo de control solo publica valores (largo objetivo y contador de
+    resets); el hilo de audio los lee una vez por sub-bloque y es el único
+    que toca el estado del tap, así que no hace falta lock.
+    """
+    
+    def __init__(self, sample_rate=44100, bpm=120, min_bpm=60, division='1/8',
+                 max_block=512):
+        """
+        Inicializar delay
+        
+        Args:
+            sample_rate: Frecuencia de muestreo
+            bpm: Tempo inicial
+            min_bpm: Tempo mínimo (dimensiona el buffer)
+            division: División inicial (ver DELAY_DIVISIONS)
+            max_block: Tamaño máximo de sub-bloque de trabajo
+        """
+        self.sample_rate = sample_rate
+        self.min_bpm = min_bpm
+        longest = max(beats for beats, _ in DELAY_DIVISIONS.values())
+        self.max_delay = int(math.ceil(longest * 60.0 / min_bpm * sample_rate))
+        self._buffer = np.zeros((self.max_delay, 2), dtype=np.float32)
+        self._write = 0
+        
+        self.bpm = bpm
+        self.division = division
+        self.feedback = 0.35
+        self.delay_frames = self._frames_for(bpm, division)
+        
+        # Publicado por el hilo de control: largo objetivo y resets pedidos
+        self._target_frames = self.delay_frames
+        self._reset_requests = 0
+        self._resets_applied = 0
+        
+        # Crossfade entre el tap anterior y el nuevo (solo hilo de audio)
+        self._prev_frames = self.delay_frames
+        self._xfade_pos = DELAY_XFADE_FRAMES
+        
+        # Buffers de trabajo preasignados
+        self._max_block = max_block
+        self._ramp = np.arange(max_block, dtype=np.int64)
+        self._index = np.zeros(max_block, dtype=np.int64)
+        self._tap = np.zeros((max_block, 2), dtype=np.float32)
+        self._tap_prev = np.zeros((max_block, 2), dtype=np.float32)
+        self._fade = np.zeros((max_block, 1), dtype=np.float32)
+        self._feed = np.zeros((max_block, 2), dtype=np.float32)
+    
+    def _frames_for(self, bpm, division):
+        """Largo del retardo en frames para un tempo y división"""
+        beats, _ = DELAY_DIVISIONS[division]
+        bpm = max(self.min_bpm, bpm)
+        return min(self.max_delay, int(round(beats * 60.0 / bpm * self.sample_rate)))
+    
+    def _retarget(self, frames):
+        """Publicar un nuevo largo de retardo (se aplica con crossfade en process)"""
+        self._target_frames = frames
+    
+    def _apply_requests(self):
+        """Aplicar reset y largo objetivo publicados (solo hilo de audio)"""
+        # Leer cada valor publicado una sola vez; nunca se escriben desde acá
+        requests = self._reset_requests
+        target = self._target_frames
+        if requests != self._resets_applied:
+            self._resets_applied = requests
+            self._buffer.fill(0.0)
+            self.delay_frames = target
+            self._prev_frames = target
+            self._xfade_pos = DELAY_XFADE_FRAMES
+            return
+        if self._xfade_pos < DELAY_XFADE_FRAMES or target == self.delay_frames:
+            return
+        self._prev_frames = self.delay_frames
+        self.delay_frames = target
+        self._xfade_pos = 0
+    
+    def set_tempo(self, bpm):
+        """
+        Sincronizar al tempo del secuenciador
+        
+        Args:
+            bpm: Tempo en BPM
+        """
+        self.bpm = bpm
+        self._retarget(self._frames_for(bpm, self.division))
+    
+    def set_division(self, division):
+        """
+        Seleccionar división rítmica
+        
+        Args:
+            division: Clave de DELAY_DIVISIONS ('1/8', '1/8.', '1/4', ...)
+        """
+        if division not in DELAY_DIVISIONS:
+            raise ValueError(f"División de delay desconocida: {division}")
+        self.division = division
+        self._retarget(self._frames_for(self.bpm, division))
+    
+    def set_feedback(self, feedback):
+        """Establecer realimentación (0.0-DELAY_FEEDBACK_MAX)"""
+        self.feedback = max(0.0, min(DELAY_FEEDBACK_MAX, feedback))
+    
+    def reset(self):
+        """Pedir vaciar la línea de retardo (se aplica al inicio del próximo process)"""
+        self._reset_requests += 1
+    
+    def _read(self, delay, out, m):
+        """Leer m frames del tap a `delay` frames del puntero de escritura"""
+        index = self._index[:m]
+        np.add(self._ramp[:m], self._write - delay, out=index)
+        np.remainder(index, self.max_delay, out=index)
+        np.take(self._buffer, index, axis=0, out=out)
+    
+    def _process_subblock(self, block, mix):
+        """Procesar m frames (m <= retardo más corto en uso)"""
+        m = len(block)
+        tap = self._tap[:m]
+        self._read(self.delay_frames, tap, m)
+        
+        # Crossfade lineal desde el tap anterior
+        if self._xfade_pos < DELAY_XFADE_FRAMES:
+            prev = self._tap_prev[:m]
+            self._read(self._prev_frames, prev, m)
+            fade = self._fade[:m]
+            np.add(self._ramp[:m, None], self._xfade_pos, out=fade, casting='unsafe')
+            np.multiply(fade, 1.0 / DELAY_XFADE_FRAMES, out=fade)
+            np.minimum(fade, 1.0, out=fade)
+            np.subtract(tap, prev, out=tap)
+            np.multiply(tap, fade, out=tap)
+            np.add(tap, prev, out=tap)
+            self._xfade_pos += m
+        
+        # Escribir entrada + realimentación (el índice de escritura es el tap de retardo 0)
+        feed = self._feed[:m]
+        np.multiply(tap, self.feedback, out=feed)
+        np.add(feed, block, out=feed)
+        index = self._index[:m]
+        np.add(self._ramp[:m], self._write, out=index)
+        np.remainder(index, self.max_delay, out=index)
+        self._buffer[index] = feed
+        self._write = (self._write + m) % self.max_delay
+        
+        # Sumar los ecos al bloque (envío)
+        np.multiply(tap, mix, out=tap)
+        np.add(block, tap, out=block)
+    
+    def process(self, block, mix):
+        """
+        Agregar ecos a un bloque in-place
+        
+        Args:
+            block: Array float32 (frames, 2)
+            mix: Nivel de la señal retardada (0.0-1.0)
+        
+        Returns:
+            El mismo bloque con los ecos sumados
+        """
+        start = 0
+        while start < len(block):
+            self._apply_requests()
+            step = min(self._max_block, self.delay_frames, self._prev_frames)
+            # Cortar en el final del crossfade para poder aplicar uno pendiente
+            if self._xfade_pos < DELAY_XFADE_FRAMES:
+                step = min(step, DELAY_XFADE_FRAMES - self._xfade_pos)
+            self._process_subblock(block[start:start + step], mix)
+            start += step
+        return block
+
+
 class EffectsManager:
-    """Gestor de efectos de audio ultra optimizado - Solo Compresor y EQ"""
+    """Gestor de efectos de audio ultra optimizado - Compresor, EQ, Delay y Reverb"""
     
-    def __init__(self, sample_rate=44100):
+    def __init__(self, sample_rate=44100, bpm=120, min_bpm=60, block_size=512):
+        """
+        Inicializar efectos
+        
+        Args:
+            sample_rate: Frecuencia de muestreo
+            bpm: Tempo inicial (delay sincronizado)
+            min_bpm: Tempo mínimo (dimensiona el buffer del delay)
+            block_size: Frames por bloque del bus master (AUDIO_BUFFER_SIZE)
+        """
         self.sample_rate = sample_rate
         
         # Solo dos efectos principales
         self.compressor_mix = 0.0
-        self.eq_mix = 0.0  # Reemplaza reverb por EQ
+        self.eq_mix = 0.0
         self.intensity = 0.0
         
         # Parámetros específicos (optimizados para drums)
@@ -22,38 +956,155 @@ class EffectsManager:
         self.compressor_ratio = 4.0  # Ratio más agresivo
         self.compressor_attack = 3  # ms - más rápido para drums
         self.compressor_release = 30  # ms - más rápido para drums
-        self.reverb_room_size = 0.5
-        self.reverb_damping = 0.5
+        self.compressor_knee = 6.0  # dB - rodilla suave
+        self.compressor_makeup = 0.0  # dB
+        self.reverb_mix = 0.0
+        self.reverb_preset = 'room'
+        self.reverb_room_size = REVERB_PRESETS['room']['room_size']
+        self.reverb_damping = REVERB_PRESETS['room']['damping']
+        self.delay_mix = 0.0
+        self.delay_feedback = 35.0
+        self.delay_division = '1/8'
+        
+        # Compresor streaming para el bus master (mantiene estado entre bloques)
+        self.compressor = Compressor(
+            sample_rate,
+            threshold_db=20.0 * math.log10(self.compressor_threshold),
+            ratio=self.compressor_ratio,
+            knee_db=self.compressor_knee,
+            attack_ms=self.compressor_attack,
+            release_ms=self.compressor_release,
+            makeup_db=self.compressor_makeup
+        )
+        
+        # EQ paramétrico con estado para el bus master (los golpes aislados usan
+        # sus matrices con estado propio, ver process_isolated)
+        self.eq = ParametricEQ(sample_rate)
         
-        # Control de frecuencia de procesamiento ultra optimizado
-        self.last_process_time = 0
-        self.process_interval = 1.0  # 1000ms para eliminar lag completamente
-        self.skip_count = 0
-        self.max_skip = 10  # Procesar cada 10 samples máximo
+        # Delay sincronizado al tempo (buffer fijo dimensionado para min_bpm)
+        self.delay = TempoDelay(sample_rate, bpm, min_bpm, self.delay_division)
+        self.delay.set_feedback(self.delay_feedback / 100.0 * DELAY_FEEDBACK_MAX)
         
-        # Cache simple para evitar reprocesamiento
-        self.last_cache_time = 0
-        self.cache_duration = 0.5  # Cache por 500ms
+        # Reverb del bus master
+        self.reverb = Reverb(sample_rate, self.reverb_preset)
+        
+        # Copia dry preasignada para las mezclas dry/wet por bloque
+        self._allocate_dry(block_size, 2)
         
         # Estado de procesamiento
         self.processing_enabled = True
+        
+        # Versión de parámetros (se incrementa en cada cambio, para caches externos)
+        self.params_version = 0
+    
+    def _allocate_dry(self, frames, channels):
+        """Reservar la copia dry para bloques de hasta `frames` frames"""
+        self._dry = np.zeros((frames, channels), dtype=np.float32)
     
     def has_active_effects(self):
         """Verificar si hay efectos activos"""
-        return self.intensity > 10 and (self.compressor_mix > 10 or self.reverb_mix > 10)
+        return self.intensity > 10 and (
+            self.compressor_mix > 10 or self.eq_active() or
+            self.delay_mix > 10 or self.reverb_mix > 10
+        )
+    
+    def has_hit_effects(self):
+        """
+        Verificar si hay efectos que se aplican por golpe (process)
+        
+        Delay y reverb solo existen en el bus master (process_block), así que
+        no cuentan para el camino por golpe.
+        """
+        return self.intensity > 10 and (self.compressor_mix > 20 or self.eq_active())
+    
+    def eq_active(self):
+        """Verificar si el EQ modifica el audio (alguna banda distinta de 0 dB)"""
+        return not self.eq.is_flat()
     
     def get_intensity(self):
         """Obtener intensidad actual"""
         return self.intensity
     
+    def get_gain_reduction(self):
+        """Obtener reducción de ganancia del compresor en el último bloque (dB)"""
+        return self.compressor.gain_reduction_db
+    
     def set_compressor_mix(self, mix):
         """Establecer mix del compresor (0-100)"""
         self.compressor_mix = max(0, min(100, mix))
         self._invalidate_cache()
     
     def set_eq_mix(self, mix):
-        """Establecer mix del EQ (0-100)"""
+        """Establecer mix del EQ (0-100): profundidad de la curva EQ_SMILE_CURVE (<= 10 = plano)"""
         self.eq_mix = max(0, min(100, mix))
+        depth = round(self.eq_mix) / 100.0 if self.eq_mix > 10 else 0.0
+        self.set_eq_gains([gain * depth for gain in EQ_SMILE_CURVE])
+    
+    def set_eq_gains(self, gains_db):
+        """
+        Establecer la ganancia de cada banda del EQ
+        
+        El EQ se aplica mientras alguna banda no esté en 0 dB, sin importar
+        eq_mix; el próximo set_eq_mix reemplaza estas ganancias por la curva
+        EQ_SMILE_CURVE escalada.
+        
+        Args:
+            gains_db: Lista de ganancias en dB (una por banda de EQ_BANDS)
+        """
+        self.eq.set_gains(gains_db)
+        self._invalidate_cache()
+    
+    def set_delay_mix(self, mix):
+        """Establecer mix del delay (0-100)"""
+        mix = max(0, min(100, mix))
+        # Al reactivarse no deben sonar ecos viejos
+        if self.delay_mix <= 10 < mix:
+            self.delay.reset()
+        self.delay_mix = mix
+        self._invalidate_cache()
+    
+    def set_delay_feedback(self, feedback):
+        """Establecer realimentación del delay (0-100, limitada a DELAY_FEEDBACK_MAX)"""
+        self.delay_feedback = max(0, min(100, feedback))
+        self.delay.set_feedback(self.delay_feedback / 100.0 * DELAY_FEEDBACK_MAX)
+        self._invalidate_cache()
+    
+    def set_delay_division(self, division):
+        """
+        Seleccionar división rítmica del delay
+        
+        Args:
+            division: '1/16', '1/8', '1/8.', '1/4', '1/4.' o '1/2'
+        """
+        self.delay.set_division(division)
+        self.delay_division = division
+        self._invalidate_cache()
+    
+    def set_tempo(self, bpm):
+        """
+        Sincronizar efectos temporales al tempo del secuenciador
+        
+        Args:
+            bpm: Tempo en BPM
+        """
+        self.delay.set_tempo(bpm)
+    
+    def set_reverb_mix(self, mix):
+        """Establecer mix de la reverb (0-100)"""
+        self.reverb_mix = max(0, min(100, mix))
+        self._invalidate_cache()
+    
+    def set_reverb_preset(self, name):
+        """
+        Seleccionar preset de reverb
+        
+        Args:
+            name: 'room', 'plate' o 'hall'
+        """
+        self.reverb.set_preset(name)
+        self.reverb_preset = name
+        self.reverb_room_size = self.reverb.room_size
+        self.reverb_damping = self.reverb.damping
         self._invalidate_cache()
     
     def set_intensity(self, intensity):
@@ -62,8 +1113,33 @@ class EffectsManager:
         self._invalidate_cache()
     
     def _invalidate_cache(self):
-        """Invalidar cache cuando cambian parámetros"""
-        self.last_cache_time = 0
+        """Invalidar caches externos cuando cambian parámetros"""
+        self.params_version += 1
+    
+    def get_parameter_snapshot(self):
+        """
+        Obtener snapshot inmutable de los parámetros que afectan al sonido
+        
+        Returns:
+            Tupla hasheable, usable como parte de una clave de cache
+        """
+        return (
+            round(self.compressor_mix, 1),
+            round(self.eq_mix, 1),
+            tuple(self.eq.gains_db),
+            round(self.intensity, 1),
+            round(self.reverb_mix, 1),
+            self.reverb_preset,
+            round(self.delay_mix, 1),
+            round(self.delay_feedback, 1),
+            self.delay_division,
+            self.compressor_threshold,
+            self.compressor_ratio,
+            self.compressor_attack,
+            self.compressor_release,
+            self.compressor_knee,
+            self.compressor_makeup,
+        )
     
     def process(self, audio_data):
         """
@@ -71,7 +1147,7 @@ class EffectsManager:
         
         Args:
             audio_data: numpy array del audio
-            
+        
         Returns:
             Audio procesado con efectos
         """
@@ -82,33 +1158,12 @@ class EffectsManager:
         if not self.processing_enabled:
             return audio_data
         
-        # Control de frecuencia ultra optimizado
-        import time
-        current_time = time.time()
-        if current_time - self.last_process_time < self.process_interval:
-            return audio_data
-        
-        # Skip processing para reducir carga
-        self.skip_count += 1
-        if self.skip_count < self.max_skip:
-            return audio_data
-        self.skip_count = 0
-        
-        self.last_process_time = current_time
-        
         # Si intensidad es muy baja, no aplicar efectos
         if self.intensity <= 10:  # Umbral bajo para EQ audible
             return audio_data
         
-        # Verificar cache simple basado en tiempo
-        current_time = time.time()
-        if current_time - self.last_cache_time < self.cache_duration:
-            return audio_data  # Retornar audio sin procesar si está en cache
-        
-        # Solo procesar si hay efectos activos significativos
-        total_mix = (self.compressor_mix + self.eq_mix) / 100.0
-        
-        if total_mix < 0.1:  # Threshold bajo para EQ audible
+        # Solo procesar si hay efectos por golpe activos (compresor o EQ)
+        if self.compressor_mix <= 20 and not self.eq_active():
             return audio_data
         
         # Preservar dimensiones originales del audio
@@ -122,103 +1177,113 @@ class EffectsManager:
         if self.compressor_mix > 20:  # Umbral medio para compresor
             wet = self._apply_compressor_fast(wet)
         
-        if self.eq_mix > 10:  # Umbral bajo para EQ audible
+        if self.eq_active():
             wet = self._apply_eq_fast(wet)
         
         # Mix dry/wet con intensidad general
         intensity_factor = self.intensity / 100.0
         processed = dry * (1.0 - intensity_factor) + wet * intensity_factor
         
-        # Actualizar cache
-        self.last_cache_time = current_time
-        
         return processed
     
-    def _apply_compressor_fast(self, audio):
-        """Compresor profesional con attack/release"""
-        # Preservar dimensiones originales
-        original_shape = audio.shape
+    def _blend(self, block, reference, amount):
+        """Mezclar in-place: block = reference + amount * (block - reference)"""
+        if amount >= 1.0:
+            return block
+        np.subtract(block, reference, out=block)
+        np.multiply(block, amount, out=block)
+        np.add(block, reference, out=block)
+        return block
+    
+    def process_block(self, block):
+        """
+        Aplicar efectos a un bloque del bus master in-place (con estado entre bloques)
+        
+        Args:
+            block: Array float32 (frames, 2) normalizado
+        
+        Returns:
+            El mismo bloque, procesado
+        """
+        if not self.processing_enabled or self.intensity <= 10:
+            return block
         
-        # Trabajar con audio plano para procesamiento
+        frames = len(block)
+        if frames > len(self._dry) or block.shape[1:] != self._dry.shape[1:]:
+            self._allocate_dry(frames, block.shape[1])
+        dry = self._dry[:frames]
+        np.copyto(dry, block)
+        
+        if self.compressor_mix > 20:
+            self.compressor.process(block)
+            self._blend(block, dry, self.compressor_mix / 100.0)
+        
+        if self.eq_active():
+            self.eq.process(block)
+        
+        # Delay antes de la reverb: los ecos también reverberan
+        if self.delay_mix > 10:
+            self.delay.process(block, self.delay_mix / 100.0)
+        
+        # Reverb sobre la suma (envío): solo en el bus, nunca por golpe
+        if self.reverb_mix > 10:
+            self.reverb.process(block, self.reverb_mix / 100.0)
+        
+        # Mix dry/wet con intensidad general
+        return self._blend(block, dry, self.intensity / 100.0)
+    
+    def _apply_compressor_fast(self, audio):
+        """Compresor profesional con attack/release (detector vectorizado)"""
+        # Nivel por frame: pico de ambos canales (stereo enlazado)
         if audio.ndim > 1:
-            audio_flat = audio.flatten()
+            level = np.abs(audio).max(axis=1).astype(np.float64)
         else:
-            audio_flat = audio
+            level = np.abs(audio).astype(np.float64)
         
         # Parámetros del compresor
-        threshold = self.compressor_threshold  # 0.7
-        ratio = self.compressor_ratio  # 2.0
-        attack_time = self.compressor_attack / 1000.0  # ms a segundos
-        release_time = self.compressor_release / 1000.0  # ms a segundos
-        
-        # Convertir tiempos a muestras
-        attack_samples = int(attack_time * self.sample_rate)
-        release_samples = int(release_time * self.sample_rate)
-        
-        # Detección de nivel (RMS optimizada)
-        window_size = min(32, len(audio_flat))  # Ventana más pequeña para mejor rendimiento
-        envelope = np.abs(audio_flat)  # Usar valor absoluto simple para mejor rendimiento
-        
-        # Suavizar envolvente con filtro simple
-        if len(envelope) > 1:
-            alpha = 0.8  # Factor de suavizado
-            smoothed = np.zeros_like(envelope)
-            smoothed[0] = envelope[0]
-            for i in range(1, len(envelope)):
-                smoothed[i] = alpha * envelope[i] + (1 - alpha) * smoothed[i-1]
-            envelope = smoothed
-        
-        # Compresión más agresiva y audible
-        compressed_audio = audio_flat.copy()
-        
-        # Aplicar compresión simple pero efectiva
-        mask = envelope > threshold
-        if np.any(mask):
-            # Reducir picos agresivamente
-            over_threshold = envelope[mask] - threshold
-            reduction_factor = 1.0 - (over_threshold * (ratio - 1.0) / ratio)
-            reduction_factor = np.clip(reduction_factor, 0.2, 1.0)  # Limitar reducción
-            
-            compressed_audio[mask] = audio_flat[mask] * reduction_factor
+        threshold = self.compressor_threshold
+        ratio = self.compressor_ratio
+        
+        # Envolvente con attack/release reales (cada buffer es un golpe aislado;
+        # detector propio por golpe: process_sample corre en más de un thread)
+        follower = EnvelopeFollower(self.sample_rate, self.compressor_attack, self.compressor_release)
+        envelope = follower.process(level, level)
+        
+        # Reducir picos por encima del umbral
+        over_threshold = np.maximum(envelope - threshold, 0.0)
+        reduction_factor = 1.0 - (over_threshold * (ratio - 1.0) / ratio)
+        reduction_factor = np.clip(reduction_factor, 0.2, 1.0)  # Limitar reducción
+        if audio.ndim > 1:
+            reduction_factor = reduction_factor[:, None]
+        compressed_audio = audio * reduction_factor.astype(audio.dtype)
         
         # Mix con el original
         wet = self.compressor_mix / 100.0
-        processed_flat = audio_flat * (1.0 - wet) + compressed_audio * wet
-        
-        # Restaurar dimensiones originales
-        return processed_flat.reshape(original_shape)
+        return audio * (1.0 - wet) + compressed_audio * wet
     
     def _apply_eq_fast(self, audio):
-        """EQ extremadamente simple y audible"""
-        # Preservar dimensiones originales
-        original_shape = audio.shape
-        
-        # Trabajar con audio plano para procesamiento
-        if audio.ndim > 1:
-            audio_flat = audio.flatten()
-        else:
-            audio_flat = audio
+        """EQ paramétrico sobre un golpe aislado (sin estado previo)"""
+        processed = np.array(audio, dtype=np.float32, order='C')
+        if processed.ndim == 1:
+            processed = processed[:, None]
         
-        # EQ extremadamente simple: solo multiplicar por factor
-        eq_factor = 1.0 + (self.eq_mix / 100.0) * 0.5  # Factor de boost (0.5 a 1.5)
-        processed_audio = audio_flat * eq_factor
+        # Estado propio por golpe: process_sample corre en más de un thread
+        self.eq.process_isolated(processed)
         
         # Limitar para evitar clipping
-        processed_audio = np.clip(processed_audio, -1.0, 1.0)
-        
-        # Mix con el original (EQ siempre audible)
-        wet = self.eq_mix / 100.0
-        processed_flat = audio_flat * (1.0 - wet) + processed_audio * wet
-        
-        # Restaurar dimensiones originales
-        return processed_flat.reshape(original_shape)
+        np.clip(processed, -1.0, 1.0, out=processed)
+        return processed.reshape(audio.shape)
     
     def reset_all(self):
         """Resetear todos los efectos"""
         self.compressor_mix = 0.0
         self.eq_mix = 0.0
+        self.reverb_mix = 0.0
+        self.delay_mix = 0.0
         self.intensity = 0.0
-        self._invalidate_cache()
+        self.reverb.reset()
+        self.delay.reset()
+        self.set_eq_gains([0.0] * len(EQ_BANDS))
     
     def disable_processing(self):
         """Deshabilitar procesamiento de efectos temporalmente"""
@@ -226,4 +1291,51 @@ class EffectsManager:
     
     def enable_processing(self):
         """Habilitar procesamiento de efectos"""
-        self.processing_enabled = True
\ No newline at end of file
+        self.processing_enabled = True
+
+
+def benchmark_compressor(block_size=512, iterations=2000, sample_rate=44100):
+    """
+    Medir el costo del detector de envolvente y del compresor por bloque
+    
+    Args:
+        block_size: Frames por bloque
+        iterations: Bloques a procesar
+        sample_rate: Frecuencia de muestreo
+    
+    Returns:
+        Dict con ms por bloque (envolvente y compresor) y duración del bloque en ms
+    """
+    import time
+    
+    rng = np.random.default_rng(0)
+    block = (rng.standard_normal((block_size, 2)) * 0.3).astype(np.float32)
+    level = np.empty(block_size, dtype=np.float64)
+    follower = EnvelopeFollower(sample_rate)
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        np.abs(block[:, 0], out=level)
+        follower.process(level, level)
+    envelope_ms = (time.perf_counter() - start) * 1000.0 / iterations
+    
+    effects = EffectsManager(sample_rate)
+    effects.set_compressor_mix(100)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        effects._apply_compressor_fast(block)
+    compressor_ms = (time.perf_counter() - start) * 1000.0 / iterations
+    
+    return {
+        'envelope_ms': envelope_ms,
+        'compressor_ms': compressor_ms,
+        'block_ms': block_size * 1000.0 / sample_rate
+    }
+
+
+# Benchmark rápido
+if __name__ == "__main__":
+    results = benchmark_compressor()
+    print(f"Bloque de audio: {results['block_ms']:.2f} ms")
+    print(f"Envolvente:      {results['envelope_ms']:.4f} ms/bloque")
+    print(f"Compresor:       {results['compressor_ms']:.4f} ms/bloque")
@@ -0,0 +1,674 @@
+"""
+MIDI Clock - Clock de 24 PPQN sincronizado al secuenciador
+Salida: los ticks salen de la misma línea de tiempo que los pasos, desde un
+thread propio (un send_message lento nunca demora los disparos de audio).
+Entrada: modo esclavo que sigue el clock de un DAW con un PLL de tempo.
+"""
+
+import math
+import random
+import threading
+import time
+try:
+    import rtmidi
+    MIDI_AVAILABLE = True
+except ImportError:
+    MIDI_AVAILABLE = False
+
+
+class MIDIClockSender:
+    """
+    Emisor de MIDI clock enganchado a la grilla del secuenciador
+    
+    El tick k ocurre en la posición k / TICKS_PER_STEP de la grilla (sin
+    swing), así que el tick 0 coincide con el paso 0 y los cambios de BPM
+    se siguen sin saltos. Si el thread se atrasa más de un tick, los ticks
+    vencidos se saltean (y se cuentan) en lugar de mandarse en ráfaga.
+    """
+    
+    PPQN = 24
+    
+    def __init__(self, midi_handler, clock, steps_per_beat=4, offset_ms=0.0):
+        """
+        Inicializar emisor
+        
+        Args:
+            midi_handler: MIDIHandler (send_start/send_stop/send_clock)
+            clock: Reloj con grid_time_ns(posición) y position(now_ns) (StepClock)
+            steps_per_beat: Pasos del secuenciador por negra
+            offset_ms: Corrimiento de los ticks (compensar latencia de salida de audio)
+        """
+        self.midi = midi_handler
+        self.clock = clock
+        self.ticks_per_step = self.PPQN // steps_per_beat
+        self.offset_ns = int(offset_ms * 1e6)
+        
+        self.thread = None
+        self.stop_event = threading.Event()
+        self._rebase_requested = False
+        
+        # Estadísticas de jitter (desvío de cada tick respecto de su deadline)
+        self.ticks_sent = 0
+        self.ticks_skipped = 0
+        self._deviation_sum_ns = 0
+        self.max_deviation_ns = 0
+    
+    def start(self, step=0):
+        """
+        Enviar MIDI Start y empezar a emitir ticks desde un paso
+        
+        Args:
+            step: Paso absoluto de la grilla donde cae el primer tick
+        """
+        self.stop()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, args=(step,), daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Dejar de emitir ticks y enviar MIDI Stop"""
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout=1.0)
+        self.thread = None
+    
+    def rebase(self):
+        """La grilla se re-ancló (reset a paso 0): seguir desde la posición actual"""
+        self._rebase_requested = True
+    
+    def _next_tick(self, now_ns):
+        """Primer tick cuyo deadline no pasó todavía"""
+        return math.ceil(self.clock.position(now_ns - self.offset_ns) * self.ticks_per_step)
+    
+    def _run(self, step):
+        """Loop del thread emisor"""
+        self.midi.send_start()
+        tick = step * self.ticks_per_step
+        
+        while not self.stop_event.is_set():
+            if self._rebase_requested:
+                self._rebase_requested = False
+                tick = self._next_tick(time.monotonic_ns())
+            
+            deadline = self.clock.grid_time_ns(tick / self.ticks_per_step) + self.offset_ns
+            wait_ns = deadline - time.monotonic_ns()
+            if wait_ns > 0 and self.stop_event.wait(wait_ns / 1e9):
+                break
+            
+            # Atraso de más de un tick: saltear los vencidos
+            now_ns = time.monotonic_ns()
+            tick_ns = self.clock.timeline[2] / self.ticks_per_step
+            if now_ns - deadline > tick_ns:
+                next_tick = self._next_tick(now_ns)
+                self.ticks_skipped += next_tick - tick
+                tick = next_tick
+                continue
+            
+            self.midi.send_clock()
+            deviation = abs(now_ns - deadline)
+            self._deviation_sum_ns += deviation
+            self.max_deviation_ns = max(self.max_deviation_ns, deviation)
+            self.ticks_sent += 1
+            tick += 1
+        
+        self.midi.send_stop()
+    
+    def get_jitter_report(self):
+        """
+        Reporte de jitter de los ticks enviados
+        
+        Returns:
+            dict con ticks enviados/salteados y desvío medio y máximo en ms
+        """
+        sent = self.ticks_sent
+        return {
+            'ticks_sent': sent,
+            'ticks_skipped': self.ticks_skipped,
+            'mean_deviation_ms': self._deviation_sum_ns / sent / 1e6 if sent else 0.0,
+            'max_deviation_ms': self.max_deviation_ns / 1e6,
+        }
+
+
+def measure_port_jitter(port_times_ns, expected_times_ns):
+    """
+    Jitter de los ticks tal como los recibió un puerto (ej: FakeMIDIPort)
+    
+    Args:
+        port_times_ns: Instantes de llegada de cada tick
+        expected_times_ns: Instantes ideales de cada tick en la grilla
+    
+    Returns:
+        dict con ticks, desvío medio y máximo en ms
+    """
+    deviations = [abs(t - expected) for t, expected in zip(port_times_ns, expected_times_ns)]
+    if not deviations:
+        return {'ticks': 0, 'mean_deviation_ms': 0.0, 'max_deviation_ms': 0.0}
+    return {
+        'ticks': len(deviations),
+        'mean_deviation_ms': sum(deviations) / len(deviations) / 1e6,
+        'max_deviation_ms': max(deviations) / 1e6,
+    }
+
+
+class ClockPLL:
+    """
+    Estimador de tempo para MIDI clock entrante (DLL de segundo orden)
+    
+    Igual que AudioClock pero con los ticks del clock externo: cada tick
+    corrige la fase predicha y la duración del tick, así el jitter de USB-MIDI
+    queda filtrado. Arranca con ancho de banda amplio (enganche rápido) y lo
+    angosta al quedar enganchado. El estado es la tupla (t_ns, tick, ns_por_tick).
+    """
+    
+    def __init__(self, ppqn=24, acquire_bandwidth_hz=4.0, track_bandwidth_hz=0.5,
+                 lock_threshold=0.1, lock_ticks=24, resync_threshold=0.5):
+        """
+        Inicializar estimador
+        
+        Args:
+            ppqn: Ticks por negra
+            acquire_bandwidth_hz: Ancho de banda mientras busca enganche
+            track_bandwidth_hz: Ancho de banda enganchado (más filtrado)
+            lock_threshold: Error de fase medio (fracción de tick) para considerar enganche
+            lock_ticks: Ticks seguidos bajo el umbral para declarar enganche
+            resync_threshold: Error (fracción de tick) que fuerza re-estimar desde cero
+        """
+        self.ppqn = ppqn
+        self.acquire_bandwidth_hz = acquire_bandwidth_hz
+        self.track_bandwidth_hz = track_bandwidth_hz
+        self.lock_threshold = lock_threshold
+        self.lock_ticks = lock_ticks
+        self.resync_threshold = resync_threshold
+        self.resyncs = 0
+        self.reset()
+    
+    def reset(self):
+        """Olvidar el tempo estimado"""
+        self.state = None
+        self._first = None  # (tick, t_ns) del primer tick antes de tener período
+        self.error_avg = 0.0
+        self.locked = False
+        self._good_ticks = 0
+    
+    def update(self, tick, t_ns):
+        """
+        Registrar la llegada de un tick
+        
+        Args:
+            tick: Índice del tick (contador creciente)
+            t_ns: Instante de llegada (monotonic_ns)
+        """
+        state = self.state
+        if state is None:
+            # Dos ticks dan el primer período estimado
+            if self._first is None or tick <= self._first[0]:
+                self._first = (tick, t_ns)
+                return
+            first_tick, first_ns = self._first
+            self.state = (t_ns, tick, (t_ns - first_ns) / (tick - first_tick))
+            self.error_avg = self.lock_threshold * 2
+            return
+        
+        t_anchor, anchor_tick, ns_per_tick = state
+        ticks = tick - anchor_tick
+        if ticks <= 0:
+            return
+        predicted = t_anchor + ticks * ns_per_tick
+        error = t_ns - predicted
+        
+        # Salto de tempo o ticks perdidos: volver a estimar desde este tick
+        if abs(error) > self.resync_threshold * ns_per_tick:
+            self.resyncs += 1
+            self.reset()
+            self._first = (tick, t_ns)
+            return
+        
+        bandwidth = self.track_bandwidth_hz if self.locked else self.acquire_bandwidth_hz
+        omega = min(0.5, 2.0 * math.pi * bandwidth * ns_per_tick * ticks / 1e9)
+        ns_per_tick += omega * omega * error / ticks
+        self.state = (predicted + math.sqrt(2.0) * omega * error, tick, ns_per_tick)
+        
+        # Enganche con histéresis sobre el error de fase medio
+        self.error_avg += 0.1 * (abs(error) / ns_per_tick - self.error_avg)
+        if self.error_avg < self.lock_threshold:
+            self._good_ticks += 1
+            if self._good_ticks >= self.lock_ticks:
+                self.locked = True
+        elif self.error_avg > 2 * self.lock_threshold:
+            self._good_ticks = 0
+            self.locked = False
+    
+    @property
+    def bpm(self):
+        """Tempo estimado (None sin datos)"""
+        if self.state is None:
+            return None
+        return 60e9 / (self.state[2] * self.ppqn)
+    
+    def tick_time_ns(self, tick):
+        """Instante filtrado de un tick (None sin datos)"""
+        if self.state is None:
+            return None
+        t_anchor, anchor_tick, ns_per_tick = self.state
+        return t_anchor + int(round((tick - anchor_tick) * ns_per_tick))
+
+
+class MIDIClockFollower:
+    """
+    Modo esclavo: el secuenciador sigue el MIDI clock/Start/Stop/Continue de un DAW
+    
+    Cada tick entrante pasa por el ClockPLL y la línea de tiempo filtrada se
+    publica en el StepClock del secuenciador, así el loop de reproducción
+    (y el agendado con lookahead) siguen funcionando igual que con el reloj
+    interno. Song Position Pointer ubica el Continue (1 posición = 1 paso).
+    
+    Start/Stop/Continue no tocan el secuenciador desde el callback de MIDI:
+    quedan como un pedido (tupla inmutable publicada con una asignación) que
+    el loop principal aplica con poll_transport, en el mismo thread que el
+    PLAY/STOP de los botones.
+    """
+    
+    MIDI_CLOCK = 0xF8
+    MIDI_START = 0xFA
+    MIDI_CONTINUE = 0xFB
+    MIDI_STOP = 0xFC
+    MIDI_SONG_POSITION = 0xF2
+    
+    def __init__(self, sequencer, midi_in=None, port_name=None, steps_per_beat=4, timeout=0.5):
+        """
+        Inicializar seguidor
+        
+        Args:
+            sequencer: Sequencer a controlar
+            midi_in: Puerto de entrada ya abierto (None = abrir con rtmidi; False = sin puerto,
+                     los mensajes se inyectan con handle_message)
+            port_name: Nombre del puerto de entrada (None = primero disponible)
+            steps_per_beat: Pasos del secuenciador por negra
+            timeout: Segundos sin ticks para considerar el clock externo ausente
+        """
+        self.sequencer = sequencer
+        self.pll = ClockPLL()
+        self.ticks_per_step = self.pll.ppqn // steps_per_beat
+        self.timeout_ns = int(timeout * 1e9)
+        
+        self.next_tick = 0        # Índice del próximo tick para el PLL (no se reinicia)
+        self.song_tick = 0        # Posición de canción del próximo tick (Start la pone en 0)
+        self.last_tick_ns = None
+        self._last_locked = False
+        
+        # Transporte del DAW (lado MIDI) y pedido pendiente para el loop principal:
+        # (número, mensaje, t_ns); _applied_transport es el último número aplicado
+        self.running = False
+        self._transport = None
+        self._applied_transport = 0
+        
+        self.midi_in = None
+        self.enabled = False
+        if midi_in is False:
+            self.enabled = True
+            return
+        if midi_in is not None:
+            self.midi_in = midi_in
+        elif not MIDI_AVAILABLE:
+            print("⚠️ MIDI In deshabilitado: python-rtmidi no instalado")
+            return
+        else:
+            try:
+                self.midi_in = rtmidi.MidiIn()
+                ports = self.midi_in.get_ports()
+                index = next((i for i, name in enumerate(ports)
+                              if port_name is None or port_name.lower() in name.lower()), None)
+                if index is None:
+                    print(f"⚠️ Puerto MIDI In no encontrado (disponibles: {ports})")
+                    return
+                self.midi_in.open_port(index)
+                print(f"✓ MIDI In (clock externo) conectado a: {ports[index]}")
+            except Exception as e:
+                print(f"⚠️ Error inicializando MIDI In: {e}")
+                return
+        
+        # Recibir timing (rtmidi ignora clock por defecto)
+        self.midi_in.ignore_types(sysex=True, timing=False, active_sense=True)
+        self.midi_in.set_callback(self._on_midi)
+        self.enabled = True
+    
+    def _on_midi(self, event, data=None):
+        """Callback de rtmidi ((mensaje, delta), data)"""
+        self.handle_message(event[0])
+    
+    @property
+    def active(self):
+        """True si llegaron ticks hace menos de `timeout`"""
+        return (self.last_tick_ns is not None
+                and time.monotonic_ns() - self.last_tick_ns < self.timeout_ns)
+    
+    @property
+    def locked(self):
+        """True si el PLL está enganchado al clock externo"""
+        return self.pll.locked
+    
+    @property
+    def bpm(self):
+        """Tempo estimado del clock externo (None sin datos)"""
+        return self.pll.bpm
+    
+    def handle_message(self, message, t_ns=None):
+        """
+        Procesar un mensaje MIDI entrante
+        
+        Args:
+            message: Bytes del mensaje (lista de ints)
+            t_ns: Instante de llegada (None = ahora)
+        """
+        if not message:
+            return
+        if t_ns is None:
+            t_ns = time.monotonic_ns()
+        status = message[0]
+        
+        if status == self.MIDI_CLOCK:
+            self._on_tick(t_ns)
+        elif status == self.MIDI_START:
+            # El próximo tick es el primero de la canción
+            self.song_tick = 0
+            self.running = True
+            self._post_transport(status, t_ns)
+        elif status == self.MIDI_CONTINUE:
+            self.running = True
+            self._post_transport(status, t_ns)
+        elif status == self.MIDI_STOP:
+            self.running = False
+            self._post_transport(status, t_ns)
+        elif status == self.MIDI_SONG_POSITION and len(message) >= 3:
+            self.song_tick = (message[1] | (message[2] << 7)) * self.ticks_per_step
+    
+    def _on_tick(self, t_ns):
+        """Tick de clock: actualizar el PLL y la línea de tiempo del secuenciador"""
+        if self.last_tick_ns is not None and t_ns - self.last_tick_ns > self.timeout_ns:
+            # El clock se había cortado: el tempo anterior ya no vale
+            self.pll.reset()
+        self.last_tick_ns = t_ns
+        self.pll.update(self.next_tick, t_ns)
+        self.next_tick += 1
+        if self.running:
+            self.song_tick += 1
+        self._publish()
+        
+        # Tempo para los efectos sincronizados y la vista BPM
+        bpm = self.pll.bpm
+        if self.pll.locked and bpm is not None and abs(bpm - self.sequencer.bpm) >= 1.0:
+            self.sequencer.follow_tempo(bpm)
+    
+    def _publish(self):
+        """Publicar la línea de tiempo filtrada en el StepClock del secuenciador"""
+        state = self.pll.state
+        if state is None:
+            return
+        t_anchor, anchor_tick, ns_per_tick = state
+        # Posición de canción del tick ancla (el próximo tick es song_tick)
+        song_anchor = self.song_tick - (self.next_tick - anchor_tick)
+        self.sequencer.clock.set_timeline(t_anchor, song_anchor / self.ticks_per_step,
+                                          ns_per_tick * self.ticks_per_step)
+    
+    def _post_transport(self, status, t_ns):
+        """Dejar Start/Stop/Continue para el loop principal (reemplaza al pendiente)"""
+        last = self._transport[0] if self._transport else self._applied_transport
+        self._transport = (last + 1, status, t_ns)
+    
+    def poll_transport(self):
+        """
+        Aplicar el último Start/Stop/Continue recibido (loop principal)
+        
+        Returns:
+            True si se aplicó un pedido
+        """
+        request = self._transport
+        if request is None or request[0] == self._applied_transport:
+            return False
+        self._applied_transport = request[0]
+        _, status, t_ns = request
+        if status == self.MIDI_STOP:
+            self.sequencer.stop()
+        else:
+            self._start(t_ns)
+        return True
+    
+    def _start(self, t_ns):
+        """Start/Continue: anclar la posición de canción en el próximo tick y arrancar"""
+        if self.sequencer.is_playing:
+            self.sequencer.stop()
+        next_ns = self.pll.tick_time_ns(self.next_tick)
+        if next_ns is None or next_ns < t_ns:
+            # Sin tempo todavía: el primer tick llega enseguida del Start
+            self.sequencer.clock.start(t_ns, step=self.song_tick / self.ticks_per_step)
+        else:
+            self.sequencer.clock.set_timeline(next_ns, self.song_tick / self.ticks_per_step,
+                                              self.pll.state[2] * self.ticks_per_step)
+        self.sequencer.play(anchored=True)
+    
+    def poll_lock_change(self):
+        """
+        Consultar si cambió el estado de enganche (para mostrar la vista BPM)
+        
+        Returns:
+            True si el enganche cambió desde la última consulta
+        """
+        locked = self.pll.locked and self.active
+        changed = locked != self._last_locked
+        self._last_locked = locked
+        return changed
+    
+    def close(self):
+        """Cerrar el puerto de entrada"""
+        if self.midi_in:
+            try:
+                self.midi_in.cancel_callback()
+                self.midi_in.close_port()
+            except Exception:
+                pass
+
+
+class ScriptedClockSource:
+    """
+    Fuente de MIDI clock en proceso para probar el modo esclavo sin hardware
+    
+    Genera Start, ticks con jitter uniforme (±jitter_ms, como USB-MIDI) y
+    cambios de tempo programados, y guarda el instante ideal de cada tick.
+    """
+    
+    def __init__(self, bpm=120.0, jitter_ms=1.0, seed=1, ppqn=24):
+        """
+        Inicializar fuente
+        
+        Args:
+            bpm: Tempo inicial
+            jitter_ms: Jitter máximo de cada tick (uniforme, ±)
+            seed: Semilla del jitter (reproducible)
+            ppqn: Ticks por negra
+        """
+        self.bpm = bpm
+        self.jitter_ns = jitter_ms * 1e6
+        self.ppqn = ppqn
+        self.random = random.Random(seed)
+        self.ideal_ns = []  # Instante ideal de cada tick emitido
+    
+    def events(self, seconds, t0_ns=0, tempo_changes=()):
+        """
+        Guion de mensajes
+        
+        Args:
+            seconds: Duración del clock
+            t0_ns: Instante del primer tick (el Start va medio tick antes)
+            tempo_changes: Lista de (segundo, bpm)
+        
+        Returns:
+            Lista de (t_ns, mensaje) ordenada
+        """
+        changes = sorted(tempo_changes)
+        bpm = self.bpm
+        tick_ns = 60e9 / (bpm * self.ppqn)
+        events = [(int(t0_ns - tick_ns / 2), [MIDIClockFollower.MIDI_START])]
+        self.ideal_ns = []
+        t = float(t0_ns)
+        while t < t0_ns + seconds * 1e9:
+            while changes and t >= t0_ns + changes[0][0] * 1e9:
+                bpm = changes.pop(0)[1]
+                tick_ns = 60e9 / (bpm * self.ppqn)
+            self.ideal_ns.append(int(t))
+            jitter = self.random.uniform(-self.jitter_ns, self.jitter_ns)
+            events.append((int(t + jitter), [MIDIClockFollower.MIDI_CLOCK]))
+            t += tick_ns
+        events.append((int(t), [MIDIClockFollower.MIDI_STOP]))
+        events.sort(key=lambda event: event[0])
+        return events
+    
+    def play(self, follower, seconds, tempo_changes=(), lead_in=0.05):
+        """
+        Emitir el guion en tiempo real (bloquea): el follower recibe los mensajes
+        con la hora real de llegada, como desde el callback de rtmidi
+        
+        Returns:
+            Lista de instantes ideales de los ticks (monotonic_ns)
+        """
+        t0_ns = time.monotonic_ns() + int(lead_in * 1e9)
+        for t_ns, message in self.events(seconds, t0_ns, tempo_changes):
+            wait_ns = t_ns - time.monotonic_ns()
+            if wait_ns > 0:
+                time.sleep(wait_ns / 1e9)
+            follower.handle_message(message)
+            # En la app el loop principal aplica Start/Stop
+            follower.poll_transport()
+        return self.ideal_ns
+
+
+def measure_lock(pll, events, ideal_ns):
+    """
+    Alimentar un ClockPLL con un guion (tiempo simulado) y medir enganche
+    
+    Args:
+        pll: ClockPLL nuevo
+        events: Guion de ScriptedClockSource.events
+        ideal_ns: Instantes ideales de los ticks
+    
+    Returns:
+        dict con ticks y ms hasta enganchar y error de fase medio/máximo
+        (ms, respecto de los ticks ideales) y error de BPM después de enganchar
+    """
+    tick = 0
+    lock_tick = None
+    errors = []
+    bpm_errors = []
+    for t_ns, message in events:
+        if message[0] != MIDIClockFollower.MIDI_CLOCK:
+            continue
+        pll.update(tick, t_ns)
+        if pll.locked and lock_tick is None:
+            lock_tick = tick
+        if lock_tick is not None and pll.state is not None and tick + 1 < len(ideal_ns):
+            errors.append(abs(pll.tick_time_ns(tick) - ideal_ns[tick]))
+            ideal_bpm = 60e9 / ((ideal_ns[tick + 1] - ideal_ns[tick]) * pll.ppqn)
+            bpm_errors.append(abs(pll.bpm - ideal_bpm))
+        tick += 1
+    
+    if lock_tick is None:
+        return {'locked': False, 'resyncs': pll.resyncs}
+    return {
+        'locked': True,
+        'lock_ticks': lock_tick,
+        'lock_ms': (ideal_ns[lock_tick] - ideal_ns[0]) / 1e6,
+        'mean_error_ms': sum(errors) / len(errors) / 1e6,
+        'max_error_ms': max(errors) / 1e6,
+        'max_bpm_error': max(bpm_errors),
+        'resyncs': pll.resyncs,
+    }
+
+
+def benchmark_slave(bpm=120.0, jitter_ms=1.0, seconds=8.0):
+    """
+    Modo esclavo en tiempo real: fuente con jitter -> MIDIClockFollower -> Sequencer
+    
+    Mide cuándo se disparan los pasos respecto de los ticks ideales (sin jitter)
+    una vez enganchado el PLL.
+    """
+    import os
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.config import NUM_INSTRUMENTS, NUM_STEPS
+    from core.sequencer import Sequencer
+    
+    class RecordingEngine:
+        """Motor de audio que solo anota el instante de cada disparo"""
+        def __init__(self):
+            self.hits = []
+        
+        def play_sample(self, instrument_id, volume=None, at_ns=None):
+            self.hits.append(at_ns or time.monotonic_ns())
+    
+    engine = RecordingEngine()
+    sequencer = Sequencer(engine)
+    sequencer.pattern = [[i == 0 for i in range(NUM_INSTRUMENTS)] for _ in range(NUM_STEPS)]
+    follower = MIDIClockFollower(sequencer, midi_in=False)
+    sequencer.set_external_clock(follower)
+    
+    source = ScriptedClockSource(bpm, jitter_ms, seed=7)
+    ideal = source.play(follower, seconds)
+    time.sleep(0.05)
+    
+    # Paso n = tick 6n; se evalúa desde el primer paso posterior al enganche
+    ticks_per_step = follower.ticks_per_step
+    settle = 2 * ticks_per_step * 4  # dos negras
+    errors = [abs(hit - ideal[n * ticks_per_step]) for n, hit in enumerate(engine.hits)
+              if settle <= n * ticks_per_step < len(ideal)]
+    print(f"\n🎹 Esclavo en tiempo real: {bpm:.0f} BPM, jitter ±{jitter_ms:.1f} ms")
+    print(f"   BPM estimado: {follower.bpm:.2f}, enganchado: {follower.locked}, "
+          f"pasos: {len(engine.hits)}")
+    if errors:
+        print(f"   Error de paso vs tick ideal: medio {sum(errors) / len(errors) / 1e6:.3f} ms, "
+              f"máx {max(errors) / 1e6:.3f} ms")
+
+
+# Test del módulo
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.step_clock import StepClock
+    from features.midi_handler import MIDIHandler, FakeMIDIPort
+    
+    bpm = 120
+    for latency in (0.0, 0.004):
+        port = FakeMIDIPort(send_latency=latency)
+        midi = MIDIHandler(midi_out=port)
+        clock = StepClock(bpm)
+        clock.start(time.monotonic_ns() + 10_000_000)
+        sender = MIDIClockSender(midi, clock)
+        sender.start()
+        time.sleep(3.0)
+        sender.stop()
+        
+        report = sender.get_jitter_report()
+        times = port.times_of(MIDIHandler.MIDI_CLOCK)
+        expected = [clock.grid_time_ns(k / sender.ticks_per_step) for k in range(len(times))]
+        port_report = measure_port_jitter(times, expected)
+        print(f"\n🎹 MIDI clock {bpm} BPM, send_message {latency * 1000:.0f} ms:")
+        print(f"   Ticks: {report['ticks_sent']} enviados, {report['ticks_skipped']} salteados")
+        print(f"   Deadline: medio {report['mean_deviation_ms']:.3f} ms, máx {report['max_deviation_ms']:.3f} ms")
+        print(f"   Puerto:   medio {port_report['mean_deviation_ms']:.3f} ms, máx {port_report['max_deviation_ms']:.3f} ms")
+    
+    # Modo esclavo: enganche y error en régimen (tiempo simulado, reproducible)
+    print("\n🎹 PLL de clock externo (tiempo simulado, 20 s):")
+    scenarios = [
+        (120, 1.0, ()), (200, 1.0, ()), (60, 2.0, ()),
+        (128, 1.0, ((10, 129),)), (90, 1.0, ((10, 180),)),
+    ]
+    for bpm, jitter, changes in scenarios:
+        source = ScriptedClockSource(bpm, jitter, seed=3)
+        events = source.events(20, 10**9, changes)
+        result = measure_lock(ClockPLL(), events, source.ideal_ns)
+        change = f" -> {changes[0][1]}" if changes else ""
+        print(f"   {bpm:>3}{change:<7} BPM ±{jitter:.1f} ms: enganche {result['lock_ms']:7.1f} ms "
+              f"({result['lock_ticks']} ticks), error medio {result['mean_error_ms']:.3f} ms, "
+              f"máx {result['max_error_ms']:.3f} ms, re-anclajes {result['resyncs']}")
+    
+    benchmark_slave()
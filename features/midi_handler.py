@@ -12,6 +12,48 @@ except ImportError:
     print("⚠️ python-rtmidi no disponible. Instalar con: pip3 install python-rtmidi")
 
 
+class FakeMIDIPort:
+    """
+    Puerto MIDI en memoria con la interfaz de rtmidi.MidiOut
+    Registra cada mensaje con su instante (monotonic_ns) para tests y benchmarks
+    """
+    
+    def __init__(self, name="Fake MIDI", send_latency=0.0):
+        """
+        Inicializar puerto falso
+        
+        Args:
+            name: Nombre del puerto
+            send_latency: Segundos que tarda cada send_message (simula un puerto lento)
+        """
+        self.name = name
+        self.send_latency = send_latency
+        self.messages = []  # Lista de (t_ns, mensaje)
+        self.is_open = False
+    
+    def get_ports(self):
+        """Listar puertos (solo el falso)"""
+        return [self.name]
+    
+    def open_port(self, index=0):
+        """Abrir puerto"""
+        self.is_open = True
+    
+    def close_port(self):
+        """Cerrar puerto"""
+        self.is_open = False
+    
+    def send_message(self, message):
+        """Registrar un mensaje (y demorar si simula un puerto lento)"""
+        self.messages.append((time.monotonic_ns(), list(message)))
+        if self.send_latency:
+            time.sleep(self.send_latency)
+    
+    def times_of(self, status):
+        """Instantes (ns) de los mensajes con un status dado"""
+        return [t for t, message in self.messages if message[0] == status]
+
+
 class MIDIHandler:
     """Manejador de salida MIDI para sincronización y control"""
     
@@ -33,7 +75,8 @@ class MIDIHandler:
         'ride': 51       # D#2 - Ride
     }
     
-    def __init__(self, port_name=None, enable_clock=True, enable_notes=True, enable_cc=False):
+    def __init__(self, port_name=None, enable_clock=True, enable_notes=True, enable_cc=False,
+                 midi_out=None):
         """
         Inicializar MIDI handler
         
@@ -42,6 +85,7 @@ class MIDIHandler:
             enable_clock: Enviar MIDI clock
             enable_notes: Enviar MIDI notes
             enable_cc: Enviar MIDI CC
+            midi_out: Puerto ya abierto con interfaz rtmidi.MidiOut (ej: FakeMIDIPort)
         """
         self.midi_out = None
         self.enabled = False
@@ -52,6 +96,11 @@ class MIDIHandler:
         self.clock_counter = 0
         self.is_playing = False
         
+        if midi_out is not None:
+            self.midi_out = midi_out
+            self.enabled = True
+            return
+        
         if not MIDI_AVAILABLE:
             print("⚠️ MIDI deshabilitado: python-rtmidi no instalado")
             return
@@ -0,0 +1,333 @@
+"""
+MIDI Note Sender - Notas del secuenciador con note-off agendado
+El secuenciador solo encola (nunca toca el puerto MIDI); un thread propio
+envía los note-on en su deadline y los note-off con una rueda de timers
+"""
+
+import queue
+import threading
+import time
+
+
+class TimerWheel:
+    """
+    Rueda de timers de un nivel (hashed timing wheel)
+    
+    Agendar y vencer un evento es O(1): cada evento cae en la ranura de su
+    tick (deadline // resolución) módulo la cantidad de ranuras. Los eventos
+    más lejanos que una vuelta quedan en su ranura hasta que les toque.
+    """
+    
+    def __init__(self, resolution_ms=1.0, slots=512):
+        """
+        Inicializar rueda
+        
+        Args:
+            resolution_ms: Duración de cada ranura en ms
+            slots: Cantidad de ranuras (una vuelta = resolution_ms * slots)
+        """
+        self.resolution_ns = int(resolution_ms * 1e6)
+        self.slots = [[] for _ in range(slots)]
+        self.cursor = None  # Próximo tick a procesar
+        self.pending = 0
+    
+    def schedule(self, deadline_ns, event):
+        """
+        Agendar un evento
+        
+        Args:
+            deadline_ns: Instante de vencimiento (monotonic_ns)
+            event: Objeto cualquiera (se devuelve tal cual en advance)
+        """
+        tick = deadline_ns // self.resolution_ns
+        if self.cursor is None:
+            self.cursor = tick
+        # Un deadline ya vencido cae en la ranura actual
+        tick = max(tick, self.cursor)
+        self.slots[tick % len(self.slots)].append((deadline_ns, tick, event))
+        self.pending += 1
+    
+    def advance(self, now_ns):
+        """
+        Avanzar hasta now_ns y devolver los eventos vencidos
+        
+        Returns:
+            Lista de (deadline_ns, event) ordenada por deadline
+        """
+        now_tick = now_ns // self.resolution_ns
+        if self.cursor is None or self.pending == 0:
+            self.cursor = now_tick
+            return []
+        
+        # Más de una vuelta de atraso: basta recorrer cada ranura una vez
+        last = min(now_tick, self.cursor + len(self.slots) - 1)
+        expired = []
+        for tick in range(self.cursor, last + 1):
+            index = tick % len(self.slots)
+            slot = self.slots[index]
+            if not slot:
+                continue
+            keep = [entry for entry in slot if entry[0] > now_ns]
+            if len(keep) != len(slot):
+                expired.extend((entry[0], entry[2]) for entry in slot if entry[0] <= now_ns)
+                self.slots[index] = keep
+        # La ranura actual puede tener eventos de este mismo tick todavía no vencidos
+        self.cursor = now_tick
+        self.pending -= len(expired)
+        expired.sort(key=lambda entry: entry[0])
+        return expired
+    
+    def next_deadline_ns(self):
+        """
+        Deadline exacto del próximo evento de esta vuelta
+        
+        Returns:
+            Instante en ns (None si la rueda está vacía); si todo está a más de
+            una vuelta, el final de la vuelta actual
+        """
+        if not self.pending:
+            return None
+        for tick in range(self.cursor, self.cursor + len(self.slots)):
+            deadlines = [entry[0] for entry in self.slots[tick % len(self.slots)] if entry[1] == tick]
+            if deadlines:
+                return min(deadlines)
+        return (self.cursor + len(self.slots)) * self.resolution_ns
+    
+    def clear(self):
+        """Descartar todos los eventos"""
+        self.slots = [[] for _ in range(len(self.slots))]
+        self.pending = 0
+
+
+class MIDINoteSender:
+    """
+    Salida de notas MIDI no bloqueante
+    
+    note_on() solo hace un put en una cola. El thread emisor pasa cada nota a
+    la rueda de timers con su deadline; al vencer envía el note-on y agenda
+    el note-off a gate_ms. Si una nota se repite antes de cerrar su gate, se
+    envía el note-off primero y el note-off viejo se descarta (no corta la nota
+    nueva).
+    """
+    
+    NOTE_ON = 0
+    NOTE_OFF = 1
+    
+    def __init__(self, midi_handler, instruments, gate_ms=50.0, offset_ms=0.0, velocity=127):
+        """
+        Inicializar emisor
+        
+        Args:
+            midi_handler: MIDIHandler (send_note_on/send_note_off por nombre)
+            instruments: Lista de nombres de instrumento (índice = ID)
+            gate_ms: Duración de cada nota en ms
+            offset_ms: Corrimiento de los note-on respecto del deadline del paso
+            velocity: Velocidad por defecto (0-127)
+        """
+        self.midi = midi_handler
+        self.instruments = list(instruments)
+        self.gate_ns = int(gate_ms * 1e6)
+        self.offset_ns = int(offset_ms * 1e6)
+        self.velocity = velocity
+        
+        self.queue = queue.SimpleQueue()
+        self.wheel = TimerWheel()
+        # Generación por instrumento: un note-off solo vale para su note-on
+        self._generation = [0] * len(self.instruments)
+        self._held = [False] * len(self.instruments)
+        
+        self.thread = None
+        self.running = False
+        
+        # Estadísticas
+        self.notes_on = 0
+        self.notes_off = 0
+        self.retriggers = 0
+        self.max_backlog = 0
+        self._deviation_sum_ns = 0
+        self.max_deviation_ns = 0
+    
+    def set_gate(self, gate_ms):
+        """Cambiar la duración de las notas (aplica a las próximas)"""
+        self.gate_ns = int(max(1.0, gate_ms) * 1e6)
+    
+    def start(self):
+        """Iniciar el thread emisor"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def close(self):
+        """Cerrar todas las notas y detener el thread"""
+        if not self.running:
+            return
+        self.queue.put(('close',))
+        self.thread.join(timeout=1.0)
+        self.thread = None
+        self.running = False
+    
+    def note_on(self, instrument_id, at_ns=None, velocity=None):
+        """
+        Encolar una nota (no bloquea: llamable desde el loop del secuenciador)
+        
+        Args:
+            instrument_id: ID del instrumento (0-7)
+            at_ns: Instante del golpe en monotonic_ns (None = ahora)
+            velocity: Velocidad (None = la por defecto)
+        """
+        if at_ns is None:
+            at_ns = time.monotonic_ns()
+        self.queue.put(('note', instrument_id, at_ns + self.offset_ns,
+                        self.velocity if velocity is None else velocity))
+    
+    def all_notes_off(self):
+        """Cerrar las notas sonando y descartar las agendadas (ej: al parar)"""
+        self.queue.put(('flush',))
+    
+    def _run(self):
+        """Loop del thread emisor"""
+        while True:
+            next_ns = self.wheel.next_deadline_ns()
+            try:
+                if next_ns is None:
+                    message = self.queue.get()
+                else:
+                    message = self.queue.get(timeout=max(0, next_ns - time.monotonic_ns()) / 1e9)
+            except queue.Empty:
+                message = None
+            
+            # Vaciar la cola hacia la rueda (las notas siempre pasan por la rueda)
+            while message is not None:
+                kind = message[0]
+                if kind == 'note':
+                    _, instrument_id, at_ns, velocity = message
+                    self.wheel.schedule(at_ns, (self.NOTE_ON, instrument_id, velocity))
+                elif kind == 'flush':
+                    self._flush()
+                elif kind == 'close':
+                    self._flush()
+                    return
+                try:
+                    message = self.queue.get_nowait()
+                except queue.Empty:
+                    message = None
+            self.max_backlog = max(self.max_backlog, self.wheel.pending)
+            
+            now_ns = time.monotonic_ns()
+            for deadline_ns, event in self.wheel.advance(now_ns):
+                self._fire(deadline_ns, event)
+    
+    def _fire(self, deadline_ns, event):
+        """Enviar un evento vencido de la rueda"""
+        kind, instrument_id, value = event
+        name = self.instruments[instrument_id]
+        
+        if kind == self.NOTE_OFF:
+            # Note-off de una nota ya re-disparada: lo descarta
+            if value != self._generation[instrument_id] or not self._held[instrument_id]:
+                return
+            self.midi.send_note_off(name)
+            self._held[instrument_id] = False
+            self.notes_off += 1
+            return
+        
+        if self._held[instrument_id]:
+            self.midi.send_note_off(name)
+            self.notes_off += 1
+            self.retriggers += 1
+        sent_ns = time.monotonic_ns()
+        self.midi.send_note_on(name, velocity=value)
+        self._held[instrument_id] = True
+        self._generation[instrument_id] += 1
+        self.notes_on += 1
+        self.wheel.schedule(deadline_ns + self.gate_ns,
+                            (self.NOTE_OFF, instrument_id, self._generation[instrument_id]))
+        
+        deviation = abs(sent_ns - deadline_ns)
+        self._deviation_sum_ns += deviation
+        self.max_deviation_ns = max(self.max_deviation_ns, deviation)
+    
+    def _flush(self):
+        """Note-off inmediato de lo que suena y rueda vacía"""
+        self.wheel.clear()
+        for instrument_id, held in enumerate(self._held):
+            if held:
+                self.midi.send_note_off(self.instruments[instrument_id])
+                self._held[instrument_id] = False
+                self.notes_off += 1
+    
+    def get_stats(self):
+        """
+        Estadísticas del emisor
+        
+        Returns:
+            dict con notas enviadas, re-disparos, backlog máximo de la rueda
+            y desvío medio/máximo de los note-on respecto de su deadline
+        """
+        sent = self.notes_on
+        return {
+            'notes_on': sent,
+            'notes_off': self.notes_off,
+            'retriggers': self.retriggers,
+            'held': sum(self._held),
+            'max_backlog': self.max_backlog,
+            'mean_deviation_ms': self._deviation_sum_ns / sent / 1e6 if sent else 0.0,
+            'max_deviation_ms': self.max_deviation_ns / 1e6,
+        }
+
+
+def benchmark_throughput(bpm=200, seconds=5.0, gate_ms=50.0, send_latency=0.0002):
+    """
+    Throughput sostenido: secuenciador a `bpm` con los 8 instrumentos en todos los pasos
+    
+    Verifica que cada note-on tenga su note-off, que no queden notas colgadas
+    y que el loop del secuenciador no se atrase por la salida MIDI.
+    """
+    import os
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.config import NUM_INSTRUMENTS, NUM_STEPS
+    from core.sequencer import Sequencer
+    from features.midi_handler import MIDIHandler, FakeMIDIPort
+    
+    class SilentEngine:
+        """Motor de audio mudo (solo interesa el MIDI)"""
+        def play_sample(self, instrument_id, volume=None, at_ns=None):
+            pass
+    
+    port = FakeMIDIPort(send_latency=send_latency)
+    midi = MIDIHandler(midi_out=port, enable_clock=False)
+    sequencer = Sequencer(SilentEngine())
+    sequencer.attach_midi(midi, gate_ms=gate_ms)
+    sequencer.pattern = [[True] * NUM_INSTRUMENTS for _ in range(NUM_STEPS)]
+    sequencer.set_bpm(bpm)
+    
+    sequencer.play()
+    time.sleep(seconds)
+    sequencer.stop()
+    time.sleep(0.1)
+    
+    stats = sequencer.midi_notes.get_stats()
+    timing = sequencer.get_timing_stats()
+    note_ons = sum(1 for _, m in port.messages if m[0] & 0xF0 == 0x90)
+    note_offs = sum(1 for _, m in port.messages if m[0] & 0xF0 == 0x80)
+    expected = timing['steps_played'] * NUM_INSTRUMENTS
+    
+    print(f"\n🎹 Notas MIDI a {bpm} BPM, {NUM_INSTRUMENTS} instrumentos por paso, "
+          f"gate {gate_ms:.0f} ms, send_message {send_latency * 1000:.1f} ms:")
+    print(f"   Pasos: {timing['steps_played']} ({timing['steps_missed']} salteados), "
+          f"atraso máx del loop {timing['max_late_ms']:.3f} ms")
+    print(f"   Note-on: {note_ons}/{expected} ({note_ons / seconds:.0f}/s), note-off: {note_offs}, "
+          f"colgadas: {stats['held']}")
+    print(f"   Desvío note-on: medio {stats['mean_deviation_ms']:.3f} ms, máx {stats['max_deviation_ms']:.3f} ms, "
+          f"backlog máx {stats['max_backlog']}")
+    sequencer.attach_midi(None)
+    return stats
+
+
+# Test del módulo
+if __name__ == "__main__":
+    benchmark_throughput()
+    benchmark_throughput(send_latency=0.001)
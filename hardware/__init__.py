@@ -4,8 +4,10 @@ Módulo de hardware para Raspberry Pi Drum Machine
 
 from .button_matrix import ButtonMatrix
 from .led_matrix import LEDMatrix
+from .display_service import DisplayService
+from .led_emulator import MAX7219Emulator
 from .adc_reader import ADCReader
 from .led_controller import LEDController
 
-__all__ = ['ButtonMatrix', 'LEDMatrix', 'ADCReader', 'LEDController']
+__all__ = ['ButtonMatrix', 'LEDMatrix', 'DisplayService', 'MAX7219Emulator', 'ADCReader', 'LEDController']
 
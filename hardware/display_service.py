@@ -0,0 +1,213 @@
+"""
+Servicio de display - Refresco de la matriz LED desde un thread propio
+La UI dibuja en el framebuffer de LEDMatrix (back buffer) y publica el frame
+empaquetado con un cambio de referencia (front buffer); el thread del
+servicio es el único que escribe al SPI, a ritmo fijo y solo si el frame cambió
+"""
+
+import threading
+import time
+
+from core.config import DISPLAY_FPS
+
+
+class DisplayService:
+    """
+    Refresco de la matriz LED a ritmo fijo
+    
+    publish() corre en el thread de UI: compara el frame con el último
+    publicado y, si cambió, lo deja como front con una sola asignación (el
+    frame es una tupla inmutable, así que no hace falta lock). El thread del
+    servicio toma la referencia en cada tick y la escribe con flush() de
+    LEDMatrix. El costo de dibujar (render) y el de escribir (flush) se
+    miden por separado.
+    
+    Mientras el servicio corre, ningún otro thread debe escribir al SPI.
+    """
+    
+    def __init__(self, led_matrix, fps=DISPLAY_FPS):
+        """
+        Inicializar servicio (el thread arranca con start)
+        
+        Args:
+            led_matrix: LEDMatrix (su update() pasa a publicar en el servicio)
+            fps: Refrescos por segundo
+        """
+        self.matrix = led_matrix
+        self.period_ns = int(1e9 / fps)
+        
+        # Front buffer: último frame publicado y último escrito al hardware
+        self._front = None
+        self._flushed = None
+        
+        self.thread = None
+        self.stop_event = threading.Event()
+        
+        # Estadísticas
+        self.frames_published = 0
+        self.frames_unchanged = 0
+        self.frames_flushed = 0
+        self.ticks_missed = 0
+        self.renders = 0
+        self._render_sum_ns = 0
+        self.max_render_ns = 0
+        self._flush_sum_ns = 0
+        self.max_flush_ns = 0
+    
+    def start(self):
+        """Tomar el SPI y arrancar el thread de refresco"""
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.matrix.display_service = self
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        print(f"Display: refresco a {1e9 / self.period_ns:.0f} FPS en thread propio")
+    
+    def stop(self):
+        """Detener el thread, escribir el último frame y devolver el SPI a LEDMatrix"""
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout=1.0)
+        self.thread = None
+        self._flush_front()
+        self.matrix.display_service = None
+    
+    def publish(self, rows):
+        """
+        Publicar un frame (thread de UI, no bloquea)
+        
+        Args:
+            rows: Tupla inmutable de filas empaquetadas (ver LEDMatrix.update)
+        
+        Returns:
+            True si el frame cambió y se va a escribir
+        """
+        if rows == self._front:
+            self.frames_unchanged += 1
+            return False
+        # Publicación: una sola asignación de referencia
+        self._front = rows
+        self.frames_published += 1
+        return True
+    
+    def render(self, draw, *args):
+        """
+        Dibujar un frame midiendo su costo (thread de UI)
+        
+        Args:
+            draw: Función que dibuja en la matriz y llama a update()
+            *args: Argumentos de draw
+        """
+        start = time.perf_counter_ns()
+        draw(*args)
+        elapsed = time.perf_counter_ns() - start
+        self.renders += 1
+        self._render_sum_ns += elapsed
+        self.max_render_ns = max(self.max_render_ns, elapsed)
+    
+    def _run(self):
+        """Loop del thread de refresco (deadlines absolutos)"""
+        next_ns = time.monotonic_ns()
+        while not self.stop_event.is_set():
+            self._flush_front()
+            
+            next_ns += self.period_ns
+            wait_ns = next_ns - time.monotonic_ns()
+            if wait_ns <= 0:
+                # Flush más largo que un período: saltear los ticks vencidos
+                missed = -wait_ns // self.period_ns + 1
+                self.ticks_missed += missed
+                next_ns += missed * self.period_ns
+                wait_ns = next_ns - time.monotonic_ns()
+            self.stop_event.wait(wait_ns / 1e9)
+    
+    def _flush_front(self):
+        """Escribir el front al hardware si cambió desde el último flush"""
+        front = self._front
+        if front is None or front is self._flushed:
+            return
+        start = time.perf_counter_ns()
+        self.matrix.flush(front)
+        elapsed = time.perf_counter_ns() - start
+        self._flushed = front
+        self.frames_flushed += 1
+        self._flush_sum_ns += elapsed
+        self.max_flush_ns = max(self.max_flush_ns, elapsed)
+    
+    def get_stats(self):
+        """
+        Estadísticas del servicio
+        
+        Returns:
+            dict con frames publicados/sin cambios/escritos, costo medio y
+            máximo de render y de flush (ms), ticks salteados y las
+            estadísticas de SPI de la matriz
+        """
+        renders = self.renders or 1
+        flushed = self.frames_flushed or 1
+        return {
+            'frames_published': self.frames_published,
+            'frames_unchanged': self.frames_unchanged,
+            'frames_flushed': self.frames_flushed,
+            'ticks_missed': self.ticks_missed,
+            'render_mean_ms': self._render_sum_ns / renders / 1e6,
+            'render_max_ms': self.max_render_ns / 1e6,
+            'flush_mean_ms': self._flush_sum_ns / flushed / 1e6,
+            'flush_max_ms': self.max_flush_ns / 1e6,
+            'spi': self.matrix.get_stats(),
+        }
+
+
+def benchmark_ui_loop(seconds=2.0, transfer_ms=0.5, fps=60):
+    """
+    Tiempo por iteración del loop de UI con un SPI lento: flush en línea vs DisplayService
+    
+    Args:
+        seconds: Duración de cada medición
+        transfer_ms: Demora simulada de cada xfer2
+        fps: Ritmo del loop de UI y del refresco
+    """
+    import os
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.pattern import Pattern
+    from hardware.led_matrix import LEDMatrix
+    
+    matrix = LEDMatrix()
+    matrix.spi.xfer2 = lambda packet: time.sleep(transfer_ms / 1000)
+    pattern = Pattern(masks=[0b10010001] * 32)
+    
+    def ui_loop(draw):
+        # Playhead avanzando cada 4 frames (como a ~120 BPM); el resto del
+        # tiempo el frame no cambia
+        costs = []
+        frame = 0
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            start = time.perf_counter()
+            draw(matrix.draw_sequencer_grid, pattern, (frame // 4) % 32)
+            costs.append(time.perf_counter() - start)
+            frame += 1
+            time.sleep(max(0, 1 / fps - costs[-1]))
+        return sum(costs) / len(costs) * 1000, max(costs) * 1000
+    
+    inline = ui_loop(lambda fn, *args: fn(*args))
+    service = DisplayService(matrix, fps=fps)
+    service.start()
+    threaded = ui_loop(service.render)
+    service.stop()
+    stats = service.get_stats()
+    
+    print(f"Loop de UI con xfer2 de {transfer_ms:.1f} ms:")
+    print(f"  Flush en línea:  medio {inline[0]:6.3f} ms, máx {inline[1]:6.3f} ms")
+    print(f"  DisplayService:  medio {threaded[0]:6.3f} ms, máx {threaded[1]:6.3f} ms")
+    print(f"  Render {stats['render_mean_ms']:.3f} ms, flush {stats['flush_mean_ms']:.3f} ms "
+          f"(máx {stats['flush_max_ms']:.3f}); publicados {stats['frames_published']}, "
+          f"sin cambios {stats['frames_unchanged']}, escritos {stats['frames_flushed']}")
+
+
+# Test del módulo
+if __name__ == "__main__":
+    benchmark_ui_loop()
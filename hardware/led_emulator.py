@@ -0,0 +1,424 @@
+"""
+Emulador de la cadena MAX7219 para correr sin Raspberry Pi
+Backend SPI con la interfaz de spidev.SpiDev que decodifica las escrituras de
+registros como los MAX7219 en cascada, arma el frame 8x32 que se vería en la
+matriz, registra frames con su instante y cuenta transacciones y bytes.
+Los frames se pueden volcar como texto ASCII o como secuencia de PNG.
+"""
+
+import collections
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from core.config import MAX7219_NUM_DEVICES
+
+# Registros MAX7219 (mismos valores que hardware/led_matrix.py)
+REG_NOOP = 0x00
+REG_DIGIT0 = 0x01
+REG_DIGIT7 = 0x08
+REG_DECODEMODE = 0x09
+REG_INTENSITY = 0x0A
+REG_SCANLIMIT = 0x0B
+REG_SHUTDOWN = 0x0C
+REG_DISPLAYTEST = 0x0F
+
+
+class MAX7219Emulator:
+    """
+    SPI emulado con la interfaz de spidev.SpiDev (open, max_speed_hz, xfer2, close)
+    
+    Cada xfer2 se decodifica como lo hace la cadena real: los pares
+    (registro, dato) entran por el primer dispositivo y se corren hacia el
+    final; al terminar la transacción (CS arriba) cada dispositivo ejecuta
+    el comando que le quedó en su registro de desplazamiento. Con un paquete
+    completo, el primer par llega al último dispositivo de la cadena.
+    
+    El frame se arma en coordenadas lógicas [y, x] como LEDMatrix.frame (la
+    columna lógica 0 es el bit 7 del último dispositivo).
+    """
+    
+    def __init__(self, num_devices=MAX7219_NUM_DEVICES, record=False, max_frames=4096,
+                 coalesce_ms=2.0):
+        """
+        Inicializar emulador
+        
+        Args:
+            num_devices: Número de MAX7219 en cascada
+            record: Registrar los frames que cambian (ver frames)
+            max_frames: Frames guardados como máximo (se descartan los más viejos)
+            coalesce_ms: Cambios más cercanos que esto se juntan en un frame
+                         (las hasta 8 filas que escribe un flush de LEDMatrix)
+        """
+        self.num_devices = num_devices
+        self.width = 8 * num_devices
+        self.height = 8
+        self.max_speed_hz = 0
+        self.is_open = False
+        
+        # Estado de cada dispositivo: 8 filas y registros de control
+        # (al encender el MAX7219 arranca apagado y con scan limit 0)
+        self.digits = np.zeros((num_devices, 8), dtype=np.uint8)
+        self.decode_mode = [0] * num_devices
+        self.intensity = [0] * num_devices
+        self.scan_limit = [0] * num_devices
+        self.shutdown = [True] * num_devices
+        self.display_test = [False] * num_devices
+        
+        # Registro de desplazamiento de la cadena: (registro, dato) por dispositivo
+        self._chain = [(REG_NOOP, 0)] * num_devices
+        
+        # Frames registrados: (t_ns, frame [8, width] bool)
+        self.record = record
+        self.frames = collections.deque(maxlen=max_frames)
+        self.coalesce_ns = int(coalesce_ms * 1e6)
+        self._last_change_ns = None
+        self._visible = self.frame()
+        
+        # Estadísticas
+        self.transfers = 0
+        self.bytes = 0
+        self.digit_writes = 0
+        self.control_writes = 0
+        self.noop_writes = 0
+        self.frame_changes = 0
+    
+    def open(self, bus, device):
+        """Abrir bus (sin efecto)"""
+        self.is_open = True
+    
+    def close(self):
+        """Cerrar bus"""
+        self.is_open = False
+    
+    def xfer2(self, data):
+        """
+        Una transacción SPI: correr los pares por la cadena y ejecutarlos
+        
+        Args:
+            data: Bytes enviados (pares registro, dato)
+        
+        Returns:
+            Bytes recibidos (la cadena no devuelve datos: ceros)
+        """
+        self.transfers += 1
+        self.bytes += len(data)
+        
+        chain = self._chain
+        for i in range(0, len(data) - 1, 2):
+            chain = [(data[i] & 0x0F, data[i + 1] & 0xFF)] + chain[:-1]
+        self._chain = chain
+        
+        # CS arriba: cada dispositivo ejecuta lo que le quedó (los dispositivos
+        # a los que no llegó nada en esta transacción re-ejecutan su comando
+        # anterior, como el hardware)
+        for device_id, (register, value) in enumerate(chain):
+            self._execute(device_id, register, value)
+        
+        frame = self.frame()
+        if not np.array_equal(frame, self._visible):
+            self._visible = frame
+            self._frame_changed(frame)
+        return [0] * len(data)
+    
+    def _execute(self, device_id, register, value):
+        """Ejecutar un comando en un dispositivo"""
+        if register == REG_NOOP:
+            self.noop_writes += 1
+        elif REG_DIGIT0 <= register <= REG_DIGIT7:
+            self.digits[device_id, register - REG_DIGIT0] = value
+            self.digit_writes += 1
+        else:
+            if register == REG_DECODEMODE:
+                self.decode_mode[device_id] = value
+            elif register == REG_INTENSITY:
+                self.intensity[device_id] = value & 0x0F
+            elif register == REG_SCANLIMIT:
+                self.scan_limit[device_id] = value & 0x07
+            elif register == REG_SHUTDOWN:
+                self.shutdown[device_id] = not value & 0x01
+            elif register == REG_DISPLAYTEST:
+                self.display_test[device_id] = bool(value & 0x01)
+            self.control_writes += 1
+    
+    def _frame_changed(self, frame):
+        """Registrar un cambio de lo visible (juntando los de un mismo flush)"""
+        now = time.monotonic_ns()
+        self.frame_changes += 1
+        if self.record:
+            last = self._last_change_ns
+            if self.frames and last is not None and now - last < self.coalesce_ns:
+                self.frames[-1] = (self.frames[-1][0], frame)
+            else:
+                self.frames.append((now, frame))
+        self._last_change_ns = now
+    
+    def frame(self):
+        """
+        Frame visible en coordenadas lógicas
+        
+        Tiene en cuenta shutdown (apagado), display test (todo encendido) y
+        scan limit (filas no escaneadas apagadas) de cada dispositivo.
+        
+        Returns:
+            Array bool [8, width] (copia)
+        """
+        rows = self.digits.copy()
+        for device_id in range(self.num_devices):
+            if self.display_test[device_id]:
+                rows[device_id] = 0xFF
+            elif self.shutdown[device_id]:
+                rows[device_id] = 0
+            else:
+                rows[device_id, self.scan_limit[device_id] + 1:] = 0
+        # Del último dispositivo al primero, MSB primero (inverso de LEDMatrix.row_bytes)
+        return np.unpackbits(rows[::-1].T, axis=1).astype(bool)
+    
+    def capture(self):
+        """
+        Registrar el frame visible ahora (aunque no haya cambiado)
+        
+        Returns:
+            (t_ns, frame)
+        """
+        entry = (time.monotonic_ns(), self.frame())
+        self.frames.append(entry)
+        return entry
+    
+    def clear_frames(self):
+        """Olvidar los frames registrados"""
+        self.frames.clear()
+        self._last_change_ns = None
+    
+    def get_stats(self):
+        """
+        Estadísticas de tráfico
+        
+        Returns:
+            dict con transacciones, bytes, escrituras por tipo de registro,
+            cambios de frame, frames registrados y tiempo de bus estimado (ms)
+            a max_speed_hz
+        """
+        return {
+            'transfers': self.transfers,
+            'bytes': self.bytes,
+            'digit_writes': self.digit_writes,
+            'control_writes': self.control_writes,
+            'noop_writes': self.noop_writes,
+            'frame_changes': self.frame_changes,
+            'frames_recorded': len(self.frames),
+            'bus_ms': self.bytes * 8 / self.max_speed_hz * 1000 if self.max_speed_hz else 0.0,
+        }
+    
+    def dump_ascii(self, path):
+        """
+        Volcar los frames registrados a un archivo de texto
+        
+        Args:
+            path: Archivo de salida
+        
+        Returns:
+            Cantidad de frames escritos
+        """
+        start_ns = self.frames[0][0] if self.frames else 0
+        with open(path, 'w') as f:
+            for index, (t_ns, frame) in enumerate(self.frames):
+                f.write(f"# frame {index} t={(t_ns - start_ns) / 1e6:.3f} ms\n")
+                f.write(to_ascii(frame))
+                f.write("\n\n")
+        return len(self.frames)
+    
+    def dump_png_sequence(self, directory, prefix='frame', scale=8):
+        """
+        Volcar los frames registrados como PNG numerados
+        
+        Args:
+            directory: Directorio de salida (se crea si no existe)
+            prefix: Prefijo de los archivos (prefix_0000.png, ...)
+            scale: Píxeles de imagen por LED
+        
+        Returns:
+            Lista de rutas escritas
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for index, (_, frame) in enumerate(self.frames):
+            path = os.path.join(directory, f"{prefix}_{index:04d}.png")
+            write_png(path, frame, scale)
+            paths.append(path)
+        return paths
+
+
+def to_ascii(frame, on='#', off='.'):
+    """
+    Frame a texto: una línea por fila
+    
+    Args:
+        frame: Array bool [alto, ancho] (o listas equivalentes)
+    
+    Returns:
+        str sin salto de línea final
+    """
+    return "\n".join("".join(on if lit else off for lit in row) for row in frame)
+
+
+def write_png(path, frame, scale=8):
+    """
+    Escribir un frame como PNG RGB (LED encendido rojo, apagado casi negro)
+    
+    Solo usa zlib y struct (no hace falta Pillow).
+    
+    Args:
+        path: Archivo de salida
+        frame: Array bool [alto, ancho]
+        scale: Píxeles de imagen por LED (con un borde de separación si es >= 4)
+    """
+    frame = np.asarray(frame, dtype=bool)
+    lit = np.repeat(np.repeat(frame, scale, axis=0), scale, axis=1)
+    image = np.where(lit[..., None], np.array([255, 40, 30], dtype=np.uint8),
+                     np.array([40, 8, 8], dtype=np.uint8))
+    if scale >= 4:
+        # Separación entre LEDs
+        image[scale - 1::scale, :] = 0
+        image[:, scale - 1::scale] = 0
+    height, width = image.shape[:2]
+    raw = b''.join(b'\x00' + image[y].tobytes() for y in range(height))
+    
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+    
+    png = b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        chunk(b'IDAT', zlib.compress(raw, 9)),
+        chunk(b'IEND', b''),
+    ])
+    with open(path, 'wb') as f:
+        f.write(png)
+
+
+def snapshot_views(directory=None, png=True):
+    """
+    Renderizar cada vista de ViewManager con el emulador y capturar su frame
+    
+    Verifica que lo decodificado del SPI sea igual al framebuffer de
+    LEDMatrix; con directory escribe un .txt (y un .png) por vista para
+    comparar contra una referencia guardada.
+    
+    Args:
+        directory: Directorio de salida (None = no escribir)
+        png: Escribir también un PNG por vista
+    
+    Returns:
+        dict nombre de vista -> texto ASCII del frame (None si la vista falla)
+    """
+    from core.pattern import Pattern
+    from hardware.led_matrix import LEDMatrix
+    from ui.view_manager import ViewManager, ViewType
+    
+    class Sequencer:
+        """Secuenciador mínimo con lo que lee ViewManager.render"""
+        is_playing = False
+        current_step = 0
+        external_clock = None
+        
+        def get_pattern(self):
+            return Pattern(masks=[(step * 37) & 0xFF for step in range(32)])
+    
+    # Datos de ejemplo por vista (las que no figuran usan los valores por defecto de render)
+    view_data = {
+        ViewType.BPM: {'bpm': 128},
+        ViewType.SWING: {'swing': 35},
+        ViewType.VOLUME: {'volume': 87},
+        ViewType.VOL_DRUMS: {'volume': 64},
+        ViewType.PATTERN: {'pattern_num': 12, 'bpm': 140, 'steps': 32},
+        ViewType.SAVE: {'pattern_num': 45},
+        ViewType.EFFECTS: {'effects': {'reverb': 40, 'delay': 0}},
+        ViewType.EFFECT_REVERB: {'reverb_mix': 75},
+        ViewType.EFFECT_REVERB_PRESET: {'label': 'HALL'},
+        ViewType.EFFECT_DELAY_DIVISION: {'label': '16'},
+    }
+    
+    spi = MAX7219Emulator()
+    matrix = LEDMatrix(spi=spi)
+    views = ViewManager()
+    sequencer = Sequencer()
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    snapshots = {}
+    for view in ViewType:
+        views.show_view(view, dict(view_data.get(view, {})))
+        try:
+            views.render(matrix, sequencer, 5)
+        except AttributeError as e:
+            print(f"Vista {view.value}: no se pudo renderizar ({e})")
+            snapshots[view.value] = None
+            continue
+        frame = spi.frame()
+        assert np.array_equal(frame, matrix.frame), f"SPI y framebuffer difieren en {view.value}"
+        snapshots[view.value] = to_ascii(frame)
+        if directory:
+            with open(os.path.join(directory, f"{view.value}.txt"), 'w') as f:
+                f.write(snapshots[view.value] + "\n")
+            if png:
+                write_png(os.path.join(directory, f"{view.value}.png"), frame)
+    return snapshots
+
+
+def benchmark_traffic(frames=600):
+    """
+    Tráfico SPI de la matriz con el emulador: secuenciador con playhead y vistas de valor
+    
+    Args:
+        frames: Frames a dibujar por escenario (600 = 10 s a 60 FPS)
+    """
+    from core.pattern import Pattern
+    from hardware.led_matrix import LEDMatrix
+    
+    pattern = Pattern(masks=[0b10010001 if step % 4 == 0 else 0b00000100 for step in range(32)])
+    scenarios = (
+        # Playhead avanzando cada 4 frames (~120 BPM a 60 FPS)
+        ("Secuenciador", lambda matrix, i: matrix.draw_sequencer_grid(pattern, (i // 4) % 32)),
+        # Perilla de BPM girando: un valor nuevo cada 6 frames
+        ("Vista BPM", lambda matrix, i: matrix.draw_bpm_view(100 + i // 6)),
+        # Vista fija (timeout de 2 s sin tocar nada)
+        ("Vista fija", lambda matrix, i: matrix.draw_swing_view(35)),
+    )
+    
+    print(f"Tráfico SPI de la matriz ({frames} frames por escenario):")
+    for name, draw in scenarios:
+        spi = MAX7219Emulator(record=True)
+        matrix = LEDMatrix(spi=spi)
+        spi.max_speed_hz = matrix.spi.max_speed_hz
+        before = spi.get_stats()
+        spi.clear_frames()
+        for i in range(frames):
+            draw(matrix, i)
+        stats = spi.get_stats()
+        transfers = stats['transfers'] - before['transfers']
+        sent = stats['bytes'] - before['bytes']
+        bus_ms = stats['bus_ms'] - before['bus_ms']
+        print(f"  {name:13s} {transfers:6d} transacciones, {sent:7d} bytes "
+              f"({sent / frames:5.1f} B/frame, bus {bus_ms:6.1f} ms), "
+              f"{stats['frame_changes'] - before['frame_changes']:4d} cambios visibles")
+
+
+# Test del módulo
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) >= 2 and sys.argv[1] == 'views':
+        # PYTHONPATH=. python3 hardware/led_emulator.py views out/views
+        directory = sys.argv[2] if len(sys.argv) > 2 else None
+        for name, text in snapshot_views(directory).items():
+            print(f"[{name}]")
+            print(text if text is not None else "(sin render)")
+        if directory:
+            print(f"Vistas volcadas en {directory}")
+    else:
+        benchmark_traffic()
@@ -6,15 +6,15 @@ Maneja 4 módulos MAX7219 (8x8 cada uno) para display de información
 try:
     import spidev
 except ImportError:
-    print("Advertencia: spidev no disponible, usando mock")
-    class MockSpiDev:
-        def open(self, bus, device): pass
-        def max_speed_hz(self, speed): pass
-        def xfer2(self, data): return [0] * len(data)
-        def close(self): pass
-    spidev = type('spidev', (), {'SpiDev': MockSpiDev})()
+    print("Advertencia: spidev no disponible, usando emulador MAX7219")
+    spidev = None
 
-from core.config import SPI_MAX7219_CE, MAX7219_NUM_DEVICES, MAX7219_BRIGHTNESS
+import collections
+
+import numpy as np
+
+from core.config import SPI_MAX7219_CE, MAX7219_NUM_DEVICES, MAX7219_BRIGHTNESS, VIEW_FRAME_CACHE_SIZE
+from hardware.led_emulator import MAX7219Emulator
 
 
 # Registros MAX7219
@@ -33,26 +33,109 @@ REG_SCANLIMIT = 0x0B
 REG_SHUTDOWN = 0x0C
 REG_DISPLAYTEST = 0x0F
 
+# Fuente 3x5: píxeles (x, y) a encender por carácter
+_DIGITS_3X5 = {
+    '0': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
+    '1': [(1,0),(0,1),(1,1),(1,2),(1,3),(0,4),(1,4),(2,4)],
+    '2': [(0,0),(1,0),(2,0),(2,1),(0,2),(1,2),(2,2),(0,3),(0,4),(1,4),(2,4)],
+    '3': [(0,0),(1,0),(2,0),(2,1),(1,2),(2,2),(2,3),(0,4),(1,4),(2,4)],
+    '4': [(0,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(2,3),(2,4)],
+    '5': [(0,0),(1,0),(2,0),(0,1),(0,2),(1,2),(2,2),(2,3),(0,4),(1,4),(2,4)],
+    '6': [(0,0),(1,0),(2,0),(0,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
+    '7': [(0,0),(1,0),(2,0),(2,1),(2,2),(1,3),(1,4)],
+    '8': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
+    '9': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(2,3),(0,4),(1,4),(2,4)],
+}
+
+_LETTERS_3X5 = {
+    'B': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
+    'P': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(0,4)],
+    'M': [(0,0),(2,0),(0,1),(1,1),(2,1),(0,2),(2,2),(0,3),(2,3),(0,4),(2,4)],
+    'S': [(0,0),(1,0),(2,0),(0,1),(0,2),(1,2),(2,2),(2,3),(0,4),(1,4),(2,4)],
+    'W': [(0,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(2,4)],
+    'G': [(0,0),(1,0),(2,0),(0,1),(0,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
+    'V': [(0,0),(2,0),(0,1),(2,1),(0,2),(2,2),(1,3),(1,4)],
+    'O': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
+    'L': [(0,0),(0,1),(0,2),(0,3),(0,4),(1,4),(2,4)],
+    'D': [(0,0),(1,0),(0,1),(2,1),(0,2),(2,2),(0,3),(2,3),(0,4),(1,4)],
+    'R': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(2,4)],
+    'H': [(0,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(2,4)],
+    'T': [(0,0),(1,0),(2,0),(1,1),(1,2),(1,3),(1,4)],
+    'C': [(0,0),(1,0),(2,0),(0,1),(0,2),(0,3),(0,4),(1,4),(2,4)],
+    'Y': [(0,0),(2,0),(0,1),(2,1),(1,2),(1,3),(1,4)],
+    'A': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(2,4)],
+    'E': [(0,0),(1,0),(2,0),(0,1),(0,2),(1,2),(0,3),(0,4),(1,4),(2,4)],
+    'F': [(0,0),(1,0),(2,0),(0,1),(0,2),(1,2),(0,3),(0,4)],
+    'X': [(0,0),(2,0),(0,1),(2,1),(1,2),(0,3),(2,3),(0,4),(2,4)],
+}
+
+
+def _build_glyph_atlas():
+    """
+    Atlas de glifos: una máscara por columna (bit y = fila) y el bitmap [5, 3]
+    que se copia con blit_glyph, armados una sola vez al importar
+    """
+    atlas = {}
+    for char, pixels in list(_DIGITS_3X5.items()) + list(_LETTERS_3X5.items()):
+        columns = [0, 0, 0]
+        for x, y in pixels:
+            columns[x] |= 1 << y
+        bitmap = np.array([[bool(columns[x] >> y & 1) for x in range(3)] for y in range(5)])
+        bitmap.setflags(write=False)
+        atlas[char] = (tuple(columns), bitmap)
+    return atlas
+
+
+_GLYPH_ATLAS = _build_glyph_atlas()
+
+
 
 class LEDMatrix:
     """Controlador de matriz LED MAX7219"""
     
-    def __init__(self, num_devices=MAX7219_NUM_DEVICES):
+    def __init__(self, num_devices=MAX7219_NUM_DEVICES, spi=None):
         """
         Inicializar matriz LED
         
         Args:
             num_devices: Número de módulos MAX7219 en cascada
+            spi: Dispositivo con la interfaz de spidev.SpiDev (ej: MAX7219Emulator);
+                 None = spidev, o el emulador si spidev no está disponible
         """
         self.num_devices = num_devices
         self.width = 8 * num_devices  # 8 columnas por dispositivo
         self.height = 8
         
-        # Buffer de display (cada dispositivo tiene 8 filas de 8 bits)
-        self.buffer = [[0] * 8 for _ in range(num_devices)]
+        # Framebuffer en coordenadas lógicas [y, x] (sin espejado); la
+        # conversión a bytes de fila del MAX7219 se hace de una vez en update
+        self.frame = np.zeros((self.height, self.width), dtype=bool)
+        
+        # Copia de lo que tiene el hardware por fila (None = desconocido, se reenvía)
+        self._shadow = [None] * 8
+        
+        # Con un DisplayService activo, update() solo publica el frame y el
+        # SPI lo escribe el thread del servicio (ver hardware/display_service.py)
+        self.display_service = None
+        
+        # Frames ya renderizados de las vistas de valor (LRU):
+        # (vista, valores) -> (frame, filas empaquetadas)
+        self._view_cache = collections.OrderedDict()
+        self.view_cache_size = VIEW_FRAME_CACHE_SIZE
+        self.view_cache_hits = 0
+        self.view_cache_misses = 0
+        
+        # Estadísticas de SPI
+        self.spi_transfers = 0
+        self.spi_bytes = 0
+        self.frames = 0
+        self.frames_skipped = 0
+        self.last_frame_transfers = 0
+        self.last_frame_bytes = 0
         
         # Inicializar SPI
-        self.spi = spidev.SpiDev()
+        if spi is None:
+            spi = spidev.SpiDev() if spidev else MAX7219Emulator(num_devices)
+        self.spi = spi
         self.spi.open(0, SPI_MAX7219_CE)  # Bus 0, CE0
         self.spi.max_speed_hz = 1000000   # 1 MHz
         
@@ -68,8 +151,10 @@ class LEDMatrix:
         self._write_all(REG_INTENSITY, MAX7219_BRIGHTNESS)  # Brillo
         self._write_all(REG_SHUTDOWN, 0x01)       # Encender display
         
-        # Limpiar display
+        # Limpiar display (el primer update manda las 8 filas)
+        self.invalidate()
         self.clear()
+        self.update()
     
     def _write_all(self, register, data):
         """
@@ -84,7 +169,13 @@ class LEDMatrix:
         for _ in range(self.num_devices):
             packet.extend([register, data])
         
+        self._transfer(packet)
+    
+    def _transfer(self, packet):
+        """Una transacción SPI (contabilizada)"""
         self.spi.xfer2(packet)
+        self.spi_transfers += 1
+        self.spi_bytes += len(packet)
     
     def _write_device(self, device_id, register, data):
         """
@@ -108,7 +199,10 @@ class LEDMatrix:
         for i in range(device_id):
             packet.extend([REG_NOOP, 0x00])
         
-        self.spi.xfer2(packet)
+        self._transfer(packet)
+        # La fila quedó distinta de lo que indica la copia
+        if REG_DIGIT0 <= register <= REG_DIGIT7:
+            self._shadow[register - REG_DIGIT0] = None
     
     def set_pixel(self, x, y, state):
         """
@@ -121,54 +215,215 @@ class LEDMatrix:
         """
         if x < 0 or x >= self.width or y < 0 or y >= 8:
             return
-        
-        # INVERTIR eje X para corregir espejado
-        x = (self.width - 1) - x
-        
-        # Determinar dispositivo y posición local
-        device_id = x // 8
-        local_x = x % 8
-        
-        # Actualizar buffer
-        if state:
-            self.buffer[device_id][y] |= (1 << local_x)
-        else:
-            self.buffer[device_id][y] &= ~(1 << local_x)
+        self.frame[y, x] = state
     
     def get_pixel(self, x, y):
         """Obtener estado de un pixel"""
         if x < 0 or x >= self.width or y < 0 or y >= 8:
             return False
-        
-        # INVERTIR eje X para corregir espejado
-        x = (self.width - 1) - x
-        
-        device_id = x // 8
-        local_x = x % 8
-        
-        return bool(self.buffer[device_id][y] & (1 << local_x))
+        return bool(self.frame[y, x])
     
     def clear(self):
-        """Limpiar toda la matriz"""
-        for device_id in range(self.num_devices):
-            for row in range(8):
-                self.buffer[device_id][row] = 0
-        self.update()
+        """Limpiar el buffer (no envía nada: el próximo update manda las filas que cambiaron)"""
+        self.frame[:] = False
     
     def fill(self):
         """Encender todos los LEDs"""
-        for device_id in range(self.num_devices):
-            for row in range(8):
-                self.buffer[device_id][row] = 0xFF
+        self.frame[:] = True
         self.update()
     
+    # ===== OPERACIONES EN BLOQUE =====
+    
+    def _clip(self, x0, y0, x1, y1):
+        """Recortar un rectángulo [x0, x1) x [y0, y1) al display"""
+        return max(0, x0), max(0, y0), min(self.width, x1), min(self.height, y1)
+    
+    def blit_pattern(self, grid, x=0, y=0):
+        """
+        Copiar una matriz booleana al framebuffer (reemplaza la región)
+        
+        Args:
+            grid: Array [filas, columnas] de bools (ej: 8x32 instrumentos x pasos)
+            x, y: Esquina superior izquierda
+        """
+        grid = np.asarray(grid, dtype=bool)
+        if x == 0 and y == 0 and grid.shape == self.frame.shape:
+            self.frame[...] = grid
+            return
+        x0, y0, x1, y1 = self._clip(x, y, x + grid.shape[1], y + grid.shape[0])
+        if x0 < x1 and y0 < y1:
+            self.frame[y0:y1, x0:x1] = grid[y0 - y:y1 - y, x0 - x:x1 - x]
+    
+    def blit_lanes(self, lanes):
+        """
+        Copiar máscaras de bits por fila (bit n = columna n) a todo el framebuffer
+        
+        Args:
+            lanes: Un entero por fila (ej: Pattern.lanes, un instrumento por fila);
+                   las filas que falten quedan apagadas
+        """
+        if len(lanes) == self.height and self.width == 32:
+            # Caso del grid: 8 palabras de 32 bits, un solo unpackbits
+            bits = np.unpackbits(np.array(lanes, dtype='<u4').view(np.uint8), bitorder='little')
+            self.frame[...] = bits.reshape(self.frame.shape)
+            return
+        count = min(len(lanes), self.height)
+        words = np.array(lanes[:count], dtype='<u8').view(np.uint8).reshape(count, 8)
+        self.frame[:count] = np.unpackbits(words, axis=1, bitorder='little')[:, :self.width]
+        self.frame[count:] = False
+    
+    def blit_glyph(self, bitmap, x, y):
+        """
+        OR de un bitmap prerenderizado (no apaga los píxeles que ya estaban)
+        
+        Args:
+            bitmap: Array [alto, ancho] de bools
+            x, y: Esquina superior izquierda
+        """
+        x0, y0, x1, y1 = self._clip(x, y, x + bitmap.shape[1], y + bitmap.shape[0])
+        if x0 < x1 and y0 < y1:
+            self.frame[y0:y1, x0:x1] |= bitmap[y0 - y:y1 - y, x0 - x:x1 - x]
+    
+    def fill_region(self, x0, y0, x1, y1, state=True):
+        """Encender o apagar el rectángulo [x0, x1) x [y0, y1)"""
+        x0, y0, x1, y1 = self._clip(x0, y0, x1, y1)
+        if x0 < x1 and y0 < y1:
+            self.frame[y0:y1, x0:x1] = state
+    
+    def draw_column(self, x, state=True):
+        """Encender o apagar una columna completa"""
+        if 0 <= x < self.width:
+            self.frame[:, x] = state
+    
+    def invert_region(self, x0, y0, x1, y1):
+        """Invertir el rectángulo [x0, x1) x [y0, y1)"""
+        x0, y0, x1, y1 = self._clip(x0, y0, x1, y1)
+        if x0 < x1 and y0 < y1:
+            np.logical_not(self.frame[y0:y1, x0:x1], out=self.frame[y0:y1, x0:x1])
+    
+    def row_bytes(self):
+        """
+        Framebuffer a bytes del MAX7219 en un solo paso
+        
+        El eje X está espejado: la columna lógica 0 es el bit 7 del último
+        dispositivo de la cadena, así que empaquetar cada fila MSB primero
+        da los bytes directamente en el orden en que se envían.
+        
+        Returns:
+            Array uint8 [fila, dispositivo], del último de la cadena al primero
+        """
+        return np.packbits(self.frame, axis=1)
+    
+    @property
+    def buffer(self):
+        """Bytes por dispositivo y fila ([dispositivo][fila], solo lectura)"""
+        return self.row_bytes()[:, ::-1].T.tolist()
+    
     def update(self):
-        """Actualizar display con el buffer actual"""
-        for device_id in range(self.num_devices):
-            for row in range(8):
-                register = REG_DIGIT0 + row
-                data = self.buffer[device_id][row]
-                self._write_device(device_id, register, data)
+        """
+        Actualizar display con el buffer actual
+        
+        Con DisplayService el frame empaquetado se publica y lo escribe su
+        thread; sin servicio se escribe al SPI en el acto.
+        """
+        self._present(self._pack_rows())
+    
+    def _pack_rows(self):
+        """Filas de todos los dispositivos (tupla inmutable), del último de la cadena al primero"""
+        return tuple(map(tuple, self.row_bytes().tolist()))
+    
+    def _present(self, rows):
+        """Publicar al DisplayService o escribir al SPI un frame empaquetado"""
+        service = self.display_service
+        if service is not None:
+            service.publish(rows)
+        else:
+            self.flush(rows)
+    
+    def flush(self, rows):
+        """
+        Escribir un frame empaquetado al hardware
+        
+        Solo se envían las filas que cambiaron respecto de lo que tiene el
+        hardware, cada una en una sola transacción para los dispositivos en
+        cascada (a lo sumo 8 por frame). Un frame idéntico no toca el SPI.
+        
+        Args:
+            rows: Tupla de 8 filas, cada una con un byte por dispositivo
+                  (del último de la cadena al primero)
+        """
+        start_transfers = self.spi_transfers
+        start_bytes = self.spi_bytes
+        
+        for row, data in enumerate(rows):
+            if data == self._shadow[row]:
+                continue
+            register = REG_DIGIT0 + row
+            packet = []
+            for value in data:
+                packet.extend([register, value])
+            self._transfer(packet)
+            self._shadow[row] = data
+        
+        self.frames += 1
+        self.last_frame_transfers = self.spi_transfers - start_transfers
+        self.last_frame_bytes = self.spi_bytes - start_bytes
+        if not self.last_frame_transfers:
+            self.frames_skipped += 1
+    
+    def _show_cached(self, key):
+        """
+        Mostrar el frame memorizado de una vista (una copia del buffer)
+        
+        Args:
+            key: (vista, valores) que determinan el frame por completo
+        
+        Returns:
+            True si estaba en el cache (el frame ya quedó presentado)
+        """
+        cached = self._view_cache.get(key)
+        if cached is None:
+            self.view_cache_misses += 1
+            return False
+        self._view_cache.move_to_end(key)
+        self.view_cache_hits += 1
+        frame, rows = cached
+        self.frame[...] = frame
+        self._present(rows)
+        return True
+    
+    def _finish_view(self, key):
+        """Memorizar el frame recién dibujado de una vista y presentarlo"""
+        rows = self._pack_rows()
+        self._view_cache[key] = (self.frame.copy(), rows)
+        if len(self._view_cache) > self.view_cache_size:
+            self._view_cache.popitem(last=False)
+        self._present(rows)
+    
+    def invalidate(self):
+        """Olvidar el estado del hardware (el próximo update reenvía todas las filas)"""
+        self._shadow = [None] * 8
+    
+    def get_stats(self):
+        """
+        Estadísticas de SPI
+        
+        Returns:
+            dict con transacciones y bytes totales, del último frame y promedio por frame
+        """
+        frames = self.frames or 1
+        return {
+            'frames': self.frames,
+            'frames_skipped': self.frames_skipped,
+            'spi_transfers': self.spi_transfers,
+            'spi_bytes': self.spi_bytes,
+            'last_frame_transfers': self.last_frame_transfers,
+            'last_frame_bytes': self.last_frame_bytes,
+            'transfers_per_frame': self.spi_transfers / frames,
+            'bytes_per_frame': self.spi_bytes / frames,
+            'view_cache_hits': self.view_cache_hits,
+            'view_cache_misses': self.view_cache_misses,
+        }
     
     def draw_sequencer_grid(self, pattern, display_step=-1):
         """
@@ -176,22 +431,22 @@ class LEDMatrix:
         Con playhead dual inteligente
         
         Args:
-            pattern: Array 32x8 con el patrón (True/False)
+            pattern: Pattern (o array 32x8 con el patrón True/False)
             display_step: Paso a resaltar (playhead cuando reproduce, paso seleccionado cuando no)
         """
-        # Limpiar toda la matriz
-        self.clear()
-        
-        # Dibujar patrón completo (32 pasos)
-        for step in range(min(32, len(pattern))):
-            for instrument in range(min(8, len(pattern[step]))):
-                if pattern[step][instrument]:
-                    self.set_pixel(step, instrument, True)
+        lanes = getattr(pattern, 'lanes', None)
+        if lanes is not None:
+            # Pattern: cada instrumento es una fila de bits (bit n = paso n)
+            self.blit_lanes(lanes)
+        else:
+            self.clear()
+            if len(pattern):
+                # Formato viejo [paso][instrumento]: transponer a [instrumento][paso]
+                self.blit_pattern(np.array(pattern, dtype=bool)[:self.width, :self.height].T)
         
         # Destacar paso actual/seleccionado (iluminar toda la columna)
         if 0 <= display_step < 32:
-            for y in range(8):
-                self.set_pixel(display_step, y, True)
+            self.draw_column(display_step)
         
         self.update()
     
@@ -210,20 +465,15 @@ class LEDMatrix:
         # - Columna 24-31: Patrón y modo
         
         # Limpiar sección de info
-        for x in range(16, 32):
-            for y in range(8):
-                self.set_pixel(x, y, False)
+        self.fill_region(16, 0, 32, 8, False)
         
         # Mostrar BPM como barras (más alto = más LEDs encendidos)
         bpm_normalized = (bpm - 60) / (200 - 60)  # 0.0 a 1.0
         bpm_leds = int(bpm_normalized * 8)
-        for y in range(bpm_leds):
-            for x in range(16, 20):  # 4 columnas para BPM
-                self.set_pixel(x, 7 - y, True)
+        self.fill_region(16, 8 - bpm_leds, 20, 8)  # 4 columnas para BPM
         
         # Mostrar número de patrón (1-8) como LEDs verticales
-        for y in range(pattern_num):
-            self.set_pixel(21, y, True)
+        self.fill_region(21, 0, 22, pattern_num)
         
         # Mostrar modo (PAD vs SEQ)
         if mode == 'PAD':
@@ -266,10 +516,8 @@ class LEDMatrix:
         """Patrón de prueba"""
         self.clear()
         # Dibujar un patrón de tablero de ajedrez
-        for x in range(self.width):
-            for y in range(8):
-                if (x + y) % 2 == 0:
-                    self.set_pixel(x, y, True)
+        y, x = np.indices(self.frame.shape)
+        self.blit_pattern((x + y) % 2 == 0)
         self.update()
     
     # ===== FUENTE DE NÚMEROS Y LETRAS 3x5 =====
@@ -280,23 +528,11 @@ class LEDMatrix:
         
         Args:
             digit: Dígito 0-9
-            
+        
         Returns:
             Lista de tuplas (x, y) con píxeles a encender
         """
-        digits = {
-            '0': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
-            '1': [(1,0),(0,1),(1,1),(1,2),(1,3),(0,4),(1,4),(2,4)],
-            '2': [(0,0),(1,0),(2,0),(2,1),(0,2),(1,2),(2,2),(0,3),(0,4),(1,4),(2,4)],
-            '3': [(0,0),(1,0),(2,0),(2,1),(1,2),(2,2),(2,3),(0,4),(1,4),(2,4)],
-            '4': [(0,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(2,3),(2,4)],
-            '5': [(0,0),(1,0),(2,0),(0,1),(0,2),(1,2),(2,2),(2,3),(0,4),(1,4),(2,4)],
-            '6': [(0,0),(1,0),(2,0),(0,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
-            '7': [(0,0),(1,0),(2,0),(2,1),(2,2),(1,3),(1,4)],
-            '8': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
-            '9': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(2,3),(0,4),(1,4),(2,4)],
-        }
-        return digits.get(str(digit), [])
+        return _DIGITS_3X5.get(str(digit), [])
     
     def _get_letter_3x5(self, letter):
         """
@@ -304,29 +540,11 @@ class LEDMatrix:
         
         Args:
             letter: Letra A-Z
-            
+        
         Returns:
             Lista de tuplas (x, y) con píxeles a encender
         """
-        letters = {
-            'B': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
-            'P': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(0,4)],
-            'M': [(0,0),(2,0),(0,1),(1,1),(2,1),(0,2),(2,2),(0,3),(2,3),(0,4),(2,4)],
-            'S': [(0,0),(1,0),(2,0),(0,1),(0,2),(1,2),(2,2),(2,3),(0,4),(1,4),(2,4)],
-            'W': [(0,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(2,4)],
-            'G': [(0,0),(1,0),(2,0),(0,1),(0,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
-            'V': [(0,0),(2,0),(0,1),(2,1),(0,2),(2,2),(1,3),(1,4)],
-            'O': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(2,2),(0,3),(2,3),(0,4),(1,4),(2,4)],
-            'L': [(0,0),(0,1),(0,2),(0,3),(0,4),(1,4),(2,4)],
-            'D': [(0,0),(1,0),(0,1),(2,1),(0,2),(2,2),(0,3),(2,3),(0,4),(1,4)],
-            'R': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(2,4)],
-            'H': [(0,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(2,4)],
-            'T': [(0,0),(1,0),(2,0),(1,1),(1,2),(1,3),(1,4)],
-            'C': [(0,0),(1,0),(2,0),(0,1),(0,2),(0,3),(0,4),(1,4),(2,4)],
-            'Y': [(0,0),(2,0),(0,1),(2,1),(1,2),(1,3),(1,4)],
-            'A': [(0,0),(1,0),(2,0),(0,1),(2,1),(0,2),(1,2),(2,2),(0,3),(2,3),(0,4),(2,4)],
-        }
-        return letters.get(letter.upper(), [])
+        return _LETTERS_3X5.get(letter.upper(), [])
     
     def _draw_number(self, number, start_x, start_y):
         """
@@ -342,9 +560,7 @@ class LEDMatrix:
         
         for char in str_number:
             if char.isdigit():
-                pixels = self._get_digit_3x5(char)
-                for px, py in pixels:
-                    self.set_pixel(x_offset + px, start_y + py, True)
+                self.blit_glyph(_GLYPH_ATLAS[char][1], x_offset, start_y)
                 x_offset += 4  # 3 píxeles de ancho + 1 de espacio
             elif char == ' ':
                 x_offset += 2
@@ -362,41 +578,52 @@ class LEDMatrix:
         
         for char in text:
             if char.isalpha():
-                pixels = self._get_letter_3x5(char)
-                for px, py in pixels:
-                    self.set_pixel(x_offset + px, start_y + py, True)
+                glyph = _GLYPH_ATLAS.get(char.upper())
+                if glyph:
+                    self.blit_glyph(glyph[1], x_offset, start_y)
                 x_offset += 4  # 3 píxeles + 1 espacio
             elif char.isdigit():
-                pixels = self._get_digit_3x5(char)
-                for px, py in pixels:
-                    self.set_pixel(x_offset + px, start_y + py, True)
+                self.blit_glyph(_GLYPH_ATLAS[char][1], x_offset, start_y)
                 x_offset += 4
             elif char == ' ':
                 x_offset += 2
     
     # ===== MÉTODOS DE RENDERIZADO DE VISTAS LIMPIAS =====
     
-    def draw_bpm_view(self, bpm):
+    def draw_bpm_view(self, bpm, sync=None, blink=False):
         """
         Vista BPM: Texto + número bien centrado
         Formato: BPM 145 (centrado horizontal y verticalmente)
+        Con clock MIDI externo: EXT 145 y una línea abajo (fija = enganchado,
+        titilando = buscando enganche)
         
         Args:
             bpm: Tempo actual (60-200)
+            sync: None (reloj interno), True (esclavo enganchado), False (esclavo buscando)
+            blink: Fase del titileo de la línea mientras busca enganche
         """
+        blink = bool(blink) and sync is False
+        key = ('BPM', bpm, sync, blink)
+        if self._show_cached(key):
+            return
+        
         self.clear()
         
         # BPM: 3 letras = 11px, espacio = 2px, número 3 dígitos = 13px, total ~26px
         # Centrado horizontal: (32 - 26) / 2 = 3
         # Centrado vertical: Y=1 (filas 1-6 para contenido de 5px de alto)
         
-        # Texto "BPM"
-        self._draw_text("BPM", 3, 2)
+        # Texto "BPM" (o "EXT" en modo esclavo)
+        self._draw_text("BPM" if sync is None else "EXT", 3, 2)
         
         # Número BPM
         self._draw_number(bpm, 16, 2)
         
-        self.update()
+        # Estado de enganche en la fila 7
+        if sync or (sync is False and blink):
+            self.fill_region(3, 7, 29, 8)
+        
+        self._finish_view(key)
     
     def draw_swing_view(self, swing):
         """
@@ -406,6 +633,10 @@ class LEDMatrix:
         Args:
             swing: Porcentaje de swing (0-75)
         """
+        key = ('SWG', swing)
+        if self._show_cached(key):
+            return
+        
         self.clear()
         
         # SWG: 3 letras = 11px, espacio = 2px, número 2 dígitos = 9px, total ~22px
@@ -414,7 +645,7 @@ class LEDMatrix:
         self._draw_text("SWG", 5, 2)
         self._draw_number(swing, 18, 2)
         
-        self.update()
+        self._finish_view(key)
     
     def draw_volume_view(self, volume):
         """
@@ -424,6 +655,10 @@ class LEDMatrix:
         Args:
             volume: Volumen master (0-100)
         """
+        key = ('VOL', volume)
+        if self._show_cached(key):
+            return
+        
         self.clear()
         
         # VOL: 3 letras = 11px, espacio = 2px, número 2-3 dígitos = 9-13px, total ~22-26px
@@ -432,7 +667,7 @@ class LEDMatrix:
         self._draw_text("VOL", 4, 2)
         self._draw_number(volume, 17, 2)
         
-        self.update()
+        self._finish_view(key)
     
     def draw_vol_group_view(self, group_name, volume):
         """
@@ -443,6 +678,10 @@ class LEDMatrix:
             group_name: Nombre del grupo ('DR', 'HH', 'TM', 'CY')
             volume: Volumen (0.0-1.0)
         """
+        key = ('VOLG', group_name, int(volume * 100))
+        if self._show_cached(key):
+            return
+        
         self.clear()
         
         # Convertir a porcentaje
@@ -454,7 +693,7 @@ class LEDMatrix:
         self._draw_text(group_name, 6, 2)
         self._draw_number(vol_percent, 17, 2)
         
-        self.update()
+        self._finish_view(key)
     
     def draw_pattern_view(self, pattern_num, bpm, steps):
         """
@@ -462,19 +701,23 @@ class LEDMatrix:
         Formato: PAT 3
         
         Args:
-            pattern_num: Número de patrón (1-8)
+            pattern_num: Número de patrón (1-256)
             bpm: Tempo actual (no se muestra)
             steps: Número de pasos (no se muestra)
         """
+        key = ('PAT', pattern_num)
+        if self._show_cached(key):
+            return
+        
         self.clear()
         
         # PAT: 3 letras = 11px, espacio = 2px, número 1 dígito = 3px, total ~16px
-        # Centrado: (32 - 16) / 2 = 8
+        # Centrado: (32 - 16) / 2 = 8 (hasta 3 dígitos entran a partir de x=21)
         
         self._draw_text("PAT", 8, 2)
         self._draw_number(pattern_num, 21, 2)
         
-        self.update()
+        self._finish_view(key)
     
     def draw_save_view(self, pattern_num):
         """
@@ -484,13 +727,17 @@ class LEDMatrix:
         Args:
             pattern_num: Número de patrón guardado
         """
+        key = ('SAVE', pattern_num)
+        if self._show_cached(key):
+            return
+        
         self.clear()
         
         # Número: 3px, espacio: 3px, checkmark: ~7px, total ~13px
         # Centrado: (32 - 13) / 2 = 9
         
-        # Número de patrón
-        self._draw_number(pattern_num, 10, 2)
+        # Número de patrón (alineado a la derecha, termina en x=12)
+        self._draw_number(pattern_num, 14 - 4 * len(str(pattern_num)), 2)
         
         # Checkmark ✓ a la derecha
         self.set_pixel(16, 3, True)
@@ -501,7 +748,7 @@ class LEDMatrix:
         self.set_pixel(21, 2, True)
         self.set_pixel(22, 1, True)
         
-        self.update()
+        self._finish_view(key)
     
     def draw_effect_view(self, effect_name, effect_value):
         """
@@ -512,6 +759,10 @@ class LEDMatrix:
             effect_name: Nombre del efecto (REV, DEL, COM, FIL, SAT, INT)
             effect_value: Valor del efecto (0-100)
         """
+        key = ('FX', effect_name, int(effect_value))
+        if self._show_cached(key):
+            return
+        
         self.clear()
         
         # Convertir a entero
@@ -523,11 +774,165 @@ class LEDMatrix:
         self._draw_text(effect_name, 4, 2)
         self._draw_number(value_int, 17, 2)
         
-        self.update()
+        self._finish_view(key)
+    
+    def draw_label_view(self, label):
+        """
+        Vista de texto centrado (ej: nombre de preset ROOM/PLT/HALL)
+        
+        Args:
+            label: Texto a mostrar (hasta 8 letras)
+        """
+        key = ('LABEL', label)
+        if self._show_cached(key):
+            return
+        
+        self.clear()
+        
+        # 3 píxeles por letra + 1 de espacio
+        width = len(label) * 4 - 1
+        self._draw_text(label, max(0, (32 - width) // 2), 2)
+        
+        self._finish_view(key)
     
     def cleanup(self):
         """Limpiar y apagar display"""
         self.clear()
+        self.update()
         self._write_all(REG_SHUTDOWN, 0x00)
         self.spi.close()
 
+
+
+def benchmark_render(iterations=2000):
+    """
+    Render del grid completo: píxel por píxel (camino anterior) vs framebuffer
+    
+    Mide el render hasta bytes de fila y el frame completo de
+    draw_sequencer_grid armando los paquetes SPI (con un SPI nulo; el nuevo
+    con invalidate() para enviar siempre las 8 filas, el peor caso).
+    
+    Args:
+        iterations: Frames a renderizar
+    """
+    import random
+    import timeit
+    from core.pattern import Pattern
+    
+    rng = random.Random(1)
+    rows = [[rng.random() < 0.25 for _ in range(8)] for _ in range(32)]
+    pattern = Pattern.from_rows(rows)
+    matrix = LEDMatrix()
+    matrix.spi.xfer2 = lambda packet: None
+    
+    class PixelMatrix:
+        """Camino anterior: buffer [dispositivo][fila] escrito con set_pixel"""
+        
+        def __init__(self):
+            self.width = 32
+            self.num_devices = 4
+            self.buffer = [[0] * 8 for _ in range(4)]
+        
+        def set_pixel(self, x, y, state):
+            if x < 0 or x >= self.width or y < 0 or y >= 8:
+                return
+            x = (self.width - 1) - x
+            device_id = x // 8
+            local_x = x % 8
+            if state:
+                self.buffer[device_id][y] |= (1 << local_x)
+            else:
+                self.buffer[device_id][y] &= ~(1 << local_x)
+        
+        def clear(self):
+            for device_id in range(self.num_devices):
+                for row in range(8):
+                    self.buffer[device_id][row] = 0
+            self.update()
+        
+        def _write_device(self, device_id, register, data):
+            packet = []
+            for i in range(self.num_devices - 1, device_id, -1):
+                packet.extend([REG_NOOP, 0x00])
+            packet.extend([register, data])
+            for i in range(device_id):
+                packet.extend([REG_NOOP, 0x00])
+        
+        def update(self):
+            for device_id in range(self.num_devices):
+                for row in range(8):
+                    self._write_device(device_id, REG_DIGIT0 + row, self.buffer[device_id][row])
+        
+        def render(self, pattern, display_step):
+            for device_id in range(self.num_devices):
+                for row in range(8):
+                    self.buffer[device_id][row] = 0
+            for step in range(min(32, len(pattern))):
+                for instrument in range(min(8, len(pattern[step]))):
+                    if pattern[step][instrument]:
+                        self.set_pixel(step, instrument, True)
+            if 0 <= display_step < 32:
+                for y in range(8):
+                    self.set_pixel(display_step, y, True)
+        
+        def draw_sequencer_grid(self, pattern, display_step):
+            self.clear()
+            self.render(pattern, display_step)
+            self.update()
+    
+    legacy = PixelMatrix()
+    
+    def legacy_render():
+        legacy.render(rows, 5)
+        return [[legacy.buffer[device_id][row] for device_id in range(3, -1, -1)] for row in range(8)]
+    
+    def frame_render():
+        matrix.blit_lanes(pattern.lanes)
+        matrix.draw_column(5)
+        return matrix.row_bytes().tolist()
+    
+    def legacy_frame():
+        legacy.draw_sequencer_grid(rows, 5)
+    
+    def frame_frame():
+        matrix.invalidate()
+        matrix.draw_sequencer_grid(pattern, 5)
+    
+    assert legacy_render() == frame_render()
+    print(f"Render grid 8x32 ({pattern.count()} golpes):")
+    for name, old_fn, new_fn in (("Hasta bytes de fila", legacy_render, frame_render),
+                                 ("Frame con paquetes SPI", legacy_frame, frame_frame)):
+        old = min(timeit.repeat(old_fn, number=iterations, repeat=9)) / iterations
+        new = min(timeit.repeat(new_fn, number=iterations, repeat=9)) / iterations
+        print(f"  {name:24s} píxel por píxel {old * 1e6:7.1f} us, framebuffer {new * 1e6:6.1f} us "
+              f"({old / new:.1f}x)")
+
+
+def benchmark_views(iterations=2000):
+    """
+    Costo por frame de una vista de valor estática (BPM): redibujar vs frame memorizado
+    
+    Args:
+        iterations: Frames a dibujar
+    """
+    import timeit
+    
+    matrix = LEDMatrix()
+    matrix.spi.xfer2 = lambda packet: None
+    
+    def redraw():
+        matrix._view_cache.clear()
+        matrix.draw_bpm_view(128)
+    
+    def cached():
+        matrix.draw_bpm_view(128)
+    
+    old = min(timeit.repeat(redraw, number=iterations, repeat=9)) / iterations
+    new = min(timeit.repeat(cached, number=iterations, repeat=9)) / iterations
+    print(f"Vista BPM estática: redibujar {old * 1e6:6.1f} us, cache {new * 1e6:6.1f} us ({old / new:.1f}x)")
+
+
+# Test del módulo
+if __name__ == "__main__":
+    benchmark_render()
+    benchmark_views()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Render offline de patrones a WAV (sin pygame, GPIO ni placa de sonido)
+Uso: python3 render.py 1 2 3 -o out/cadena.wav --loops 2 --reverb 40
+     python3 render.py 1 -o out/eq.wav --eq-gains 4 -2 0 3
+"""
+
+import argparse
+import sys
+
+from core.config import MAX_PATTERNS
+from core.offline_renderer import OfflineRenderer
+
+
+def parse_args(argv=None):
+    """Parsear argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Renderizar patrones guardados a WAV")
+    parser.add_argument('patterns', nargs='+', type=int, help=f"IDs de patrón a encadenar (1-{MAX_PATTERNS})")
+    parser.add_argument('-o', '--output', default='render.wav', help="WAV de salida")
+    parser.add_argument('--loops', type=int, default=1, help="Repeticiones de cada patrón")
+    parser.add_argument('--tail', type=float, default=2.0, help="Segundos de cola al final")
+    parser.add_argument('--samples-dir', default=None, help="Directorio de samples")
+    parser.add_argument('--block-size', type=int, default=None, help="Frames por bloque del bus")
+    parser.add_argument('--intensity', type=float, default=None, help="Intensidad general de efectos (0-100)")
+    parser.add_argument('--compressor', type=float, default=0, help="Mix del compresor (0-100)")
+    parser.add_argument('--eq', type=float, default=0,
+                        help="Profundidad de la curva EQ 'smile' del pot (0-100, <= 10 = plano)")
+    parser.add_argument('--eq-gains', type=float, nargs='+', default=None, metavar='DB',
+                        help="Ganancia en dB de cada banda del EQ (graves, medios, medios-agudos, agudos); "
+                             "reemplaza la curva de --eq")
+    parser.add_argument('--delay', type=float, default=0, help="Envío del delay (0-100)")
+    parser.add_argument('--reverb', type=float, default=0, help="Envío de la reverb (0-100)")
+    parser.add_argument('--reverb-preset', default=None, help="Preset de reverb (room, plate, hall)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Función principal"""
+    args = parse_args(argv)
+    
+    kwargs = {}
+    if args.samples_dir:
+        kwargs['samples_dir'] = args.samples_dir
+    if args.block_size:
+        kwargs['block_size'] = args.block_size
+    renderer = OfflineRenderer(**kwargs)
+    
+    # Efectos: con algún efecto activo la intensidad por defecto es 100%
+    effects = renderer.effects
+    if effects:
+        effects.set_compressor_mix(args.compressor)
+        effects.set_eq_mix(args.eq)
+        if args.eq_gains is not None:
+            bands = len(effects.eq.gains_db)
+            if len(args.eq_gains) != bands:
+                print(f"✗ --eq-gains espera {bands} valores (uno por banda), se recibieron {len(args.eq_gains)}")
+                return 1
+            effects.set_eq_gains(args.eq_gains)
+        effects.set_delay_mix(args.delay)
+        effects.set_reverb_mix(args.reverb)
+        if args.reverb_preset:
+            effects.set_reverb_preset(args.reverb_preset)
+        any_effect = args.compressor or effects.eq_active() or args.delay or args.reverb
+        intensity = args.intensity if args.intensity is not None else (100 if any_effect else 0)
+        effects.set_intensity(intensity)
+    
+    try:
+        stats = renderer.render_to_wav(args.output, args.patterns, args.loops, args.tail)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    
+    print(f"✅ {args.output}: {stats['duration']:.2f}s de audio en {stats['render_time']:.2f}s "
+          f"({stats['realtime_factor']:.0f}x tiempo real)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
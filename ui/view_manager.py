@@ -20,10 +20,15 @@ class ViewType(Enum):
     PATTERN = "pattern"
     SAVE = "save"
     EFFECTS = "effects"
-    # Vistas individuales de efectos (solo compresor y EQ)
+    # Vistas individuales de efectos
     EFFECT_COMPRESSOR = "effect_compressor"
     EFFECT_EQ = "effect_eq"
     EFFECT_INTENSITY = "effect_intensity"
+    EFFECT_REVERB = "effect_reverb"
+    EFFECT_REVERB_PRESET = "effect_reverb_preset"
+    EFFECT_DELAY = "effect_delay"
+    EFFECT_DELAY_FEEDBACK = "effect_delay_feedback"
+    EFFECT_DELAY_DIVISION = "effect_delay_division"
 
 
 class ViewManager:
@@ -149,9 +154,14 @@ class ViewManager:
             led_matrix.draw_sequencer_grid(pattern, display_step)
         
         elif self.current_view == ViewType.BPM:
-            # Vista BPM
-            bpm = self.view_data.get('bpm', 120)
-            led_matrix.draw_bpm_view(bpm)
+            # Vista BPM (con clock MIDI externo: tempo estimado y enganche en vivo)
+            external = getattr(sequencer, 'external_clock', None)
+            if external and external.active and external.bpm:
+                led_matrix.draw_bpm_view(int(round(external.bpm)), sync=external.locked,
+                                         blink=self.animation_frame % 2 == 0)
+            else:
+                bpm = self.view_data.get('bpm', 120)
+                led_matrix.draw_bpm_view(bpm)
         
         elif self.current_view == ViewType.SWING:
             # Vista SWING
@@ -200,7 +210,7 @@ class ViewManager:
             effects_status = self.view_data.get('effects', {})
             led_matrix.draw_effects_view(effects_status)
         
-        # Vistas individuales de efectos (solo compresor y EQ)
+        # Vistas individuales de efectos
         elif self.current_view == ViewType.EFFECT_COMPRESSOR:
             compressor_mix = self.view_data.get('compressor_mix', 0)
             led_matrix.draw_effect_view("COM", compressor_mix)
@@ -212,4 +222,24 @@ class ViewManager:
         elif self.current_view == ViewType.EFFECT_INTENSITY:
             intensity = self.view_data.get('intensity', 0)
             led_matrix.draw_effect_view("INT", intensity)
+        
+        elif self.current_view == ViewType.EFFECT_REVERB:
+            reverb_mix = self.view_data.get('reverb_mix', 0)
+            led_matrix.draw_effect_view("REV", reverb_mix)
+        
+        elif self.current_view == ViewType.EFFECT_REVERB_PRESET:
+            label = self.view_data.get('label', 'ROOM')
+            led_matrix.draw_label_view(label)
+
+        elif self.current_view == ViewType.EFFECT_DELAY:
+            delay_mix = self.view_data.get('delay_mix', 0)
+            led_matrix.draw_effect_view("DEL", delay_mix)
+        
+        elif self.current_view == ViewType.EFFECT_DELAY_FEEDBACK:
+            feedback = self.view_data.get('feedback', 0)
+            led_matrix.draw_effect_view("FB", feedback)
+        
+        elif self.current_view == ViewType.EFFECT_DELAY_DIVISION:
+            label = self.view_data.get('label', '8')
+            led_matrix.draw_label_view("DEL " + label)
 